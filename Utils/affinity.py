@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+from Utils.indexes import memoize_per_frame, register_extender, register_prefix_slicer
+
+# Dimensiones de uso que se cruzan con los acordes: nombre -> (etiqueta, columnas, etiquetas de nivel).
+# Estaciones y día/noche vienen como porcentajes relativos y longevidad/sillage como votos;
+# en todas se usa la proporción de votos de cada perfume, así cada uno pesa igual.
+AFFINITY_DIMENSIONS = {
+    'season': ('Estación', ['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano',
+                            'timeSeasons.Otoño'],
+               ['Invierno', 'Primavera', 'Verano', 'Otoño']),
+    'day': ('Momento del día', ['timeDay.Dia', 'timeDay.Noche'], ['Día', 'Noche']),
+    'longevity': ('Longevidad', ['longevity.escasa', 'longevity.débil', 'longevity.moderada',
+                                 'longevity.duradera', 'longevity.muy_duradera'],
+                  ['Escasa', 'Débil', 'Moderada', 'Duradera', 'Muy Duradera']),
+    'sillage': ('Sillage', ['sillage.suave', 'sillage.moderada', 'sillage.pesada', 'sillage.enorme'],
+                ['Suave', 'Moderada', 'Pesada', 'Enorme']),
+}
+
+# Peso mínimo de un acorde en el subconjunto (suma de intensidades / 100, ~ perfumes
+# con el acorde al máximo) para figurar en las respuestas de top_affinity_accords
+MIN_ACCORD_WEIGHT = 5.0
+
+
+def _dimension_slices():
+    slices, start = {}, 0
+    for dimension, (_, columns, _) in AFFINITY_DIMENSIONS.items():
+        slices[dimension] = slice(start, start + len(columns))
+        start += len(columns)
+    return slices
+
+
+def _affinity_inputs(df):
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    # Intensidad de cada acorde (0-100) como peso entre 0 y 1
+    accords = df[accord_columns].to_numpy(dtype=np.float32, na_value=0) / np.float32(100)
+
+    blocks = []
+    for _, columns, _ in AFFINITY_DIMENSIONS.values():
+        votes = df.reindex(columns=columns).to_numpy(dtype=np.float32, na_value=0)
+        totals = votes.sum(axis=1, keepdims=True)
+        blocks.append(np.divide(votes, totals, out=np.zeros_like(votes), where=totals > 0))
+    # La última columna de unos da en el mismo producto el peso total de cada acorde
+    blocks.append(np.ones((len(df), 1), dtype=np.float32))
+    return {'columns': accord_columns, 'accords': accords, 'votes': np.hstack(blocks)}
+
+
+@memoize_per_frame
+def get_affinity_inputs(df):
+    """
+    Matrices de entrada de la afinidad, calculadas una vez por DataFrame compartido
+    Returns:
+        dict: columns (acordes), accords (filas x acordes, 0-1, float32) y votes
+              (filas x niveles de todas las dimensiones + columna de unos, float32)
+    """
+    return _affinity_inputs(df)
+
+
+def _affinity_totals(inputs, mask=None):
+    accords, votes = inputs['accords'], inputs['votes']
+    if mask is not None:
+        # La máscara pondera la matriz angosta (niveles), no la de acordes
+        votes = votes * np.asarray(mask, dtype=np.float32)[:, None]
+    return {
+        'columns': inputs['columns'],
+        # Un solo GEMM: acordesᵀ · votos -> acordes x (niveles + total)
+        'weights': (accords.T @ votes).astype(np.float64),
+        # Proporciones de referencia del subconjunto (todos los perfumes con votos)
+        'baseline': votes.sum(axis=0, dtype=np.float64),
+    }
+
+
+@memoize_per_frame
+def get_affinity(df):
+    """
+    Afinidad acorde x nivel de uso de todo el DataFrame (memorizada)
+    Returns:
+        dict: columns, weights (acordes x niveles + total) y baseline (niveles + perfumes)
+    """
+    return _affinity_totals(get_affinity_inputs(df))
+
+
+def affinity(df, mask=None):
+    """
+    Afinidad acorde x nivel de uso del catálogo o del filtro actual
+    Con máscara se resuelve con un producto de matrices sobre las entradas ya
+    memorizadas, sin agrupar por acorde.
+    Args:
+        df (pd.DataFrame): DataFrame compartido (las entradas se memorizan por objeto)
+        mask (array-like de bool): Filas del filtro actual (None = todo el DataFrame)
+    """
+    if mask is None:
+        return get_affinity(df)
+    return _affinity_totals(get_affinity_inputs(df), mask)
+
+
+def affinity_table(totals, dimension, accords=None):
+    """
+    Tabla acorde x nivel de una dimensión
+    Args:
+        totals (dict): Resultado de affinity
+        dimension (str): Clave de AFFINITY_DIMENSIONS
+        accords (list): Columnas de acordes a incluir (None = todos)
+    Returns:
+        tuple: (share, lift) como DataFrames acorde x nivel. share es la proporción del
+               peso del acorde en cada nivel; lift, share dividido por la proporción del
+               nivel en todo el subconjunto (> 1 = el acorde se asocia a ese nivel)
+    """
+    _, _, labels = AFFINITY_DIMENSIONS[dimension]
+    part = _dimension_slices()[dimension]
+    weights = totals['weights'][:, part]
+    baseline = totals['baseline'][part]
+
+    row_totals = weights.sum(axis=1, keepdims=True)
+    share = np.divide(weights, row_totals, out=np.full_like(weights, np.nan), where=row_totals > 0)
+    base_total = baseline.sum()
+    base_share = baseline / base_total if base_total > 0 else np.full_like(baseline, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lift = share / base_share
+
+    names = [col.replace('accords.', '') for col in totals['columns']]
+    share = pd.DataFrame(share, index=names, columns=labels)
+    lift = pd.DataFrame(lift, index=names, columns=labels)
+    if accords is not None:
+        keep = [col.replace('accords.', '') for col in accords]
+        share, lift = share.loc[keep], lift.loc[keep]
+    return share, lift
+
+
+def top_affinity_accords(totals, dimension, level, k=5, min_weight=MIN_ACCORD_WEIGHT):
+    """
+    Acordes más asociados a un nivel (p. ej. "acordes de invierno")
+    Args:
+        level (str): Etiqueta del nivel (p. ej. 'Invierno')
+        min_weight (float): Peso mínimo del acorde en el subconjunto
+    Returns:
+        pd.Series: lift de los k acordes con mayor lift, de mayor a menor
+    """
+    _, lift = affinity_table(totals, dimension)
+    weight = pd.Series(totals['weights'][:, -1], index=lift.index)
+    candidates = lift.loc[weight >= min_weight, level].dropna()
+    return candidates.sort_values(ascending=False, kind='stable').head(k)
+
+
+def heaviest_accords(totals, k=12):
+    """Columnas de los k acordes con mayor peso total en el subconjunto"""
+    weight = totals['weights'][:, -1]
+    order = np.argsort(-weight, kind='stable')[:k]
+    return [totals['columns'][i] for i in order if weight[i] > 0]
+
+
+def _extend_affinity_inputs(inputs, tail, offset):
+    tail_inputs = _affinity_inputs(tail)
+    if tail_inputs['columns'] != inputs['columns']:
+        return None
+    return {
+        'columns': inputs['columns'],
+        'accords': np.vstack([inputs['accords'], tail_inputs['accords']]),
+        'votes': np.vstack([inputs['votes'], tail_inputs['votes']]),
+    }
+
+
+def _extend_affinity(totals, tail, offset):
+    # Las sumas son aditivas: basta con el producto de las filas nuevas
+    tail_totals = _affinity_totals(_affinity_inputs(tail))
+    if tail_totals['columns'] != totals['columns']:
+        return None
+    return {
+        'columns': totals['columns'],
+        'weights': totals['weights'] + tail_totals['weights'],
+        'baseline': totals['baseline'] + tail_totals['baseline'],
+    }
+
+
+def _slice_affinity_inputs(inputs, n_rows):
+    return {
+        'columns': inputs['columns'],
+        'accords': inputs['accords'][:n_rows],
+        'votes': inputs['votes'][:n_rows],
+    }
+
+
+register_extender(get_affinity_inputs, _extend_affinity_inputs)
+register_extender(get_affinity, _extend_affinity)
+register_prefix_slicer(get_affinity_inputs, _slice_affinity_inputs)
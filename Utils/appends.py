@@ -0,0 +1,87 @@
+import hashlib
+import os
+
+import pandas as pd
+
+# Bytes que se comparan para confirmar que el archivo solo creció por el final
+PROBE_BYTES = 64 * 1024
+
+
+def _digest(fh, start, length):
+    fh.seek(start)
+    return hashlib.sha1(fh.read(length)).hexdigest()
+
+
+def source_state(path):
+    """
+    Estado del CSV para detectar agregados al final
+    Returns:
+        dict: size, mtime_ns, head (hash del inicio) y boundary (hash de los últimos bytes)
+    """
+    stat = os.stat(path)
+    with open(path, 'rb') as fh:
+        head = _digest(fh, 0, min(PROBE_BYTES, stat.st_size))
+        boundary_start = max(0, stat.st_size - PROBE_BYTES)
+        boundary = _digest(fh, boundary_start, stat.st_size - boundary_start)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'head': head,
+        'boundary': boundary,
+    }
+
+
+def source_directory(base_dir, path):
+    """
+    Subdirectorio de base_dir para un CSV (nombre del archivo más hash de su ruta absoluta)
+    Las versiones guardadas de fuentes distintas no se pisan al podar las anteriores.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(base_dir, f'{stem}-{key}')
+
+
+def appended_since(path, state):
+    """
+    Indica si el CSV solo recibió filas nuevas al final desde `state`
+    Returns:
+        int | None: Offset en bytes donde empiezan las filas nuevas, o None si el
+                    archivo no cambió, se reescribió o la última fila no estaba completa
+    """
+    if not state:
+        return None
+    size = os.path.getsize(path)
+    old_size = state['size']
+    if size <= old_size:
+        return None
+    with open(path, 'rb') as fh:
+        if _digest(fh, 0, min(PROBE_BYTES, old_size)) != state['head']:
+            return None
+        boundary_start = max(0, old_size - PROBE_BYTES)
+        if _digest(fh, boundary_start, old_size - boundary_start) != state['boundary']:
+            return None
+        # Las filas nuevas deben empezar en una línea nueva
+        fh.seek(old_size - 1)
+        if fh.read(1) != b'\n':
+            return None
+    return old_size
+
+
+def read_tail(path, offset, chunksize=None, dtype=None):
+    """
+    Lee solo las filas que empiezan en `offset`, con el encabezado del archivo
+    Returns:
+        pd.DataFrame o iterador de bloques (si se indica chunksize)
+    """
+    columns = pd.read_csv(path, nrows=0).columns
+    fh = open(path, 'rb')
+    fh.seek(offset)
+    reader = pd.read_csv(fh, header=None, names=columns, chunksize=chunksize, dtype=dtype)
+    if chunksize is None:
+        fh.close()
+        return reader
+
+    def chunks():
+        with fh:
+            yield from reader
+    return chunks()
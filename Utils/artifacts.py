@@ -0,0 +1,372 @@
+"""
+Artefactos precalculados en disco, compartidos por todos los workers
+
+Un paso de construcción escribe el dataset limpio y sus estructuras derivadas
+(matriz de acordes, tabla de vecinos, perfumistas por perfume y, para el catálogo, las estadísticas e
+histogramas de acordes y los órdenes de las tablas de posiciones) como archivos .npy en un
+directorio versionado según el estado del CSV (uno por ruta de CSV, ver
+Utils.appends.source_directory). Cada worker los abre con mmap
+de solo lectura: las columnas numéricas no se copian a la memoria del proceso,
+así que N workers comparten una sola copia física a través de la caché de
+páginas del SO y arrancan sin parsear el CSV.
+
+Uso (desde la raíz del repositorio, antes de lanzar los workers):
+    python -m Utils.artifacts
+    python -m Utils.artifacts --data data/perfumes_ordenado.csv --dir data/artifacts
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import (
+    CATALOG_ROWS, DATA_PATH, PERFUMERS_COL, clean_perfume_frame, load_perfume_data, loaded_source
+)
+from Utils.appends import source_directory, source_state
+from Utils.indexes import (
+    ACCORD_HISTOGRAM_EDGES, NEIGHBOR_K, NEIGHBOR_TABLE_MAX_ROWS, get_accord_histograms, get_accord_index,
+    get_cached_accord_stats, get_neighbor_table, get_perfumer_index, seed
+)
+from Utils.leaderboards import LEADERBOARDS, get_sort_orders
+from Utils.singleflight import single_flight
+
+ARTIFACT_DIR = os.environ.get('PERFUME_ARTIFACT_DIR', 'data/artifacts')
+ARTIFACT_VERSION = 5
+MANIFEST = 'manifest.json'
+
+_opened = {}
+_opened_lock = threading.Lock()
+
+
+def artifact_path(state, artifact_dir=ARTIFACT_DIR, csv_path=DATA_PATH):
+    """
+    Directorio de los artefactos para un estado del CSV (Utils.appends.source_state)
+    La versión cambia con el contenido del CSV, el formato o los parámetros de cálculo;
+    cada CSV guarda sus versiones en su propio subdirectorio de artifact_dir.
+    """
+    key = json.dumps({
+        'artifact_version': ARTIFACT_VERSION,
+        'catalog_rows': CATALOG_ROWS,
+        'neighbor_k': NEIGHBOR_K,
+        'neighbor_table_max_rows': NEIGHBOR_TABLE_MAX_ROWS,
+        'state': state,
+    }, sort_keys=True)
+    return os.path.join(source_directory(artifact_dir, csv_path), hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def _save(directory, name, array):
+    np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+
+
+def _load(directory, name):
+    path = os.path.join(directory, f'{name}.npy')
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:  # un arreglo vacío no se puede mapear
+        return np.load(path)
+
+
+def _column_kinds(df):
+    """
+    numeric (float64, en un bloque), text (object), category (códigos en un archivo y
+    categorías en el manifiesto) o array (cualquier otro dtype, un archivo)
+    """
+    kinds = []
+    for col, dtype in df.dtypes.items():
+        if dtype == np.float64:
+            kinds.append([col, 'numeric'])
+        elif dtype == object:
+            kinds.append([col, 'text'])
+        elif isinstance(dtype, pd.CategoricalDtype):
+            kinds.append([col, 'category'])
+        else:
+            kinds.append([col, 'array'])
+    return kinds
+
+
+def _encode_text(df, columns):
+    """Texto como bytes UTF-8 concatenados más offsets por fila (mismo esquema que Arrow)"""
+    offsets = np.zeros((len(columns), len(df) + 1), dtype=np.int64)
+    missing = np.zeros((len(columns), len(df)), dtype=bool)
+    parts = []
+    total = 0
+    for j, col in enumerate(columns):
+        values = df[col].to_numpy()
+        missing[j] = pd.isna(values)
+        encoded = [b'' if miss else str(value).encode('utf-8') for value, miss in zip(values, missing[j])]
+        offsets[j, 0] = total
+        offsets[j, 1:] = total + np.cumsum([len(item) for item in encoded], dtype=np.int64)
+        total = int(offsets[j, -1])
+        parts.append(b''.join(encoded))
+    return np.frombuffer(b''.join(parts), dtype=np.uint8), offsets, missing
+
+
+def _decode_text(data, offsets, missing):
+    start = int(offsets[0])
+    raw = data[start:int(offsets[-1])].tobytes()
+    bounds = (offsets - start).tolist()
+    values = np.empty(len(missing), dtype=object)
+    for i, miss in enumerate(missing.tolist()):
+        values[i] = np.nan if miss else raw[bounds[i]:bounds[i + 1]].decode('utf-8')
+    return values
+
+
+def _write_artifacts(directory, df):
+    kinds = _column_kinds(df)
+    numeric = [col for col, kind in kinds if kind == 'numeric']
+    text = [col for col, kind in kinds if kind == 'text']
+
+    # Dataset: una matriz (columnas x filas) para que cada columna sea contigua
+    _save(directory, 'numeric', df[numeric].to_numpy(dtype=np.float64).T)
+    data, offsets, missing = _encode_text(df, text)
+    _save(directory, 'text_data', data)
+    _save(directory, 'text_offsets', offsets)
+    _save(directory, 'text_missing', missing)
+    categories = {}
+    for j, (col, kind) in enumerate(kinds):
+        if kind == 'array':
+            _save(directory, f'column_{j}', df[col].to_numpy())
+        elif kind == 'category':
+            _save(directory, f'column_{j}', df[col].cat.codes.to_numpy())
+            categories[col] = df[col].cat.categories.tolist()
+
+    # Estructuras derivadas del dataset completo
+    index = get_accord_index(df)
+    _save(directory, 'accord_matrix', index['matrix'])
+    _save(directory, 'has_accords', index['has_accords'])
+    has_neighbors = len(df) <= NEIGHBOR_TABLE_MAX_ROWS
+    if has_neighbors:
+        table = get_neighbor_table(df)
+        _save(directory, 'neighbors', table['neighbors'])
+        _save(directory, 'neighbor_scores', table['scores'])
+    has_perfumers = PERFUMERS_COL in df.columns
+    if has_perfumers:
+        perfumers = get_perfumer_index(df)
+        _save(directory, 'perfumer_codes', perfumers['codes'])
+        _save(directory, 'perfumer_offsets', perfumers['offsets'])
+
+    # Estadísticas e histogramas del catálogo que muestran las páginas
+    catalog = df.iloc[:CATALOG_ROWS]
+    accord_columns = index['columns']
+    histograms = get_accord_histograms(catalog)
+    counts = np.zeros((len(accord_columns), ACCORD_HISTOGRAM_EDGES - 1), dtype=np.int64)
+    edges = np.full((len(accord_columns), ACCORD_HISTOGRAM_EDGES), np.nan)
+    for j, col in enumerate(accord_columns):
+        if col in histograms:
+            counts[j], edges[j] = histograms[col]
+    _save(directory, 'catalog_histogram_counts', counts)
+    _save(directory, 'catalog_histogram_edges', edges)
+    for board, order in get_sort_orders(catalog).items():
+        _save(directory, f'catalog_order_{board}', order.astype(np.int64))
+    stats = {
+        col: {key: value.item() if hasattr(value, 'item') else value for key, value in values.items()}
+        for col, values in get_cached_accord_stats(catalog).items()
+    }
+
+    manifest = {
+        'artifact_version': ARTIFACT_VERSION,
+        'rows': len(df),
+        'catalog_rows': len(catalog),
+        'columns': kinds,
+        'categories': categories,
+        'accord_columns': accord_columns,
+        'neighbors': has_neighbors,
+        'perfumers': perfumers['names'].tolist() if has_perfumers else None,
+        'leaderboards': list(LEADERBOARDS),
+        'catalog_accord_stats': stats,
+    }
+    # El manifiesto va al final: su presencia indica que los artefactos están completos
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, ensure_ascii=False)
+
+
+def build_artifacts(csv_path=DATA_PATH, artifact_dir=ARTIFACT_DIR, frame=None, state=None):
+    """
+    Construye los artefactos del CSV (si no existen ya para su estado actual)
+    Se escriben en un directorio temporal que se renombra al terminar: los
+    workers nunca ven artefactos a medio escribir. Las versiones anteriores del
+    mismo CSV se eliminan (los procesos que aún las tengan mapeadas siguen
+    leyéndolas); las de otros CSV no se tocan.
+    Args:
+        frame (pd.DataFrame): Dataset ya limpio para `state` (evita volver a leer el CSV)
+        state (dict): Estado del CSV al que corresponde `frame`
+    Returns:
+        str: Directorio de los artefactos
+    """
+    if frame is None or state is None:
+        state = source_state(csv_path)
+        frame = None
+    target = artifact_path(state, artifact_dir, csv_path)
+    if os.path.exists(os.path.join(target, MANIFEST)):
+        return target
+
+    source_dir = os.path.dirname(target)
+    os.makedirs(source_dir, exist_ok=True)
+    tmp = os.path.join(source_dir, f'.tmp-{os.getpid()}-{threading.get_ident()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        if frame is None:
+            frame = clean_perfume_frame(pd.read_csv(csv_path))
+        _write_artifacts(tmp, frame)
+        os.rename(tmp, target)
+    except OSError:
+        # Otro proceso terminó la misma versión primero
+        if not os.path.exists(os.path.join(target, MANIFEST)):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for entry in os.listdir(source_dir):
+        if entry != os.path.basename(target) and not entry.startswith('.tmp-'):
+            shutil.rmtree(os.path.join(source_dir, entry), ignore_errors=True)
+    return target
+
+
+def _frame_from_artifacts(directory, manifest):
+    """
+    Reconstruye el dataset sobre los archivos mapeados
+    Cada tramo de columnas numéricas consecutivas es un bloque de pandas que apunta
+    directamente al mmap; solo el texto se convierte a objetos de Python.
+    """
+    numeric = _load(directory, 'numeric')
+    data = _load(directory, 'text_data')
+    offsets = _load(directory, 'text_offsets')
+    missing = _load(directory, 'text_missing')
+
+    pieces = []
+    run = []
+    n_numeric = n_text = 0
+    kinds = manifest['columns'] + [[None, None]]
+    for j, (col, kind) in enumerate(kinds):
+        if kind == 'numeric':
+            run.append(col)
+            continue
+        if run:
+            block = numeric[n_numeric:n_numeric + len(run)]
+            pieces.append(pd.DataFrame(block.T, columns=run, copy=False))
+            n_numeric += len(run)
+            run = []
+        if kind == 'text':
+            pieces.append(pd.DataFrame(
+                {col: _decode_text(data, offsets[n_text], missing[n_text])}, copy=False))
+            n_text += 1
+        elif kind == 'array':
+            pieces.append(pd.DataFrame({col: _load(directory, f'column_{j}')}, copy=False))
+        elif kind == 'category':
+            codes = _load(directory, f'column_{j}')
+            pieces.append(pd.DataFrame({col: pd.Categorical.from_codes(
+                codes, categories=manifest['categories'][col])}, copy=False))
+    return pd.concat(pieces, axis=1, copy=False)
+
+
+def _seed_frame_indexes(directory, manifest, frame):
+    matrix = _load(directory, 'accord_matrix')
+    names = frame['name'].to_numpy()
+    position = {}
+    for i, name in enumerate(names):
+        position.setdefault(name, i)
+    seed(get_accord_index, frame, {
+        'columns': manifest['accord_columns'],
+        'names': names,
+        'matrix': matrix,
+        'has_accords': _load(directory, 'has_accords'),
+        'position': position,
+    })
+    if manifest['neighbors']:
+        seed(get_neighbor_table, frame, {
+            'neighbors': _load(directory, 'neighbors'),
+            'scores': _load(directory, 'neighbor_scores'),
+        })
+    if manifest['perfumers'] is not None:
+        seed(get_perfumer_index, frame, {
+            'names': np.asarray(manifest['perfumers'], dtype=object),
+            'codes': _load(directory, 'perfumer_codes'),
+            'offsets': _load(directory, 'perfumer_offsets'),
+        })
+
+
+def open_artifacts(csv_path=DATA_PATH, state=None, artifact_dir=ARTIFACT_DIR):
+    """
+    Abre (una vez por proceso) los artefactos del estado actual del CSV
+    Returns:
+        dict | None: directory, manifest y frame (con sus índices ya registrados
+                     en Utils.indexes), o None si no hay artefactos para ese estado
+    """
+    if state is None:
+        state = source_state(csv_path)
+    directory = artifact_path(state, artifact_dir, csv_path)
+    with _opened_lock:
+        opened = _opened.get(directory)
+        if opened is not None:
+            return opened
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding='utf-8') as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError:
+            return None
+        frame = _frame_from_artifacts(directory, manifest)
+        _seed_frame_indexes(directory, manifest, frame)
+        # Una versión nueva reemplaza a las anteriores del mismo CSV (sus mmaps se liberan
+        # con el DataFrame); las abiertas para otros CSV siguen en uso
+        for previous in [d for d in _opened if os.path.dirname(d) == os.path.dirname(directory)]:
+            del _opened[previous]
+        opened = _opened[directory] = {'directory': directory, 'manifest': manifest, 'frame': frame}
+        return opened
+
+
+def seed_catalog_indexes(artifacts, catalog):
+    """
+    Registra para la vista del catálogo las estadísticas e histogramas precalculados
+    Solo aplica si la vista tiene las mismas filas con las que se construyeron.
+    """
+    manifest = artifacts['manifest']
+    if len(catalog) != manifest['catalog_rows']:
+        return
+    counts = _load(artifacts['directory'], 'catalog_histogram_counts')
+    edges = _load(artifacts['directory'], 'catalog_histogram_edges')
+    seed(get_accord_histograms, catalog, {
+        col: (counts[j], edges[j])
+        for j, col in enumerate(manifest['accord_columns']) if not np.isnan(edges[j, 0])
+    })
+    seed(get_cached_accord_stats, catalog, {
+        col: dict(values) for col, values in manifest['catalog_accord_stats'].items()
+    })
+    if manifest['leaderboards'] == list(LEADERBOARDS):
+        seed(get_sort_orders, catalog, {
+            board: _load(artifacts['directory'], f'catalog_order_{board}') for board in LEADERBOARDS
+        })
+
+
+@single_flight
+def ensure_artifacts(csv_path=DATA_PATH, artifact_dir=ARTIFACT_DIR):
+    """
+    Construye los artefactos a partir del dataset ya cargado en este proceso
+    Los workers que arranquen después los abren con mmap en lugar de leer el CSV.
+    Returns:
+        str: Directorio de los artefactos
+    """
+    load_perfume_data(csv_path)
+    loaded = loaded_source(csv_path)
+    if loaded is None:
+        return build_artifacts(csv_path, artifact_dir)
+    if loaded.get('artifacts') is not None:
+        return loaded['artifacts']['directory']
+    return build_artifacts(csv_path, artifact_dir, frame=loaded['frame'], state=loaded['source'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=DATA_PATH, help='CSV de origen')
+    parser.add_argument('--dir', default=ARTIFACT_DIR, help='Directorio de artefactos')
+    args = parser.parse_args(argv)
+    print(build_artifacts(args.data, args.dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Agregados por marca: una pasada sobre las filas y después solo tablas pequeñas
+
+get_brand_aggregates suma en un solo producto disperso (matriz indicadora
+marcas x filas, por bloques de filas) el conteo, las calificaciones, las
+reseñas, la intensidad de cada acorde y los votos por estación de todas las
+marcas. El resultado se guarda por DataFrame (Utils.indexes) y las filas
+agregadas al final del CSV solo suman su parte. El explorador de marcas filtra
+y profundiza sobre estas sumas sin volver a recorrer los perfumes.
+"""
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import BRAND_COL, RATING_COL, RATING_COUNT_COL, page_column
+from Utils.indexes import memoize_per_frame, register_extender
+from Utils.lazy_imports import lazy_import
+
+# scipy solo se importa al calcular los agregados
+scipy_sparse = lazy_import('scipy.sparse')
+
+# Filas por bloque al sumar: la memoria temporal es la de un bloque, no la del dataset
+BRAND_BLOCK_ROWS = 65536
+
+SEASON_COLUMNS = ['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano', 'timeSeasons.Otoño']
+
+# Sumas por marca que guarda get_brand_aggregates (una fila por marca)
+SUM_KEYS = ('count', 'rated', 'rating_sum', 'reviews', 'accords', 'seasons')
+
+
+def _brand_codes(df):
+    brands = df[BRAND_COL]
+    if isinstance(brands.dtype, pd.CategoricalDtype):
+        return brands.cat.codes.to_numpy(), brands.cat.categories.to_numpy(dtype=object)
+    codes, names = pd.factorize(brands)
+    return codes, np.asarray(names, dtype=object)
+
+
+def _aggregate(df):
+    codes, names = _brand_codes(df)
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    season_columns = [col for col in SEASON_COLUMNS if col in df.columns]
+    rating = page_column(df, RATING_COL).to_numpy(dtype=np.float64)
+    reviews = page_column(df, RATING_COUNT_COL).to_numpy(dtype=np.float64)
+    votes = df[accord_columns + season_columns]
+
+    # Columnas de la suma: conteo, con rating, suma de rating, reseñas, acordes y estaciones
+    width = 4 + len(accord_columns) + len(season_columns)
+    sums = np.zeros((len(names), width))
+    for start in range(0, len(df), BRAND_BLOCK_ROWS):
+        stop = min(len(df), start + BRAND_BLOCK_ROWS)
+        block_codes = codes[start:stop]
+        values = np.empty((stop - start, width))
+        values[:, 0] = 1
+        values[:, 1] = ~np.isnan(rating[start:stop])
+        values[:, 2] = rating[start:stop]
+        values[:, 3] = reviews[start:stop]
+        values[:, 4:] = votes.iloc[start:stop].to_numpy(dtype=np.float64)
+        np.nan_to_num(values, copy=False)
+        rows = np.flatnonzero(block_codes >= 0)
+        indicator = scipy_sparse.csr_matrix(
+            (np.ones(len(rows)), (block_codes[rows], rows)), shape=(len(names), stop - start)
+        )
+        sums += indicator @ values
+
+    accords_end = 4 + len(accord_columns)
+    return {
+        'names': names,
+        'accord_columns': accord_columns,
+        'season_columns': season_columns,
+        'count': sums[:, 0].astype(np.int64),
+        'rated': sums[:, 1].astype(np.int64),
+        'rating_sum': sums[:, 2],
+        'reviews': sums[:, 3],
+        'accords': sums[:, 4:accords_end],
+        'seasons': sums[:, accords_end:],
+    }
+
+
+@memoize_per_frame
+def get_brand_aggregates(df):
+    """
+    Sumas por marca de todo el DataFrame (una pasada)
+    Returns:
+        dict: names (marcas), accord_columns, season_columns y, una fila por marca,
+              count, rated (perfumes con rating), rating_sum, reviews, accords
+              (suma de intensidades por acorde) y seasons (votos por estación)
+    """
+    return _aggregate(df)
+
+
+def _extend_brand_aggregates(aggregates, tail, offset):
+    # Las sumas son aditivas: las filas nuevas se suman a su marca (o agregan marcas nuevas)
+    if BRAND_COL not in tail.columns:
+        return None
+    added = _aggregate(tail)
+    if added['accord_columns'] != aggregates['accord_columns'] \
+            or added['season_columns'] != aggregates['season_columns']:
+        return None
+    position = {name: i for i, name in enumerate(aggregates['names'])}
+    new_names = [name for name in added['names'] if name not in position]
+    names = np.concatenate([aggregates['names'], np.asarray(new_names, dtype=object)])
+    position.update((name, len(aggregates['names']) + i) for i, name in enumerate(new_names))
+    rows = np.array([position[name] for name in added['names']], dtype=np.int64)
+
+    extended = dict(aggregates, names=names)
+    for key in SUM_KEYS:
+        values = aggregates[key]
+        grown = np.zeros((len(names),) + values.shape[1:], dtype=values.dtype)
+        grown[:len(values)] = values
+        grown[rows] += added[key]
+        extended[key] = grown
+    return extended
+
+
+register_extender(get_brand_aggregates, _extend_brand_aggregates)
+
+
+def brand_table(aggregates):
+    """
+    Resumen de cada marca con perfumes, calculado solo con las sumas
+    Returns:
+        pd.DataFrame: brand, perfumes, mean_rating, total_reviews y top_season,
+                      de más a menos perfumes
+    """
+    present = np.flatnonzero(aggregates['count'] > 0)
+    rated = aggregates['rated'][present]
+    mean_rating = np.divide(aggregates['rating_sum'][present], rated,
+                            out=np.full(len(present), np.nan), where=rated > 0)
+    seasons = aggregates['seasons'][present]
+    labels = np.array([col.replace('timeSeasons.', '') for col in aggregates['season_columns']], dtype=object)
+    top_season = np.full(len(present), None, dtype=object)
+    voted = seasons.sum(axis=1) > 0
+    if len(labels):
+        top_season[voted] = labels[seasons[voted].argmax(axis=1)]
+    table = pd.DataFrame({
+        'brand': aggregates['names'][present],
+        'perfumes': aggregates['count'][present],
+        'mean_rating': mean_rating,
+        'total_reviews': aggregates['reviews'][present],
+        'top_season': top_season,
+    })
+    return table.sort_values('perfumes', ascending=False, kind='stable', ignore_index=True)
+
+
+def brand_profile(aggregates, brand=None):
+    """
+    Perfil promedio de una marca (o de todas, con brand=None) a partir de las sumas
+    Returns:
+        dict: accords (pd.Series, intensidad promedio por acorde) y seasons
+              (pd.Series, % de los votos por estación); None si la marca no existe
+    """
+    if brand is None:
+        rows = np.flatnonzero(aggregates['count'] > 0)
+    else:
+        rows = np.flatnonzero(aggregates['names'] == brand)
+        if len(rows) == 0:
+            return None
+    count = aggregates['count'][rows].sum()
+    accords = aggregates['accords'][rows].sum(axis=0) / max(count, 1)
+    votes = aggregates['seasons'][rows].sum(axis=0)
+    seasons = votes * 100 / votes.sum() if votes.sum() > 0 else np.zeros_like(votes)
+    return {
+        'accords': pd.Series(accords, index=aggregates['accord_columns']),
+        'seasons': pd.Series(seasons, index=[col.replace('timeSeasons.', '') for col in aggregates['season_columns']]),
+    }
@@ -0,0 +1,282 @@
+"""
+Familias olfativas: k-means mini-batch sobre la matriz de acordes normalizada
+
+El modelo (centroides, asignaciones y barrido de k) se ajusta una sola vez por
+versión del dataset y se guarda en disco (CLUSTER_DIR). Si el CSV solo
+creció al final, las filas nuevas se asignan al centroide más cercano sin volver
+a ajustar; get_cluster_labels asigna cualquier DataFrame con el mismo criterio.
+
+Uso (desde la raíz del repositorio, para ajustarlo antes de lanzar los workers):
+    python -m Utils.clusters
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import streamlit as st
+
+from Utils.appends import source_directory
+from Utils.data_loader import CATALOG_ROWS, DATA_PATH
+from Utils.indexes import memoize_per_frame, register_extender, register_prefix_slicer
+from Utils.lazy_imports import lazy_import
+from Utils.models import accord_matrix, build_model, model_path
+from Utils.singleflight import single_flight
+
+# scikit-learn solo se importa al ajustar el modelo, no al arrancar las páginas
+sklearn_cluster = lazy_import('sklearn.cluster')
+sklearn_metrics = lazy_import('sklearn.metrics')
+
+# Fuera de ARTIFACT_DIR: build_artifacts borra del suyo todo lo que no sea la versión actual
+CLUSTER_DIR = os.environ.get('PERFUME_CLUSTER_DIR', 'data/clusters')
+CLUSTER_VERSION = 1
+
+# Valores de k del barrido (codo y silueta) y parámetros del ajuste
+K_CANDIDATES = tuple(range(3, 13))
+BATCH_SIZE = 2048
+N_INIT = 3
+RANDOM_STATE = 0
+# La silueta es cuadrática: se estima sobre una muestra
+SILHOUETTE_SAMPLE = 5000
+# Filas por bloque al asignar perfumes a su centroide
+ASSIGN_BLOCK_ROWS = 65536
+
+# Lo que versiona el modelo además del estado del CSV
+CLUSTER_PARAMS = {'cluster_version': CLUSTER_VERSION, 'k_candidates': list(K_CANDIDATES)}
+
+
+def cluster_workers():
+    """
+    Hilos del barrido de k: PERFUME_CLUSTER_WORKERS o los núcleos disponibles
+    """
+    configured = os.environ.get('PERFUME_CLUSTER_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return max(1, os.cpu_count() or 1)
+
+
+def cluster_path(state, cluster_dir=CLUSTER_DIR, path=DATA_PATH):
+    """Directorio del modelo para un estado del CSV (Utils.appends.source_state)"""
+    return model_path(source_directory(cluster_dir, path), CLUSTER_PARAMS, state)
+
+
+def assign_clusters(matrix, centroids):
+    """
+    Centroide más cercano de cada fila (distancia euclídea)
+    Args:
+        matrix (np.ndarray): Filas de acordes normalizadas (ceros = sin acordes)
+        centroids (np.ndarray): Centroides del modelo (familias x acordes)
+    Returns:
+        np.ndarray: Familia de cada fila (int16, -1 = sin acordes)
+    """
+    labels = np.full(len(matrix), -1, dtype=np.int16)
+    # ||x - c||² = ||x||² - 2 x·c + ||c||²; ||x||² no cambia el mínimo
+    centroid_norms = (centroids * centroids).sum(axis=1)
+    for start in range(0, len(matrix), ASSIGN_BLOCK_ROWS):
+        block = matrix[start:start + ASSIGN_BLOCK_ROWS]
+        distances = centroid_norms - 2 * (block @ centroids.T)
+        has_accords = block.any(axis=1)
+        labels[start:start + len(block)][has_accords] = distances[has_accords].argmin(axis=1)
+    return labels
+
+
+def _fit(matrix, k):
+    model = sklearn_cluster.MiniBatchKMeans(
+        n_clusters=k, batch_size=BATCH_SIZE, n_init=N_INIT, random_state=RANDOM_STATE
+    ).fit(matrix)
+    centroids = model.cluster_centers_.astype(np.float32)
+    labels = assign_clusters(matrix, centroids)
+    silhouette = np.nan
+    if len(np.unique(labels)) > 1:
+        silhouette = float(sklearn_metrics.silhouette_score(
+            matrix, labels, sample_size=min(SILHOUETTE_SAMPLE, len(matrix)), random_state=RANDOM_STATE
+        ))
+    return {'k': k, 'inertia': float(model.inertia_), 'silhouette': silhouette, 'centroids': centroids}
+
+
+def sweep_k(matrix, candidates=K_CANDIDATES, workers=None):
+    """
+    Ajusta un modelo por cada k candidato, en paralelo
+    Cada ajuste usa un solo hilo de BLAS/OpenMP para no sobresuscribir los núcleos.
+    Returns:
+        list: Un dict por k con inertia (codo), silhouette y centroids
+    """
+    from threadpoolctl import threadpool_limits
+
+    candidates = [k for k in candidates if k < len(matrix)]
+    workers = min(workers or cluster_workers(), len(candidates))
+    if workers <= 1:
+        return [_fit(matrix, k) for k in candidates]
+    with threadpool_limits(limits=1), ThreadPoolExecutor(max_workers=workers,
+                                                         thread_name_prefix='perfume-kmeans') as pool:
+        return list(pool.map(lambda k: _fit(matrix, k), candidates))
+
+
+def _family_names(centroids, columns, n_accords=2):
+    names = []
+    for i, centroid in enumerate(centroids):
+        top = np.argsort(-centroid, kind='stable')[:n_accords]
+        names.append(f"{i + 1}. " + ', '.join(columns[j].replace('accords.', '').title() for j in top))
+    return names
+
+
+def elbow_k(sweep):
+    """
+    k del codo de la inercia: el punto más alejado de la recta entre el primer y el último k
+    """
+    ks = np.array([fit['k'] for fit in sweep], dtype=float)
+    inertia = np.array([fit['inertia'] for fit in sweep])
+    if len(ks) < 3:
+        return int(ks[0])
+    # Ambos ejes a [0, 1] para que la distancia no dependa de las escalas
+    x = (ks - ks[0]) / (ks[-1] - ks[0])
+    y = (inertia - inertia.min()) / max(np.ptp(inertia), 1e-12)
+    distance = (y[0] + (y[-1] - y[0]) * x) - y
+    return int(ks[np.argmax(distance)])
+
+
+def fit_clusters(matrix, has_accords, columns):
+    """
+    Ajusta el modelo de familias: barrido de k, codo y silueta
+    El codo fija el mínimo de familias (la silueta sola favorece k chicos con acordes
+    dispersos) y entre los k desde el codo se elige el de mayor silueta.
+    Las familias se numeran de mayor a menor cantidad de perfumes.
+    Returns:
+        dict: k, centroids, labels, names, columns y sweep (k, inertia, silhouette)
+    """
+    training = matrix[has_accords]
+    sweep = sweep_k(training)
+    elbow = elbow_k(sweep)
+    best = max((fit for fit in sweep if fit['k'] >= elbow),
+               key=lambda fit: (np.nan_to_num(fit['silhouette'], nan=-1.0), -fit['k']))
+
+    # Numeración estable: la familia 1 es la más grande
+    sizes = np.bincount(assign_clusters(training, best['centroids']), minlength=best['k'])
+    centroids = best['centroids'][np.argsort(-sizes, kind='stable')]
+    return {
+        'k': best['k'],
+        'centroids': centroids,
+        'labels': assign_clusters(matrix, centroids),
+        'names': _family_names(centroids, columns),
+        'columns': list(columns),
+        'sweep': [{key: fit[key] for key in ('k', 'inertia', 'silhouette')} for fit in sweep],
+        'elbow': elbow,
+    }
+
+
+def _fit_model(frame):
+    matrix, index = accord_matrix(frame)
+    model = fit_clusters(matrix, index['has_accords'], index['columns'])
+    manifest = {key: model[key] for key in ('k', 'elbow', 'names', 'columns', 'sweep')}
+    manifest['fitted_rows'] = len(frame)
+    return {'centroids': model['centroids'], 'labels': model['labels']}, manifest
+
+
+def _extend_model(previous, tail):
+    # Filas agregadas al final: se asignan a los centroides existentes, sin reajustar
+    matrix, _ = accord_matrix(tail, previous['columns'])
+    labels = np.concatenate([previous['labels'], assign_clusters(matrix, previous['centroids'])])
+    manifest = {key: previous[key] for key in ('k', 'elbow', 'names', 'columns', 'sweep', 'fitted_rows')}
+    return {'centroids': previous['centroids'], 'labels': labels}, manifest
+
+
+def build_cluster_model(path=DATA_PATH, cluster_dir=CLUSTER_DIR):
+    """
+    Modelo de familias para el estado actual del CSV, desde disco o calculado y guardado
+    Si hay un modelo de una versión anterior del CSV (solo filas agregadas al final),
+    las filas nuevas se asignan a sus centroides sin volver a ajustar.
+    Returns:
+        dict: k, centroids, labels (una por fila del dataset), names, columns, sweep y fitted_rows
+    """
+    return build_model(path, cluster_dir, CLUSTER_PARAMS, _fit_model, _extend_model)
+
+
+@st.cache_resource(show_spinner="Agrupando perfumes en familias...")
+@single_flight
+def load_cluster_model(path=DATA_PATH):
+    """
+    Modelo de familias compartido entre sesiones (nunca se ajusta en cada rerun)
+    """
+    return build_cluster_model(path)
+
+
+@memoize_per_frame
+def get_cluster_labels(df):
+    """
+    Familia de cada perfume del DataFrame (centroide más cercano del modelo)
+    Returns:
+        np.ndarray: int16, -1 para perfumes sin acordes
+    """
+    model = load_cluster_model()
+    matrix, _ = accord_matrix(df, model['columns'])
+    return assign_clusters(matrix, model['centroids'])
+
+
+def _extend_cluster_labels(labels, tail, offset):
+    model = load_cluster_model()
+    matrix, _ = accord_matrix(tail, model['columns'])
+    return np.concatenate([labels, assign_clusters(matrix, model['centroids'])])
+
+
+register_extender(get_cluster_labels, _extend_cluster_labels)
+register_prefix_slicer(get_cluster_labels, lambda labels, n_rows: labels[:n_rows])
+
+
+def family_filter(container=None, key=None):
+    """
+    Selector de familias olfativas para la barra lateral de las páginas
+    Returns:
+        list | None: Familias elegidas, o None si están todas (sin filtro)
+    """
+    container = st.sidebar if container is None else container
+    names = load_cluster_model()['names']
+    selected = container.multiselect(
+        "Familias Olfativas",
+        names,
+        default=names,
+        key=key,
+        help="Grupos de perfumes con perfiles de acordes similares (k-means)"
+    )
+    if len(selected) == len(names):
+        return None
+    return [names.index(name) for name in selected]
+
+
+def family_mask(df, families):
+    """
+    Filas del DataFrame que pertenecen a las familias elegidas
+    Returns:
+        np.ndarray | None: Máscara booleana (None = sin filtro)
+    """
+    if families is None:
+        return None
+    return np.isin(get_cluster_labels(df), families)
+
+
+def family_row_ids(families, n_rows=CATALOG_ROWS):
+    """
+    Posiciones en el CSV (row_id del backend SQLite) de las familias elegidas
+    Usa las asignaciones guardadas, sin cargar el dataset.
+    """
+    if families is None:
+        return None
+    labels = np.asarray(load_cluster_model()['labels'][:n_rows])
+    return np.flatnonzero(np.isin(labels, families)).tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=DATA_PATH, help='CSV del dataset')
+    parser.add_argument('--dir', default=CLUSTER_DIR, help='Directorio de los modelos')
+    args = parser.parse_args(argv)
+
+    model = build_cluster_model(args.data, args.dir)
+    print(f"{model['k']} familias para {len(model['labels'])} perfumes "
+          f"(ajustado con {model['fitted_rows']} filas)")
+    for fit in model['sweep']:
+        marker = ' <- elegido' if fit['k'] == model['k'] else (' <- codo' if fit['k'] == model['elbow'] else '')
+        print(f"  k={fit['k']:>2}  inercia={fit['inertia']:10.2f}  silueta={fit['silhouette']:.3f}{marker}")
+
+
+if __name__ == '__main__':
+    main()
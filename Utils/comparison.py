@@ -0,0 +1,77 @@
+import numpy as np
+
+from Utils.affinity import AFFINITY_DIMENSIONS
+from Utils.data_loader import get_perfume_profiles
+
+# Perfumes que se comparan a la vez como máximo
+MAX_COMPARED = 8
+
+# Ejes del radar de acordes: unión de los acordes principales de cada perfume
+ACCORDS_PER_PERFUME = 5
+MAX_ACCORD_AXES = 12
+
+# Dimensiones de uso que se comparan además de los acordes (ver AFFINITY_DIMENSIONS)
+COMPARED_DIMENSIONS = ('season', 'longevity', 'sillage')
+
+
+def _accord_axes(accords, per_perfume, max_axes):
+    # Acordes principales de cada perfume sin ordenar filas completas
+    k = min(per_perfume, accords.shape[1])
+    top = np.argpartition(-accords, k - 1, axis=1)[:, :k]
+    axes = np.unique(top[np.take_along_axis(accords, top, axis=1) > 0])
+    if len(axes) > max_axes:
+        # Se conservan los de mayor intensidad en alguno de los perfumes
+        strongest = accords[:, axes].max(axis=0)
+        axes = axes[np.argpartition(-strongest, max_axes - 1)[:max_axes]]
+    # Ejes de mayor a menor intensidad promedio entre los perfumes comparados
+    return axes[np.argsort(-accords[:, axes].mean(axis=0), kind='stable')]
+
+
+def compare_perfumes(df, names_or_ids, per_perfume=ACCORDS_PER_PERFUME, max_axes=MAX_ACCORD_AXES):
+    """
+    Perfiles de varios perfumes listos para superponer en radares
+    Las filas salen de get_perfume_profiles y todas sus columnas se toman de una vez;
+    los votos de estación, longevidad y sillage se normalizan a porcentajes de cada
+    perfume en una sola operación sobre la matriz de los perfumes elegidos.
+    Args:
+        names_or_ids (list): Nombres o posiciones de los perfumes
+        per_perfume (int): Acordes principales de cada perfume que entran en los ejes
+        max_axes (int): Ejes máximos del radar de acordes
+    Returns:
+        dict: names (perfumes encontrados), missing (pedidos que no existen),
+              accords (labels y values, perfumes x ejes, intensidad 0-100),
+              dimensions (nombre -> label, levels y values en % de los votos del perfume)
+              y pyramid (nivel -> notas de cada perfume)
+    """
+    names_or_ids = list(names_or_ids)
+    profiles = get_perfume_profiles(df, names_or_ids)
+    found = profiles['rows'] >= 0
+    rows = profiles['rows'][found]
+
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    dimensions = [AFFINITY_DIMENSIONS[name] for name in COMPARED_DIMENSIONS]
+    vote_columns = [col for _, columns, _ in dimensions for col in columns]
+    values = df.iloc[rows].reindex(columns=accord_columns + vote_columns).to_numpy(dtype=np.float64, na_value=0)
+    accords, votes = values[:, :len(accord_columns)], values[:, len(accord_columns):]
+
+    # Votos de cada dimensión como % del total del perfume en esa dimensión
+    sizes = np.array([len(columns) for _, columns, _ in dimensions])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    totals = np.repeat(np.add.reduceat(votes, starts, axis=1), sizes, axis=1) if len(rows) else votes
+    shares = np.divide(votes * 100, totals, out=np.zeros_like(votes), where=totals > 0)
+
+    axes = _accord_axes(accords, per_perfume, max_axes) if len(rows) else np.array([], dtype=np.int64)
+    return {
+        'names': [str(name) for name in profiles['name'][found]],
+        'missing': [key for key, hit in zip(names_or_ids, found) if not hit],
+        'accords': {
+            'labels': [accord_columns[j].replace('accords.', '').title() for j in axes],
+            'values': accords[:, axes],
+        },
+        'dimensions': {
+            name: {'label': label, 'levels': levels, 'values': shares[:, start:start + size]}
+            for name, (label, _, levels), start, size in zip(COMPARED_DIMENSIONS, dimensions, starts, sizes)
+        },
+        'pyramid': {level: [notes for notes, hit in zip(per_level, found) if hit]
+                    for level, per_level in profiles['pyramid'].items()},
+    }
@@ -0,0 +1,248 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from Utils.indexes import memoize_per_frame
+
+# Intensidad mínima (%) para considerar presente un acorde en un perfume
+PRESENCE_THRESHOLD = 50
+
+# Límites de la minería: tamaño máximo de combinación y combinaciones frecuentes por nivel
+MAX_ITEMSET_SIZE = 4
+MAX_ITEMSETS_PER_LEVEL = 2000
+
+# Resultados guardados por DataFrame (uno por estado de filtros)
+RESULT_CACHE_SIZE = 32
+
+
+@memoize_per_frame
+def _get_cooccurrence_cache(df):
+    return {'lock': threading.Lock(), 'bitsets': {}, 'results': OrderedDict()}
+
+
+def _pack_rows(flags, words):
+    """Empaqueta un vector de bool en palabras uint64 (bit i = fila i)"""
+    packed = np.zeros(words * 8, dtype=np.uint8)
+    bits = np.packbits(flags, bitorder='little')
+    packed[:len(bits)] = bits
+    return packed.view(np.uint64)
+
+
+# Bits en 1 de cada byte: conteo para NumPy < 2.0, que no tiene np.bitwise_count
+_BYTE_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def _popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _BYTE_POPCOUNT[np.ascontiguousarray(words).view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def get_accord_bitsets(df, threshold=PRESENCE_THRESHOLD):
+    """
+    Presencia de cada acorde por perfume como bitsets (una fila de palabras uint64 por acorde)
+    Se calcula una vez por DataFrame compartido y umbral; 1M perfumes x 80 acordes ocupan 10 MB.
+    Returns:
+        dict: columns (acordes), bits (acordes x palabras, uint64) y rows (filas del DataFrame)
+    """
+    cache = _get_cooccurrence_cache(df)
+    with cache['lock']:
+        hit = cache['bitsets'].get(threshold)
+    if hit is not None:
+        return hit
+
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    words = (len(df) + 63) // 64
+    bits = np.zeros((len(accord_columns), words), dtype=np.uint64)
+    for i, col in enumerate(accord_columns):
+        values = df[col].to_numpy(dtype=np.float32, na_value=0)
+        bits[i] = _pack_rows(values >= threshold, words)
+
+    bitsets = {'columns': accord_columns, 'bits': bits, 'rows': len(df)}
+    with cache['lock']:
+        cache['bitsets'][threshold] = bitsets
+    return bitsets
+
+
+def _cached(df, key, compute):
+    cache = _get_cooccurrence_cache(df)
+    with cache['lock']:
+        if key in cache['results']:
+            cache['results'].move_to_end(key)
+            return cache['results'][key]
+    value = compute()
+    with cache['lock']:
+        cache['results'][key] = value
+        while len(cache['results']) > RESULT_CACHE_SIZE:
+            cache['results'].popitem(last=False)
+    return value
+
+
+def _mask_words(bitsets, mask):
+    """Máscara empaquetada y su huella para la clave de caché (None sin filtro)"""
+    if mask is None:
+        return None, None
+    mask_bits = _pack_rows(np.asarray(mask, dtype=bool), bitsets['bits'].shape[1])
+    return mask_bits, hashlib.blake2b(mask_bits.tobytes(), digest_size=16).hexdigest()
+
+
+def _filtered_bits(bitsets, mask_bits):
+    return bitsets['bits'] if mask_bits is None else bitsets['bits'] & mask_bits
+
+
+def _pair_counts(bits):
+    # Producto booleano Bᵀ·B sobre las palabras empaquetadas: AND + popcount por par
+    n_accords = len(bits)
+    counts = np.zeros((n_accords, n_accords), dtype=np.int64)
+    for i in range(n_accords):
+        counts[i, i:] = _popcount(bits[i] & bits[i:])
+    return counts + np.triu(counts, 1).T
+
+
+def cooccurrence(df, threshold=PRESENCE_THRESHOLD, mask=None):
+    """
+    Co-ocurrencia de acordes en el catálogo o en el filtro actual
+    Args:
+        threshold (float): Intensidad mínima para considerar presente un acorde
+        mask (array-like de bool): Filas del filtro actual (None = todo el DataFrame)
+    Returns:
+        dict: columns, counts (acordes x acordes; la diagonal es el soporte de cada
+              acorde) y perfumes (filas del filtro)
+    """
+    bitsets = get_accord_bitsets(df, threshold)
+    mask_bits, digest = _mask_words(bitsets, mask)
+
+    def compute():
+        perfumes = bitsets['rows'] if mask_bits is None else int(_popcount(mask_bits))
+        counts = _pair_counts(_filtered_bits(bitsets, mask_bits))
+        return {'columns': bitsets['columns'], 'counts': counts, 'perfumes': perfumes}
+
+    return _cached(df, ('cooccurrence', threshold, digest), compute)
+
+
+def pair_lift(matrix, accords=None):
+    """
+    Lift de cada par de acordes: P(a y b) / (P(a) P(b)); > 1 = aparecen juntos más que al azar
+    Args:
+        matrix (dict): Resultado de cooccurrence
+        accords (list): Columnas a incluir (None = todas)
+    Returns:
+        tuple: (lift, counts) como DataFrames acorde x acorde
+    """
+    names = [col.replace('accords.', '') for col in matrix['columns']]
+    counts = pd.DataFrame(matrix['counts'], index=names, columns=names)
+    if accords is not None:
+        keep = [col.replace('accords.', '') for col in accords]
+        counts = counts.loc[keep, keep]
+    support = np.diag(counts.to_numpy()).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lift = counts * matrix['perfumes'] / np.outer(support, support)
+    return lift, counts
+
+
+def _mine(bits, pair_counts, min_count, max_size):
+    supports = np.diag(pair_counts)
+    frequent = {(i,): int(supports[i]) for i in np.flatnonzero(supports >= min_count)}
+    # Los pares salen directamente de la matriz de co-ocurrencia
+    level = {(int(i), int(j)): int(pair_counts[i, j])
+             for i, j in zip(*np.nonzero(np.triu(pair_counts >= min_count, 1)))}
+    level = dict(sorted(level.items(), key=lambda item: -item[1])[:MAX_ITEMSETS_PER_LEVEL])
+    frequent.update(level)
+
+    size = 2
+    while level and size < max_size:
+        # Apriori: se extiende cada combinación con acordes posteriores cuyos
+        # subconjuntos de tamaño anterior también son frecuentes
+        next_level = {}
+        for itemset in level:
+            candidates = [j for j in range(itemset[-1] + 1, len(bits))
+                          if all(itemset[:k] + itemset[k + 1:] + (j,) in level for k in range(size))]
+            if not candidates:
+                continue
+            common = np.bitwise_and.reduce(bits[list(itemset)], axis=0)
+            counts = _popcount(common & bits[candidates])
+            for j, count in zip(candidates, counts):
+                if count >= min_count:
+                    next_level[itemset + (j,)] = int(count)
+        level = dict(sorted(next_level.items(), key=lambda item: -item[1])[:MAX_ITEMSETS_PER_LEVEL])
+        frequent.update(level)
+        size += 1
+    return frequent
+
+
+def frequent_itemsets(df, min_support=0.05, max_size=3, threshold=PRESENCE_THRESHOLD, mask=None):
+    """
+    Combinaciones frecuentes de acordes (Apriori sobre bitsets, conteo con popcount)
+    Args:
+        min_support (float): Proporción mínima de perfumes del filtro con la combinación
+        max_size (int): Tamaño máximo de combinación (hasta MAX_ITEMSET_SIZE)
+    Returns:
+        dict: itemsets (tupla de columnas -> perfumes), perfumes (filas del filtro) y columns
+    """
+    max_size = min(max_size, MAX_ITEMSET_SIZE)
+    bitsets = get_accord_bitsets(df, threshold)
+    mask_bits, digest = _mask_words(bitsets, mask)
+
+    def compute():
+        matrix = cooccurrence(df, threshold, mask)
+        min_count = max(1, int(np.ceil(min_support * matrix['perfumes'])))
+        mined = _mine(_filtered_bits(bitsets, mask_bits), matrix['counts'], min_count, max_size)
+        columns = matrix['columns']
+        return {
+            'itemsets': {tuple(columns[i] for i in itemset): count for itemset, count in mined.items()},
+            'perfumes': matrix['perfumes'],
+            'columns': columns,
+        }
+
+    return _cached(df, ('itemsets', threshold, digest, min_support, max_size), compute)
+
+
+def itemsets_table(mined, min_size=2):
+    """
+    Combinaciones frecuentes como tabla, de mayor a menor soporte
+    Returns:
+        pd.DataFrame: acordes, tamaño, perfumes y soporte
+    """
+    rows = [
+        {
+            'acordes': ' + '.join(col.replace('accords.', '') for col in itemset),
+            'tamaño': len(itemset),
+            'perfumes': count,
+            'soporte': count / mined['perfumes'] if mined['perfumes'] else np.nan,
+        }
+        for itemset, count in mined['itemsets'].items() if len(itemset) >= min_size
+    ]
+    table = pd.DataFrame(rows, columns=['acordes', 'tamaño', 'perfumes', 'soporte'])
+    return table.sort_values(['perfumes', 'tamaño'], ascending=[False, False], kind='stable',
+                             ignore_index=True)
+
+
+def association_rules(mined, min_confidence=0.5):
+    """
+    Reglas X -> y a partir de las combinaciones frecuentes (un acorde como consecuente)
+    Todos los soportes salen de las combinaciones ya contadas: no se recorren filas.
+    Returns:
+        pd.DataFrame: antecedente, consecuente, soporte, confianza y lift, de mayor a menor lift
+    """
+    itemsets, perfumes = mined['itemsets'], mined['perfumes']
+    rows = []
+    for itemset, count in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        for k, consequent in enumerate(itemset):
+            antecedent = itemset[:k] + itemset[k + 1:]
+            confidence = count / itemsets[antecedent]
+            if confidence < min_confidence:
+                continue
+            rows.append({
+                'antecedente': ' + '.join(col.replace('accords.', '') for col in antecedent),
+                'consecuente': consequent.replace('accords.', ''),
+                'soporte': count / perfumes,
+                'confianza': confidence,
+                'lift': confidence * perfumes / itemsets[(consequent,)],
+            })
+    table = pd.DataFrame(rows, columns=['antecedente', 'consecuente', 'soporte', 'confianza', 'lift'])
+    return table.sort_values(['lift', 'soporte'], ascending=False, kind='stable', ignore_index=True)
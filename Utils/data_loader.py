@@ -1,41 +1,336 @@
+import ast
+import os
+import re
+
 import pandas as pd
 import streamlit as st
+from pandas.api.types import union_categoricals
 import numpy as np
 
-@st.cache_data
-def load_perfume_data():
+from Utils.instrumentation import instrument
+from Utils.singleflight import single_flight
+
+# Copy-on-Write: los DataFrames cacheados se comparten entre sesiones sin copiarse;
+# cualquier modificación posterior crea su propia copia en lugar de alterar el original.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+DATA_PATH = os.environ.get('PERFUME_DATA_PATH', 'data/perfumes_ordenado.csv')
+
+# A partir de este tamaño el CSV no se carga entero: se ingiere por bloques (Utils.ingest)
+LARGE_SOURCE_BYTES = int(os.environ.get('PERFUME_LARGE_SOURCE_MB', 512)) * 1024 * 1024
+
+# Las páginas analizan solo los primeros perfumes, que tienen información completa
+CATALOG_ROWS = 521
+
+# Alias de columnas: las páginas usan estos nombres en lugar de renombrar (y copiar) el dataset
+RATING_COL = 'calificationNumbers.ratingValue'
+RATING_COUNT_COL = 'calificationNumbers.ratingCount'
+BEST_RATING_COL = 'calificationNumbers.bestRating'
+
+# Nombres que usan las páginas 2 y 3 para las columnas de calificación (prepare_rating_data)
+PAGE_ALIASES = {RATING_COL: 'rating', RATING_COUNT_COL: 'ratingCount', BEST_RATING_COL: 'bestRating'}
+
+GENDER_COLUMNS = ['gender.femenino', 'gender.masculino', 'gender.unisex',
+                  'gender.unisex_femenino', 'gender.unisex_masculino']
+
+# Score de precio ponderado: excelente precio = 5 ... extremadamente costoso = 1
+PRICE_COLUMNS = ['price.excelente_precio', 'price.buen_precio', 'price.precio_moderado',
+                 'price.ligeramente_costoso', 'price.extremadamente_costoso']
+PRICE_WEIGHTS = [5, 4, 3, 2, 1]
+
+# Niveles de la pirámide olfativa (listas de notas guardadas como texto)
+PYRAMID_COLUMNS = {
+    'salida': 'piramidFragrance.salida',
+    'corazon': 'piramidFragrance.corazon',
+    'base': 'piramidFragrance.base',
+    'ingredientes': 'piramidFragrance.ingredientes',
+}
+
+# Campos que trae cada descripción ("X de Marca es una fragancia de la familia olfativa
+# Cítrica para Hombres. X se lanzó en 1916. X fue creada por A y B."), extraídos al cargar
+YEAR_COL = 'launch_year'
+BRAND_COL = 'brand'
+FAMILY_COL = 'olfactive_family'
+PERFUMERS_COL = 'perfumers'
+FIELD_COLUMNS = [YEAR_COL, BRAND_COL, FAMILY_COL, PERFUMERS_COL]
+UNKNOWN_YEAR = 0  # launch_year es int16: sin año de lanzamiento en la descripción
+PERFUMER_SEPARATOR = ', '
+DESCRIPTION_PATTERNS = {
+    # La marca es lo que sigue al último " de " antes de "es una fragancia" (el nombre puede contener " de ")
+    BRAND_COL: re.compile(r' de ((?:(?! de ).)+?) es una fragancia'),
+    FAMILY_COL: re.compile(r'familia olfativa (.+?) para '),
+    YEAR_COL: re.compile(r'se lanzó en (\d{4})'),
+    PERFUMERS_COL: re.compile(r'(?:fue creada por|La Nariz detrás de esta fragr?ancia es) (.+?)\.(?: |$)'),
+}
+PERFUMER_SPLIT = re.compile(r',\s*|\s+y\s+')
+# PerfumeURL (".../perfume/<Marca>/<perfume>.html") identifica la marca en todas las filas
+URL_COL = 'PerfumeURL'
+URL_BRAND_PATTERN = re.compile(r'/perfume/([^/]+)/')
+
+NUMERIC_PREFIXES = [
+    'accords.', 'calificationNumbers.', 'calificationText.', 
+    'timeSeasons.', 'timeDay.', 'longevity.', 'sillage.', 
+    'gender.', 'price.'
+]
+
+def storage_backend():
+    """
+    Backend de almacenamiento: 'pandas' (por defecto) o 'sqlite' (PERFUME_BACKEND=sqlite)
+    """
+    return os.environ.get('PERFUME_BACKEND', 'pandas').lower()
+
+def artifacts_enabled():
+    """
+    Artefactos precalculados en disco (Utils.artifacts), salvo con PERFUME_ARTIFACTS=0
+    """
+    return os.environ.get('PERFUME_ARTIFACTS', '1') != '0'
+
+def is_large_source(path=DATA_PATH):
+    """
+    Indica si el CSV es demasiado grande para cargarlo entero en cada worker
+    """
+    try:
+        return os.path.getsize(path) >= LARGE_SOURCE_BYTES
+    except OSError:
+        return False
+
+def _brand_names(described, urls):
+    """
+    Marca de cada fila: la de la URL, con el nombre con que la escriben las descripciones
+    El segmento de la URL nunca falta, pero pierde acentos y signos ("Bath-Body-Works");
+    si ninguna descripción nombra la marca se usa el segmento con espacios.
+    """
+    slugs = urls.astype(object).str.extract(URL_BRAND_PATTERN, expand=False)
+    known = slugs.notna() & described.notna()
+    display = described[known].groupby(slugs[known].to_numpy()).first()
+    return slugs.map(display).fillna(slugs.str.replace('-', ' ')).fillna(described)
+
+def extract_description_fields(descriptions, urls=None):
+    """
+    Año, marca, familia olfativa y perfumistas de cada descripción
+    Cada campo es un str.extract con una regex compilada sobre toda la columna.
+    Args:
+        descriptions (pd.Series): Columna description
+        urls (pd.Series): Columna PerfumeURL, fuente principal de la marca (None = solo la descripción)
+    Returns:
+        pd.DataFrame: launch_year (int16, UNKNOWN_YEAR si falta), brand y olfactive_family
+                      (categóricas) y perfumers (nombres unidos por PERFUMER_SEPARATOR, o NaN)
+    """
+    text = descriptions.astype(object)
+    fields = {col: text.str.extract(pattern, expand=False) for col, pattern in DESCRIPTION_PATTERNS.items()}
+    years = pd.to_numeric(fields[YEAR_COL], errors='coerce').fillna(UNKNOWN_YEAR)
+    brands = fields[BRAND_COL] if urls is None else _brand_names(fields[BRAND_COL], urls)
+    return pd.DataFrame({
+        YEAR_COL: years.to_numpy(dtype=np.int16),
+        BRAND_COL: brands.astype('category'),
+        FAMILY_COL: fields[FAMILY_COL].astype('category'),
+        PERFUMERS_COL: fields[PERFUMERS_COL].str.replace(PERFUMER_SPLIT, PERFUMER_SEPARATOR, regex=True),
+    }, index=descriptions.index)
+
+def clean_perfume_frame(df):
+    """
+    Limpieza común del CSV: columnas numéricas como float, acordes sin valor en 0
+    y los campos de la descripción como columnas tipadas (extract_description_fields)
+    Args:
+        df (pd.DataFrame): Datos tal como vienen del CSV (completo o un bloque)
+    Returns:
+        pd.DataFrame: Datos limpios
+    """
+    # Asegurar que las columnas numéricas sean float (solo convierte las que no lo son)
+    numeric_columns = [col for col in df.columns if any(prefix in col for prefix in NUMERIC_PREFIXES)]
+    
+    for col in numeric_columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # Rellenar NaN en acordes con 0 (significa que no tienen ese acorde)
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    df = df.fillna({col: 0 for col in accord_columns})
+    
+    if 'description' in df.columns:
+        df = pd.concat([df, extract_description_fields(df['description'], df.get(URL_COL))], axis=1)
+    
+    # read_csv deja un bloque por columna: consolidar una vez evita la fragmentación
+    # (y su advertencia) al derivar columnas con assign
+    return df.copy()
+
+# Último DataFrame cargado por ruta y estado del CSV en ese momento
+# (permite incorporar filas agregadas al final sin recargar todo, ver refresh_perfume_data)
+_loaded = {}
+
+@st.cache_resource
+@single_flight
+def load_perfume_data(path=DATA_PATH):
     """
     Carga y procesa el dataset de perfumes
+    El DataFrame se comparte entre sesiones (cache_resource): tratarlo como solo lectura.
+    Si hay artefactos precalculados para el estado actual del CSV (Utils.artifacts)
+    se abren con mmap en lugar de parsear el CSV.
+    Args:
+        path (str): Ruta del CSV (por defecto el dataset del proyecto)
     Returns:
         pd.DataFrame: Dataset de perfumes limpio y procesado
     """
+    from Utils.appends import source_state
+
     try:
-        # Cargar datos
-        df = pd.read_csv('data/perfumes_ordenado.csv')
-        
-        # Limpieza básica
-        df = df.copy()
-        
-        # Asegurar que las columnas numéricas sean float
-        numeric_columns = [col for col in df.columns if any(prefix in col for prefix in [
-            'accords.', 'calificationNumbers.', 'calificationText.', 
-            'timeSeasons.', 'timeDay.', 'longevity.', 'sillage.', 
-            'gender.', 'price.'
-        ])]
-        
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Rellenar NaN en acordes con 0 (significa que no tienen ese acorde)
-        accord_columns = [col for col in df.columns if col.startswith('accords.')]
-        df[accord_columns] = df[accord_columns].fillna(0)
+        # DataFrame ya extendido por refresh_perfume_data para este mismo estado del CSV
+        loaded = _loaded.get(path)
+        if loaded is not None and _same_file(path, loaded['source']):
+            return loaded['frame']
         
+        # Cargar datos
+        source = source_state(path)
+        artifacts = None
+        if artifacts_enabled():
+            from Utils.artifacts import open_artifacts
+            artifacts = open_artifacts(path, source)
+        df = artifacts['frame'] if artifacts is not None else clean_perfume_frame(pd.read_csv(path))
+        _loaded[path] = {'frame': df, 'source': source, 'artifacts': artifacts}
         return df
         
     except Exception as e:
         st.error(f"Error al cargar los datos: {e}")
         return pd.DataFrame()
 
+def loaded_source(path=DATA_PATH):
+    """
+    Último DataFrame cargado para la ruta junto al estado del CSV y sus artefactos
+    Returns:
+        dict | None: frame, source (Utils.appends.source_state) y artifacts (o None)
+    """
+    return _loaded.get(path)
+
+def forget_perfume_data(path=DATA_PATH):
+    """
+    Descarta el DataFrame cargado para la ruta: la próxima load_perfume_data lo vuelve a leer
+    Además de la caché de Streamlit se olvida el último DataFrame cargado (_loaded),
+    que de otro modo load_perfume_data devolvería sin leer nada.
+    """
+    _loaded.pop(path, None)
+    load_perfume_data.clear()
+
+def _same_file(path, source):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns) == (source['size'], source['mtime_ns'])
+
+@single_flight
+def refresh_perfume_data(path=DATA_PATH):
+    """
+    Incorpora las filas agregadas al final del CSV sin volver a leerlo completo
+    Solo se parsean las filas nuevas; la matriz de acordes y el índice de nombres del
+    DataFrame anterior se extienden con ellas (Utils.indexes) en lugar de recalcularse.
+    Si el archivo se reescribió, se descarta la caché y la próxima carga es completa.
+    Returns:
+        int | None: Filas nuevas (0 si no hubo cambios), o None si hizo falta recarga completa
+    """
+    from Utils.appends import appended_since, read_tail, source_state
+    from Utils.indexes import extend_frame_indexes
+
+    current = load_perfume_data(path)
+    loaded = _loaded.get(path)
+    if loaded is None or _same_file(path, loaded['source']):
+        return 0
+    
+    offset = appended_since(path, loaded['source'])
+    if offset is None:
+        forget_perfume_data(path)
+        load_catalog.clear()
+        return None
+    
+    source = source_state(path)
+    tail = clean_perfume_frame(read_tail(path, offset))
+    tail.index = pd.RangeIndex(len(current), len(current) + len(tail))
+    frame = pd.concat([current, tail])
+    # concat deja como object las categóricas cuyas categorías difieren entre las partes
+    for col in current.columns[current.dtypes == 'category']:
+        if col in tail.columns and frame[col].dtype != 'category':
+            frame[col] = union_categoricals([current[col], tail[col]], ignore_order=True)
+    extend_frame_indexes(current, frame, tail)
+    _loaded[path] = {'frame': frame, 'source': source, 'artifacts': None}
+    
+    # Solo se invalidan el dataset y el catálogo: load_perfume_data devuelve el DataFrame
+    # extendido sin volver a leer el CSV. Los modelos (familias, mapa, búsqueda,
+    # duplicados) y los agregados en caché siguen valiendo y se extienden aparte
+    load_perfume_data.clear()
+    load_catalog.clear()
+    return len(tail)
+
+@st.cache_resource
+@single_flight
+def load_catalog(n_rows=CATALOG_ROWS):
+    """
+    Vista (sin copia) de los primeros perfumes del dataset, compartida por todas las páginas
+    Al ser el mismo objeto en todas las sesiones, los índices y agregados
+    calculados sobre ella (Utils.indexes) también se comparten.
+    Con catálogos grandes solo se leen esas filas del almacén columnar.
+    """
+    if is_large_source():
+        from Utils.ingest import read_store
+        return read_store(n_rows=n_rows)
+    from Utils.indexes import slice_frame_indexes
+
+    df = load_perfume_data()
+    catalog = df.iloc[:n_rows]
+    # Índices ya calculados (o mapeados desde los artefactos) para el dataset completo
+    slice_frame_indexes(df, catalog)
+    loaded = _loaded.get(DATA_PATH)
+    if loaded is not None and loaded['frame'] is df and loaded['artifacts'] is not None:
+        from Utils.artifacts import seed_catalog_indexes
+        seed_catalog_indexes(loaded['artifacts'], catalog)
+    return catalog
+
+def select_rows(df, mask, columns=None):
+    """
+    Selecciona filas sin copiar cuando es posible
+    Si la máscara cubre todas las filas o un rango contiguo, devuelve una vista
+    (slice posicional); en otro caso toma solo las filas y columnas pedidas.
+    Args:
+        df (pd.DataFrame): Dataset base
+        mask (array-like de bool): Filas a conservar
+        columns (list): Columnas necesarias (None = todas)
+    Returns:
+        pd.DataFrame
+    """
+    mask = np.asarray(mask, dtype=bool)
+    frame = df if columns is None else df[columns]
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return frame.iloc[0:0]
+    start, stop = positions[0], positions[-1] + 1
+    if stop - start == len(positions):
+        return frame.iloc[start:stop]
+    return frame.take(positions)
+
+def page_column(df, column):
+    """
+    Columna del dataset por su nombre original o por el alias de las páginas (PAGE_ALIASES)
+    """
+    return df[column] if column in df.columns else df[PAGE_ALIASES[column]]
+
+def dominant_gender(df):
+    """
+    Género con más votos por perfume (NaN si no tiene votos de género)
+    Returns:
+        pd.Series: Etiquetas 'femenino', 'masculino', 'unisex', ...
+    """
+    values = df[GENDER_COLUMNS].to_numpy(dtype=float)
+    no_votes = np.isnan(values).all(axis=1)
+    winners = np.argmax(np.where(np.isnan(values), -np.inf, values), axis=1)
+    labels = np.array([col.replace('gender.', '') for col in GENDER_COLUMNS], dtype=object)[winners]
+    labels[no_votes] = np.nan
+    return pd.Series(labels, index=df.index, name='gender_dominant')
+
+def value_score(df):
+    """
+    Score de precio ponderado por votos (más alto = mejor relación precio/calidad)
+    Returns:
+        pd.Series
+    """
+    return sum(df[col].fillna(0) * weight for col, weight in zip(PRICE_COLUMNS, PRICE_WEIGHTS))
+
+@instrument(kind='aggregate')
 def get_accord_stats(df):
     """
     Calcula estadísticas de acordes
@@ -60,6 +355,7 @@ def get_accord_stats(df):
     
     return stats
 
+@instrument(kind='filter')
 def filter_perfumes_by_accords(df, selected_accords, min_intensity=0):
     """
     Filtra perfumes basado en acordes seleccionados
@@ -79,81 +375,165 @@ def filter_perfumes_by_accords(df, selected_accords, min_intensity=0):
     
     return df[mask]
 
+def parse_notes(text):
+    """
+    Lista de notas de un nivel de la pirámide ("['bergamota', 'limón']" -> lista)
+    Returns:
+        list: Notas (vacía si no hay o el texto no es una lista)
+    """
+    if not isinstance(text, str) or not text.startswith('['):
+        return []
+    try:
+        notes = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return []
+    return [str(note) for note in notes] if isinstance(notes, list) else []
+
+def _profile_rows(index, names_or_ids):
+    # Posición de cada perfume pedido (nombre o posición); -1 si no existe
+    rows = np.full(len(names_or_ids), -1, dtype=np.int64)
+    for i, key in enumerate(names_or_ids):
+        if isinstance(key, (int, np.integer)) and not isinstance(key, bool):
+            rows[i] = key if 0 <= key < len(index['names']) else -1
+        else:
+            rows[i] = index['position'].get(key, -1)
+    return rows
+
+@instrument(kind='compute')
+def get_perfume_profiles(df, names_or_ids):
+    """
+    Perfiles de varios perfumes en una sola operación vectorizada
+    Las filas salen del índice de nombres (Utils.indexes.get_accord_index) y las
+    intensidades de acordes se toman de una vez para todas ellas; un único argsort
+    ordena los acordes presentes de cada perfume.
+    Args:
+        df (pd.DataFrame): Dataset
+        names_or_ids (list): Nombres o posiciones de los perfumes
+    Returns:
+        dict: Resultado columnar, una entrada por perfume pedido:
+              rows (-1 si no existe), name, description, rating, rating_count,
+              accords / intensities (acordes presentes de todos los perfumes, de mayor a
+              menor intensidad) con offsets (los del perfume i van de offsets[i] a
+              offsets[i + 1]) y pyramid (nivel -> lista de notas por perfume)
+    """
+    from Utils.indexes import get_accord_index
+
+    index = get_accord_index(df)
+    rows = _profile_rows(index, list(names_or_ids))
+    found = np.flatnonzero(rows >= 0)
+    taken = df.iloc[rows[found]]
+
+    # Intensidades de todos los perfumes pedidos en una matriz; los ausentes van al final
+    values = np.zeros((len(rows), len(index['columns'])), dtype=np.float64)
+    values[found] = taken[index['columns']].to_numpy(dtype=np.float64, na_value=0)
+    present = values > 0
+    order = np.argsort(np.where(present, -values, np.inf), axis=1, kind='stable')
+    counts = present.sum(axis=1)
+    keep = np.arange(len(index['columns'])) < counts[:, None]
+    accords = np.array([col.replace('accords.', '') for col in index['columns']], dtype=object)
+
+    def column(col, default=None):
+        result = np.full(len(rows), default, dtype=object)
+        if col in taken.columns:
+            result[found] = taken[col].to_numpy(dtype=object)
+        return result
+
+    return {
+        'rows': rows,
+        'name': column('name'),
+        'description': column('description', ''),
+        'rating': column(RATING_COL),
+        'rating_count': column(RATING_COUNT_COL),
+        'accords': accords[order[keep]],
+        'intensities': np.take_along_axis(values, order, axis=1)[keep],
+        'offsets': np.concatenate([[0], np.cumsum(counts)]),
+        'pyramid': {level: [parse_notes(text) for text in column(col)]
+                    for level, col in PYRAMID_COLUMNS.items()},
+    }
+
+def profile_accords(profiles, i):
+    """
+    Acordes del perfume i de get_perfume_profiles, de mayor a menor intensidad
+    Returns:
+        dict: acorde -> intensidad
+    """
+    start, stop = profiles['offsets'][i], profiles['offsets'][i + 1]
+    return dict(zip(profiles['accords'][start:stop], profiles['intensities'][start:stop].tolist()))
+
+@instrument(kind='compute')
 def get_perfume_profile(df, perfume_name):
     """
     Obtiene el perfil completo de un perfume específico
     """
-    perfume = df[df['name'] == perfume_name]
-    
-    if perfume.empty:
+    profiles = get_perfume_profiles(df, [perfume_name])
+    if profiles['rows'][0] < 0:
         return None
     
-    perfume = perfume.iloc[0]
-    
-    # Acordes del perfume
-    accord_columns = [col for col in df.columns if col.startswith('accords.')]
-    accords = {}
-    
-    for col in accord_columns:
-        value = perfume[col]
-        if pd.notna(value) and value > 0:
-            accords[col.replace('accords.', '')] = value
+    perfume = df.iloc[profiles['rows'][0]]
     
     # Información básica
     profile = {
         'name': perfume['name'],
         'description': perfume.get('description', ''),
-        'rating': perfume.get('calificationNumbers.ratingValue', None),
-        'rating_count': perfume.get('calificationNumbers.ratingCount', None),
-        'accords': dict(sorted(accords.items(), key=lambda x: x[1], reverse=True)),
-        'pyramid': {
-            'salida': perfume.get('piramidFragrance.salida', ''),
-            'corazon': perfume.get('piramidFragrance.corazon', ''),
-            'base': perfume.get('piramidFragrance.base', ''),
-            'ingredientes': perfume.get('piramidFragrance.ingredientes', '')
-        }
+        'rating': perfume.get(RATING_COL, None),
+        'rating_count': perfume.get(RATING_COUNT_COL, None),
+        'accords': profile_accords(profiles, 0),
+        'pyramid': {level: perfume.get(col, '') for level, col in PYRAMID_COLUMNS.items()}
     }
     
     return profile
 
+@instrument(kind='compute')
 def get_similar_perfumes(df, perfume_name, top_n=5):
     """
     Encuentra perfumes similares basado en acordes
+    Usa la matriz de acordes normalizada (Utils.indexes), que se calcula una vez por DataFrame,
+    o la tabla de vecinos precalculada si el DataFrame viene de los artefactos (Utils.artifacts).
     """
-    target_perfume = df[df['name'] == perfume_name]
+    from Utils.indexes import get_accord_index, get_neighbor_table, peek
+
+    index = get_accord_index(df)
+    target = index['position'].get(perfume_name)
     
-    if target_perfume.empty:
+    if target is None or not index['has_accords'][target]:
         return []
     
-    accord_columns = [col for col in df.columns if col.startswith('accords.')]
-    target_accords = target_perfume[accord_columns].iloc[0]
+    ratings = df['calificationNumbers.ratingValue'] if 'calificationNumbers.ratingValue' in df.columns else None
     
-    # Calcular similitud coseno
-    similarities = []
+    table = peek(get_neighbor_table, df)
+    if table is not None and top_n <= table['neighbors'].shape[1]:
+        neighbors = table['neighbors'][target][:top_n]
+        scores = table['scores'][target][:top_n]
+        return [
+            {
+                'name': index['names'][pos],
+                'similarity': float(score),
+                'rating': ratings.iloc[pos] if ratings is not None else 0
+            }
+            for pos, score in zip(neighbors, scores) if pos >= 0
+        ]
     
-    for idx, row in df.iterrows():
-        if row['name'] == perfume_name:
-            continue
-            
-        perfume_accords = row[accord_columns]
-        
-        # Similitud coseno
-        dot_product = np.dot(target_accords, perfume_accords)
-        norm_target = np.linalg.norm(target_accords)
-        norm_perfume = np.linalg.norm(perfume_accords)
-        
-        if norm_target > 0 and norm_perfume > 0:
-            similarity = dot_product / (norm_target * norm_perfume)
-            similarities.append({
-                'name': row['name'],
-                'similarity': similarity,
-                'rating': row.get('calificationNumbers.ratingValue', 0)
-            })
-    
-    # Ordenar por similitud y retornar top N
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    return similarities[:top_n]
+    # Similitud coseno contra todo el catálogo en una sola operación
+    similarity = index['matrix'] @ index['matrix'][target]
+    candidates = index['has_accords'] & (index['names'] != perfume_name)
+    positions = np.flatnonzero(candidates)
+    
+    # Top N sin ordenar el catálogo completo
+    if len(positions) > top_n:
+        best = np.argpartition(-similarity[positions], top_n - 1)[:top_n]
+        positions = positions[best]
+    positions = positions[np.argsort(-similarity[positions], kind='stable')]
+    
+    return [
+        {
+            'name': index['names'][pos],
+            'similarity': float(similarity[pos]),
+            'rating': ratings.iloc[pos] if ratings is not None else 0
+        }
+        for pos in positions[:top_n]
+    ]
 
+@instrument(kind='compute')
 def export_filtered_data(df, format='csv'):
     """
     Exporta datos filtrados en diferentes formatos
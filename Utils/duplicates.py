@@ -0,0 +1,420 @@
+"""
+Duplicados y flankers del catálogo: candidatos por LSH y verificación exacta
+
+Los catálogos scrapeados repiten perfumes y traen flankers (misma línea, otra
+concentración). Comparar todos los pares es imposible con 1M de filas, así que:
+  1. Las filas idénticas (mismo nombre de línea, marca y acordes) se agrupan por
+     hash y solo un representante de cada una sigue adelante.
+  2. Candidatos por nombre: MinHash sobre los 3-gramas del nombre de la línea
+     (slug de la URL sin concentración ni año), en bandas.
+  3. Candidatos por acordes: SimHash (hiperplanos aleatorios) de la matriz de acordes.
+  Ambas claves incluyen la marca, y dentro de cada cubeta cada fila solo se
+  compara con sus CANDIDATE_WINDOW - 1 vecinas: el costo es O(filas x ventana).
+  4. Cada candidato se verifica con la similitud exacta (Jaccard de los 3-gramas y
+     coseno de los acordes); los pares aceptados se unen en componentes conexas.
+Las firmas (por bloques de filas) y los candidatos de cada tabla corren en paralelo
+(duplicate_workers).
+El resultado (grupo de cada fila) se guarda con Utils.models por versión del CSV;
+una fila nueva puede duplicar a cualquiera anterior, así que las filas agregadas
+al final vuelven a calcular el modelo completo.
+
+Uso (desde la raíz del repositorio, para calcularlo antes de lanzar los workers):
+    python -m Utils.duplicates --output duplicados.csv
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from Utils.data_loader import BRAND_COL, DATA_PATH, RATING_COL, URL_COL, page_column
+from Utils.indexes import memoize_per_frame, register_extender, register_prefix_slicer
+from Utils.lazy_imports import lazy_import
+from Utils.models import accord_matrix, build_model
+from Utils.singleflight import single_flight
+
+# scipy solo se importa al calcular los grupos
+scipy_csgraph = lazy_import('scipy.sparse.csgraph')
+scipy_sparse = lazy_import('scipy.sparse')
+
+DUPLICATE_DIR = os.environ.get('PERFUME_DUPLICATE_DIR', 'data/duplicates')
+DUPLICATE_VERSION = 1
+
+# Nombre de la línea: slug de la URL ("/perfume/<marca>/<nombre>-<id>.html")
+URL_NAME_PATTERN = r'/perfume/([^/]+)/(.+)-\d+\.html'
+# Lo que distingue a un flanker de concentración (y el año de una reedición)
+CONCENTRATION_PATTERN = (r'\b(?:eau de parfum|eau de toilette|eau de cologne|eau fraiche|extrait de parfum'
+                         r'|extrait|parfum|perfume|edp|edt|edc|cologne|intense|concentree|legere'
+                         r'|(?:19|20)\d\d)\b')
+GENDER_PATTERN = r' para (?:hombres y mujeres|hombres|mujeres)$'
+
+# Shingles: 3-gramas de caracteres sobre los primeros MAX_KEY_CHARS del nombre
+SHINGLE_SIZE = 3
+MAX_KEY_CHARS = 64
+# MinHash: MINHASH_BANDS bandas de MINHASH_ROWS permutaciones (P(candidato) = 1 - (1 - J^r)^b)
+MINHASH_BANDS = 8
+MINHASH_ROWS = 2
+# Primo mayor que 2^32 para las permutaciones (a * x + b) mod p
+MINHASH_PRIME = 4294967311
+# SimHash: ACCORD_TABLES tablas de ACCORD_BITS hiperplanos
+ACCORD_TABLES = 4
+ACCORD_BITS = 8
+# Vecinas con que se compara cada fila dentro de una cubeta
+CANDIDATE_WINDOW = 16
+# Umbrales de la verificación exacta
+NAME_SIMILARITY = 0.5
+ACCORD_SIMILARITY = 0.85
+RANDOM_STATE = 0
+
+# Filas por bloque al calcular firmas y pares por bloque al verificar
+SIGNATURE_BLOCK_ROWS = 16384
+VERIFY_BLOCK_PAIRS = 262144
+
+# Lo que versiona el modelo además del estado del CSV
+DUPLICATE_PARAMS = {
+    'duplicate_version': DUPLICATE_VERSION,
+    'shingle_size': SHINGLE_SIZE,
+    'minhash': [MINHASH_BANDS, MINHASH_ROWS],
+    'simhash': [ACCORD_TABLES, ACCORD_BITS],
+    'window': CANDIDATE_WINDOW,
+    'thresholds': [NAME_SIMILARITY, ACCORD_SIMILARITY],
+}
+
+# Multiplicadores impares para mezclar enteros en claves de 64 bits
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53], dtype=np.uint64)
+_GRAM_BITS = 8 * SHINGLE_SIZE
+
+
+def duplicate_workers():
+    """
+    Hilos de las firmas y la verificación: PERFUME_DUPLICATE_WORKERS o los núcleos disponibles
+    """
+    configured = os.environ.get('PERFUME_DUPLICATE_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return max(1, os.cpu_count() or 1)
+
+
+def _parallel_map(func, items, workers):
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items)),
+                            thread_name_prefix='perfume-duplicates') as pool:
+        return list(pool.map(func, items))
+
+
+def _fold(texts):
+    return (texts.fillna('').astype(str).str.normalize('NFKD')
+            .str.encode('ascii', 'ignore').str.decode('ascii').str.lower())
+
+
+def line_keys(frame):
+    """
+    Nombre de la línea y marca de cada perfume, sin acentos ni concentración
+    Sale del slug de la URL; sin URL, del nombre sin el género.
+    Returns:
+        tuple: (nombres, marcas) como pd.Series de texto
+    """
+    names = _fold(frame['name']).str.replace(GENDER_PATTERN, '', regex=True)
+    brands = pd.Series('', index=frame.index)
+    if URL_COL in frame.columns:
+        slugs = frame[URL_COL].astype(object).str.extract(URL_NAME_PATTERN)
+        known = slugs[1].notna()
+        names = names.where(~known, _fold(slugs[1]).str.replace('-', ' '))
+        brands = brands.where(~known, _fold(slugs[0]))
+    names = (names.str.replace(CONCENTRATION_PATTERN, ' ', regex=True)
+             .str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip())
+    return names, brands
+
+
+def _shingles(keys):
+    """CSR (offsets, 3-gramas ordenados y sin repetir) de cada nombre"""
+    padded = np.array((' ' + keys + ' ').str.slice(0, MAX_KEY_CHARS).tolist(), dtype=f'S{MAX_KEY_CHARS}')
+    chars = padded.view(np.uint8).reshape(len(keys), MAX_KEY_CHARS).astype(np.uint32)
+    lengths = np.char.str_len(padded)
+    width = MAX_KEY_CHARS - SHINGLE_SIZE + 1
+    grams = np.zeros((len(keys), width), dtype=np.uint32)
+    for k in range(SHINGLE_SIZE):
+        grams = (grams << np.uint32(8)) | chars[:, k:k + width]
+    valid = np.arange(width) < (lengths - SHINGLE_SIZE + 1)[:, None]
+    rows = np.broadcast_to(np.arange(len(keys), dtype=np.uint64)[:, None], grams.shape)[valid]
+    codes = _sorted_unique((rows << np.uint64(_GRAM_BITS)) | grams[valid].astype(np.uint64))
+    counts = np.bincount((codes >> np.uint64(_GRAM_BITS)).astype(np.int64), minlength=len(keys))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return offsets, (codes & np.uint64((1 << _GRAM_BITS) - 1)).astype(np.uint32)
+
+
+def _minhash(offsets, grams, coefficients):
+    """Firma MinHash de cada fila (filas x permutaciones); sin shingles queda en el máximo"""
+    n_rows = len(offsets) - 1
+    signature = np.full((n_rows, len(coefficients)), np.iinfo(np.uint64).max, dtype=np.uint64)
+    present = np.flatnonzero(np.diff(offsets) > 0)
+    if len(present):
+        values = grams.astype(np.uint64)[:, None] * coefficients[:, 0] + coefficients[:, 1]
+        values %= np.uint64(MINHASH_PRIME)
+        signature[present] = np.minimum.reduceat(values, offsets[present], axis=0)
+    return signature
+
+
+def _bucket_keys(brands, columns):
+    """Clave de 64 bits de una cubeta: la marca mezclada con las columnas de la firma"""
+    keys = brands * _MIX[0]
+    for k in range(columns.shape[1]):
+        keys = keys ^ ((columns[:, k].astype(np.uint64) + np.uint64(k + 1)) * _MIX[1 + k % (len(_MIX) - 1)])
+    return keys
+
+
+def _window_pairs(keys, valid):
+    """Pares de filas en la misma cubeta a distancia < CANDIDATE_WINDOW (códigos i << 32 | j, i < j)"""
+    rows = np.flatnonzero(valid)
+    order = rows[np.argsort(keys[rows], kind='stable')].astype(np.uint64)
+    ordered = keys[order]
+    pairs = []
+    for distance in range(1, CANDIDATE_WINDOW):
+        same = np.flatnonzero(ordered[distance:] == ordered[:-distance])
+        if len(same) == 0:
+            # Ninguna cubeta tiene más de distance filas
+            break
+        left, right = order[same], order[same + distance]
+        pairs.append((np.minimum(left, right) << np.uint64(32)) | np.maximum(left, right))
+    return np.concatenate(pairs) if pairs else np.zeros(0, dtype=np.uint64)
+
+
+def _gather(offsets, grams, rows):
+    # 3-gramas de las filas pedidas, con el índice (en rows) de su dueño
+    lengths = offsets[rows + 1] - offsets[rows]
+    owners = np.repeat(np.arange(len(rows), dtype=np.uint64), lengths)
+    starts = np.repeat(offsets[rows] - (np.cumsum(lengths) - lengths), lengths)
+    return owners, grams[np.arange(lengths.sum()) + starts], lengths
+
+
+def name_jaccard(offsets, grams, left, right):
+    """
+    Jaccard exacto entre los 3-gramas de cada par de filas
+    Los 3-gramas de cada fila están ordenados y sin repetir, así que las claves
+    (par, 3-grama) de cada lado quedan ordenadas: la intersección es una búsqueda binaria.
+    """
+    left_owner, left_grams, left_lengths = _gather(offsets, grams, left)
+    right_owner, right_grams, right_lengths = _gather(offsets, grams, right)
+    left_keys = (left_owner << np.uint64(_GRAM_BITS)) | left_grams
+    right_keys = (right_owner << np.uint64(_GRAM_BITS)) | right_grams
+    found = np.searchsorted(right_keys, left_keys)
+    common = found < len(right_keys)
+    common[common] = right_keys[found[common]] == left_keys[common]
+    shared = np.bincount(left_owner[common].astype(np.int64), minlength=len(left))
+    union = left_lengths + right_lengths - shared
+    return np.divide(shared, union, out=np.zeros(len(left)), where=union > 0)
+
+
+def _sorted_unique(values):
+    # Ordenar y descartar repetidos es más rápido que np.unique (hash) con uint64
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def find_duplicates(keys, brands, matrix, has_accords, workers=None):
+    """
+    Grupos de duplicados y flankers
+    Args:
+        keys, brands (pd.Series): Nombre de la línea y marca de cada fila (line_keys)
+        matrix (np.ndarray): Acordes normalizados (get_accord_index)
+        has_accords (np.ndarray): Filas con algún acorde
+    Returns:
+        tuple: (grupo de cada fila (int32, la fila más baja del grupo; -1 = sin duplicados),
+                estadísticas del cálculo)
+    """
+    workers = workers or duplicate_workers()
+    n_rows = len(keys)
+    if n_rows == 0:
+        return np.zeros(0, dtype=np.int32), dict.fromkeys(
+            ('exact_copies', 'candidate_pairs', 'verified_pairs', 'group_count', 'grouped_rows'), 0)
+    brand_codes = pd.factorize(brands)[0].astype(np.uint64)
+
+    # 1. Filas idénticas: un solo representante por hash de nombre, marca y acordes
+    accord_hash = pd.util.hash_pandas_object(pd.DataFrame(matrix), index=False).to_numpy()
+    exact = pd.util.hash_array(keys.to_numpy(dtype=object)) ^ (accord_hash * _MIX[2]) ^ (brand_codes * _MIX[3])
+    _, representatives, inverse = np.unique(exact, return_index=True, return_inverse=True)
+    rep_keys = keys.iloc[representatives].reset_index(drop=True)
+    rep_brands = brand_codes[representatives]
+    rep_matrix = matrix[representatives]
+    rep_has_accords = np.asarray(has_accords)[representatives]
+
+    # 2. 3-gramas y firmas MinHash por bloques
+    rng = np.random.default_rng(RANDOM_STATE)
+    coefficients = np.stack([rng.integers(1, MINHASH_PRIME, MINHASH_BANDS * MINHASH_ROWS),
+                             rng.integers(0, MINHASH_PRIME, MINHASH_BANDS * MINHASH_ROWS)], axis=1).astype(np.uint64)
+    planes = rng.standard_normal((matrix.shape[1], ACCORD_TABLES * ACCORD_BITS)).astype(np.float32)
+
+    def signatures(start):
+        stop = min(len(representatives), start + SIGNATURE_BLOCK_ROWS)
+        offsets, grams = _shingles(rep_keys.iloc[start:stop])
+        simhash = (rep_matrix[start:stop] @ planes > 0).reshape(stop - start, ACCORD_TABLES, ACCORD_BITS)
+        return offsets, grams, _minhash(offsets, grams, coefficients), simhash @ (1 << np.arange(ACCORD_BITS))
+
+    blocks = _parallel_map(signatures, range(0, len(representatives), SIGNATURE_BLOCK_ROWS), workers)
+    counts = np.concatenate([np.diff(block[0]) for block in blocks])
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    grams = np.concatenate([block[1] for block in blocks])
+    minhash = np.concatenate([block[2] for block in blocks])
+    simhash = np.concatenate([block[3] for block in blocks])
+
+    # 3 y 4. Candidatos de cada banda MinHash y de cada tabla SimHash (cubetas dentro de la
+    # marca), verificados con la similitud exacta por bloques de pares. Cada tabla es una
+    # tarea: la memoria es la de sus pares, no la de todos los candidatos juntos.
+    has_shingles = counts > 0
+    tables = [(minhash[:, band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS], has_shingles)
+              for band in range(MINHASH_BANDS)]
+    tables += [(simhash[:, [table]], rep_has_accords) for table in range(ACCORD_TABLES)]
+
+    def verify(block):
+        left = (block >> np.uint64(32)).astype(np.int64)
+        right = (block & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        both = rep_has_accords[left] & rep_has_accords[right]
+        # El coseno es barato: el Jaccard solo se calcula para los pares que lo superan
+        cosine = np.einsum('ij,ij->i', rep_matrix[left], rep_matrix[right])
+        kept = np.flatnonzero(~both | (cosine >= ACCORD_SIMILARITY))
+        left, right, both = left[kept], right[kept], both[kept]
+        jaccard = name_jaccard(offsets, grams, left, right)
+        # Sin acordes en alguno de los dos solo cuenta el nombre idéntico
+        accepted = jaccard >= np.where(both, NAME_SIMILARITY, 1.0)
+        return (left[accepted].astype(np.uint64) << np.uint64(32)) | right[accepted].astype(np.uint64)
+
+    def candidates(table):
+        signature, valid = table
+        pairs = _sorted_unique(_window_pairs(_bucket_keys(rep_brands, signature), valid))
+        accepted = [verify(pairs[start:start + VERIFY_BLOCK_PAIRS])
+                    for start in range(0, len(pairs), VERIFY_BLOCK_PAIRS)]
+        return len(pairs), np.concatenate(accepted + [np.zeros(0, dtype=np.uint64)])
+
+    results = _parallel_map(candidates, tables, workers)
+    # Un par puede salir de varias tablas: se cuenta una sola vez
+    accepted = _sorted_unique(np.concatenate([result[1] for result in results]))
+    left = representatives[(accepted >> np.uint64(32)).astype(np.int64)]
+    right = representatives[(accepted & np.uint64(0xFFFFFFFF)).astype(np.int64)]
+
+    # 5. Componentes conexas de los pares aceptados más cada fila con su representante
+    rows = np.arange(n_rows)
+    copies = representatives[inverse] != rows
+    graph = scipy_sparse.coo_matrix(
+        (np.ones(len(left) + copies.sum(), dtype=np.int8),
+         (np.concatenate([left, rows[copies]]), np.concatenate([right, representatives[inverse][copies]]))),
+        shape=(n_rows, n_rows)
+    )
+    n_components, components = scipy_csgraph.connected_components(graph, directed=False)
+    first = np.full(n_components, n_rows, dtype=np.int64)
+    np.minimum.at(first, components, rows)
+    sizes = np.bincount(components, minlength=n_components)
+    groups = np.where(sizes[components] > 1, first[components], -1).astype(np.int32)
+
+    stats = {
+        'exact_copies': int(copies.sum()),
+        'candidate_pairs': int(sum(result[0] for result in results)),
+        'verified_pairs': int(len(left)),
+        'group_count': int((sizes > 1).sum()),
+        'grouped_rows': int((groups >= 0).sum()),
+    }
+    return groups, stats
+
+
+def _fit_model(frame):
+    keys, brands = line_keys(frame)
+    matrix, index = accord_matrix(frame)
+    groups, stats = find_duplicates(keys, brands, matrix, index['has_accords'])
+    return {'groups': groups}, stats
+
+
+def build_duplicate_model(path=DATA_PATH, duplicate_dir=DUPLICATE_DIR):
+    """
+    Grupos de duplicados para el estado actual del CSV, desde disco o calculados y guardados
+    Returns:
+        dict: groups (una por fila del dataset) más las estadísticas de find_duplicates
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    columns = ['name', URL_COL] + [col for col in header if col.startswith('accords.')]
+    return build_model(path, duplicate_dir, DUPLICATE_PARAMS, _fit_model, None, columns=columns)
+
+
+@st.cache_resource(show_spinner="Buscando perfumes duplicados...")
+@single_flight
+def load_duplicate_model(path=DATA_PATH):
+    """
+    Grupos de duplicados compartidos entre sesiones (nunca se calculan en cada rerun)
+    """
+    return build_duplicate_model(path)
+
+
+def _lookup(groups, positions):
+    # Las filas que el modelo todavía no cubre (agregadas después) quedan sin grupo
+    found = np.full(len(positions), -1, dtype=np.int32)
+    inside = positions < len(groups)
+    found[inside] = groups[positions[inside]]
+    return found
+
+
+@memoize_per_frame
+def get_duplicate_groups(df):
+    """
+    Grupo de duplicados de cada perfume del DataFrame (índice = posiciones del CSV)
+    Returns:
+        np.ndarray: int32, la posición más baja del grupo; -1 = sin duplicados
+    """
+    return _lookup(load_duplicate_model()['groups'], df.index.to_numpy())
+
+
+def _extend_duplicate_groups(groups, tail, offset):
+    return np.concatenate([groups, _lookup(load_duplicate_model()['groups'], tail.index.to_numpy())])
+
+
+register_extender(get_duplicate_groups, _extend_duplicate_groups)
+register_prefix_slicer(get_duplicate_groups, lambda groups, n_rows: groups[:n_rows])
+
+
+def duplicate_table(df, brand=None):
+    """
+    Perfumes del DataFrame que tienen duplicados o flankers, juntos por grupo
+    Returns:
+        pd.DataFrame: group, name, brand y rating (índice = posiciones del CSV)
+    """
+    groups = get_duplicate_groups(df)
+    rows = groups >= 0
+    if brand is not None:
+        rows &= (df[BRAND_COL] == brand).to_numpy()
+    rows = np.flatnonzero(rows)
+    # Solo los grupos con más de un miembro dentro de df
+    members = pd.Series(groups[rows]).value_counts()
+    rows = rows[np.isin(groups[rows], members.index[members > 1])]
+    rows = rows[np.lexsort((rows, groups[rows]))]
+    subset = df.iloc[rows]
+    return pd.DataFrame({
+        'group': groups[rows],
+        'name': subset['name'].to_numpy(),
+        'brand': subset[BRAND_COL].to_numpy(),
+        'rating': page_column(subset, RATING_COL).to_numpy(),
+    }, index=subset.index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=DATA_PATH, help='CSV del dataset')
+    parser.add_argument('--dir', default=DUPLICATE_DIR, help='Directorio de los modelos')
+    parser.add_argument('--output', help='CSV con row_id y duplicate_group de las filas con duplicados')
+    args = parser.parse_args(argv)
+
+    model = build_duplicate_model(args.data, args.dir)
+    print(f"{model['group_count']} grupos con {model['grouped_rows']} de {model['rows']} perfumes "
+          f"({model['exact_copies']} copias exactas, {model['candidate_pairs']} pares candidatos, "
+          f"{model['verified_pairs']} verificados)")
+    if args.output:
+        groups = np.asarray(model['groups'])
+        rows = np.flatnonzero(groups >= 0)
+        pd.DataFrame({'row_id': rows, 'duplicate_group': groups[rows]}).to_csv(args.output, index=False)
+        print(f"Grupos guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Mapa de aromas: proyección 2-D (PCA) de la matriz de acordes de todo el catálogo
+
+Los componentes se calculan una vez por versión del dataset con un SVD
+aleatorizado que recorre las filas por bloques (memoria acotada) y se guardan en
+disco (EMBEDDING_DIR) junto a las coordenadas de cada perfume, la densidad del
+mapa y la muestra de puntos que se dibuja. El mapa abre esos arreglos con mmap,
+así que carga al instante aun con 1M de puntos. Las filas agregadas al final se
+proyectan con los componentes guardados.
+
+Uso (desde la raíz del repositorio, para calcularlo antes de lanzar los workers):
+    python -m Utils.embedding
+"""
+import argparse
+import os
+
+import numpy as np
+import streamlit as st
+
+from Utils.data_loader import CATALOG_ROWS, DATA_PATH
+from Utils.indexes import memoize_per_frame, register_extender, register_prefix_slicer
+from Utils.models import accord_matrix, build_model
+from Utils.singleflight import single_flight
+
+EMBEDDING_DIR = os.environ.get('PERFUME_EMBEDDING_DIR', 'data/embedding')
+EMBEDDING_VERSION = 1
+
+# SVD aleatorizado: componentes, sobremuestreo del subespacio, iteraciones de potencia
+N_COMPONENTS = 2
+OVERSAMPLE = 8
+POWER_ITERATIONS = 4
+RANDOM_STATE = 0
+# Filas por bloque en cada pasada sobre la matriz
+BLOCK_ROWS = 65536
+
+# Mapa: celdas de la grilla de densidad y puntos que se dibujan como máximo (WebGL)
+DENSITY_BINS = 120
+MAP_MAX_POINTS = 50_000
+
+EMBEDDING_PARAMS = {
+    'embedding_version': EMBEDDING_VERSION,
+    'n_components': N_COMPONENTS,
+    'power_iterations': POWER_ITERATIONS,
+    'density_bins': DENSITY_BINS,
+    'map_max_points': MAP_MAX_POINTS,
+}
+
+# Región del mapa elegida en la página del mapa; las demás páginas la usan como filtro
+MAP_REGION_KEY = 'map_region'
+MAP_SELECTION_KEY = 'map_selection'
+
+
+def _blocks(matrix, rows):
+    for start in range(0, len(rows), BLOCK_ROWS):
+        yield matrix[rows[start:start + BLOCK_ROWS]]
+
+
+def _centered_gram(matrix, rows, mean, basis):
+    # Xcᵀ (Xc Q) por bloques: nunca se materializa la matriz centrada completa
+    product = np.zeros_like(basis)
+    for block in _blocks(matrix, rows):
+        centered = block - mean
+        product += centered.T @ (centered @ basis)
+    return product
+
+
+def randomized_pca(matrix, rows, n_components=N_COMPONENTS):
+    """
+    Componentes principales con SVD aleatorizado (iteración de subespacio por bloques)
+    La memoria es la de un bloque de filas más matrices de acordes x (k + sobremuestreo).
+    Args:
+        matrix (np.ndarray): Filas de acordes normalizadas
+        rows (np.ndarray): Posiciones de las filas que entran al ajuste (con acordes)
+    Returns:
+        dict: mean, components (k x acordes) y explained (proporción de varianza de cada uno)
+    """
+    n_features = matrix.shape[1]
+    mean = np.zeros(n_features, dtype=np.float64)
+    total_variance = 0.0
+    for block in _blocks(matrix, rows):
+        mean += block.sum(axis=0, dtype=np.float64)
+    mean /= max(len(rows), 1)
+    for block in _blocks(matrix, rows):
+        total_variance += float(((block - mean) ** 2).sum())
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    width = min(n_features, n_components + OVERSAMPLE)
+    basis, _ = np.linalg.qr(rng.standard_normal((n_features, width)))
+    for _ in range(POWER_ITERATIONS):
+        basis, _ = np.linalg.qr(_centered_gram(matrix, rows, mean, basis))
+
+    # Rayleigh-Ritz en el subespacio encontrado
+    values, vectors = np.linalg.eigh(basis.T @ _centered_gram(matrix, rows, mean, basis))
+    order = np.argsort(values)[::-1][:n_components]
+    components = (basis @ vectors[:, order]).T
+    # Signo determinista: la carga de mayor magnitud de cada componente es positiva
+    signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+    return {
+        'mean': mean.astype(np.float32),
+        'components': (components * signs[:, None]).astype(np.float32),
+        'explained': (values[order] / total_variance).tolist() if total_variance > 0 else [0.0] * len(order),
+    }
+
+
+def project(matrix, mean, components):
+    """
+    Coordenadas en el mapa (NaN para perfumes sin acordes)
+    Returns:
+        np.ndarray: filas x componentes, float32
+    """
+    coords = np.full((len(matrix), len(components)), np.nan, dtype=np.float32)
+    for start in range(0, len(matrix), BLOCK_ROWS):
+        block = matrix[start:start + BLOCK_ROWS]
+        has_accords = block.any(axis=1)
+        coords[start:start + len(block)][has_accords] = (block[has_accords] - mean) @ components.T
+    return coords
+
+
+def _map_layers(coords, candidates=None):
+    """
+    Densidad del mapa y muestra de puntos a dibujar (prioriza las zonas poco densas)
+    Args:
+        candidates (np.ndarray): Filas que pueden entrar en la muestra (None = todas)
+    Returns:
+        tuple: (arreglos density, x_edges, y_edges y sample; filas de la muestra)
+    """
+    valid = np.flatnonzero(~np.isnan(coords[:, 0]))
+    candidates = valid if candidates is None else candidates[~np.isnan(coords[candidates, 0])]
+    if len(valid) == 0:
+        edges = np.linspace(-1, 1, DENSITY_BINS + 1)
+        layers = {'density': np.zeros((DENSITY_BINS, DENSITY_BINS), dtype=np.int32),
+                  'x_edges': edges, 'y_edges': edges, 'sample': valid.astype(np.int64)}
+        return layers, layers['sample']
+
+    density, x_edges, y_edges = np.histogram2d(coords[valid, 0], coords[valid, 1], bins=DENSITY_BINS)
+    if len(candidates) <= MAP_MAX_POINTS:
+        sample = candidates
+    else:
+        # Muestreo ponderado sin reemplazo (Efraimidis-Spirakis) con peso 1 / densidad de
+        # la celda: las zonas densas se ven en la capa de densidad y los puntos aislados
+        # no se pierden
+        x, y = coords[candidates, 0], coords[candidates, 1]
+        bx = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, DENSITY_BINS - 1)
+        by = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, DENSITY_BINS - 1)
+        keys = np.log(np.random.default_rng(RANDOM_STATE).random(len(candidates))) * density[bx, by]
+        sample = np.sort(candidates[np.argpartition(-keys, MAP_MAX_POINTS - 1)[:MAP_MAX_POINTS]])
+    layers = {
+        'density': density.astype(np.int32),
+        'x_edges': x_edges,
+        'y_edges': y_edges,
+        'sample': sample.astype(np.int64),
+    }
+    return layers, sample
+
+
+def _fit_model(frame):
+    matrix, index = accord_matrix(frame)
+    pca = randomized_pca(matrix, np.flatnonzero(index['has_accords']))
+    coords = project(matrix, pca['mean'], pca['components'])
+    layers, sample = _map_layers(coords)
+    arrays = dict(layers, mean=pca['mean'], components=pca['components'], coords=coords)
+    manifest = {'columns': index['columns'], 'explained': pca['explained'], 'fitted_rows': len(frame),
+                'sample_names': [str(name) for name in frame['name'].to_numpy()[sample]]}
+    return arrays, manifest
+
+
+def _extend_model(previous, tail):
+    # Filas agregadas al final: se proyectan con los componentes guardados, sin reajustar.
+    # La nueva muestra sale de la anterior más las filas nuevas (nombres conocidos)
+    matrix, _ = accord_matrix(tail, previous['columns'])
+    offset = len(previous['coords'])
+    coords = np.concatenate([previous['coords'], project(matrix, previous['mean'], previous['components'])])
+    names = dict(zip(np.asarray(previous['sample']).tolist(), previous['sample_names']))
+    names.update(zip(range(offset, len(coords)), tail['name'].astype(str)))
+    candidates = np.concatenate([np.asarray(previous['sample']), np.arange(offset, len(coords))])
+    layers, sample = _map_layers(coords, candidates)
+    arrays = dict(layers, mean=previous['mean'], components=previous['components'], coords=coords)
+    manifest = {key: previous[key] for key in ('columns', 'explained', 'fitted_rows')}
+    manifest['sample_names'] = [names[int(row)] for row in sample]
+    return arrays, manifest
+
+
+def build_embedding(path=DATA_PATH, embedding_dir=EMBEDDING_DIR):
+    """
+    Mapa de aromas para el estado actual del CSV, desde disco o calculado y guardado
+    Returns:
+        dict: mean, components, explained, coords (una fila por perfume del dataset),
+              density, x_edges, y_edges, sample, sample_names, columns y fitted_rows
+    """
+    return build_model(path, embedding_dir, EMBEDDING_PARAMS, _fit_model, _extend_model)
+
+
+@st.cache_resource(show_spinner="Calculando el mapa de aromas...")
+@single_flight
+def load_embedding(path=DATA_PATH):
+    """
+    Mapa de aromas compartido entre sesiones (arreglos mapeados desde disco)
+    """
+    return build_embedding(path)
+
+
+@memoize_per_frame
+def get_map_coordinates(df):
+    """
+    Coordenadas de cada perfume del DataFrame en el mapa (componentes guardados)
+    Returns:
+        np.ndarray: filas x 2, float32 (NaN para perfumes sin acordes)
+    """
+    model = load_embedding()
+    matrix, _ = accord_matrix(df, model['columns'])
+    return project(matrix, model['mean'], model['components'])
+
+
+def _extend_map_coordinates(coords, tail, offset):
+    model = load_embedding()
+    matrix, _ = accord_matrix(tail, model['columns'])
+    return np.concatenate([coords, project(matrix, model['mean'], model['components'])])
+
+
+register_extender(get_map_coordinates, _extend_map_coordinates)
+register_prefix_slicer(get_map_coordinates, lambda coords, n_rows: coords[:n_rows])
+
+
+def region_from_selection(selection):
+    """
+    Región del mapa a partir de la selección de st.plotly_chart (caja o lazo)
+    Returns:
+        dict | None: {'boxes': [[x0, x1, y0, y1], ...], 'lassos': [[[x...], [y...]], ...]}
+    """
+    if not selection:
+        return None
+    boxes = [[min(box['x']), max(box['x']), min(box['y']), max(box['y'])]
+             for box in selection.get('box', []) if box.get('x') and box.get('y')]
+    lassos = [[list(lasso['x']), list(lasso['y'])]
+              for lasso in selection.get('lasso', []) if len(lasso.get('x', [])) >= 3]
+    if not boxes and not lassos:
+        return None
+    return {'boxes': boxes, 'lassos': lassos}
+
+
+def _inside_polygon(x, y, px, py):
+    # Regla par-impar (ray casting), vectorizada sobre los puntos
+    inside = np.zeros(len(x), dtype=bool)
+    j = len(px) - 1
+    for i in range(len(px)):
+        crosses = (py[i] > y) != (py[j] > y)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_cross = (px[j] - px[i]) * (y - py[i]) / (py[j] - py[i]) + px[i]
+        inside ^= crosses & (x < x_cross)
+        j = i
+    return inside
+
+
+def region_mask(coords, region):
+    """
+    Filas cuyas coordenadas caen en la región (unión de cajas y lazos)
+    Returns:
+        np.ndarray: Máscara booleana
+    """
+    x, y = coords[:, 0], coords[:, 1]
+    mask = np.zeros(len(coords), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        for x0, x1, y0, y1 in region['boxes']:
+            mask |= (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        for px, py in region['lassos']:
+            px, py = np.asarray(px), np.asarray(py)
+            # Primero la caja que contiene al lazo: el polígono solo se evalúa ahí
+            candidates = np.flatnonzero((x >= px.min()) & (x <= px.max()) & (y >= py.min()) & (y <= py.max()))
+            mask[candidates] |= _inside_polygon(x[candidates], y[candidates], px, py)
+    return mask
+
+
+def select_map_region(selection):
+    """
+    Guarda en la sesión la región seleccionada en el mapa (filtro de las demás páginas)
+    Una selección ya vista no vuelve a aplicarse, así que quitar la región desde la
+    barra lateral no la restaura en el siguiente rerun; vaciar la selección la quita.
+    """
+    region = region_from_selection(selection)
+    seen = st.session_state.get(MAP_SELECTION_KEY)
+    if region is not None and region != seen:
+        st.session_state[MAP_REGION_KEY] = region
+    elif region is None and seen is not None:
+        st.session_state.pop(MAP_REGION_KEY, None)
+    st.session_state[MAP_SELECTION_KEY] = region
+
+
+def map_region_filter(container=None):
+    """
+    Región elegida en el mapa de aromas (sesión actual), con un botón para quitarla
+    Returns:
+        dict | None: Región (ver region_from_selection) o None si no hay
+    """
+    region = st.session_state.get(MAP_REGION_KEY)
+    if region is None:
+        return None
+    container = st.sidebar if container is None else container
+    container.info("Filtro activo: región del Mapa de Aromas")
+    if container.button("Quitar región del mapa"):
+        st.session_state.pop(MAP_REGION_KEY, None)
+        return None
+    return region
+
+
+def map_mask(df, region):
+    """
+    Filas del DataFrame dentro de la región del mapa
+    Returns:
+        np.ndarray | None: Máscara booleana (None = sin filtro)
+    """
+    if region is None:
+        return None
+    return region_mask(get_map_coordinates(df), region)
+
+
+def map_row_ids(region, n_rows=CATALOG_ROWS):
+    """
+    Posiciones en el CSV (row_id del backend SQLite) dentro de la región del mapa
+    Usa las coordenadas guardadas, sin cargar el dataset.
+    """
+    if region is None:
+        return None
+    coords = np.asarray(load_embedding()['coords'][:n_rows])
+    return np.flatnonzero(region_mask(coords, region)).tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=DATA_PATH, help='CSV del dataset')
+    parser.add_argument('--dir', default=EMBEDDING_DIR, help='Directorio del mapa')
+    args = parser.parse_args(argv)
+
+    model = build_embedding(args.data, args.dir)
+    explained = ', '.join(f'{share:.1%}' for share in model['explained'])
+    print(f"Mapa de {len(model['coords'])} perfumes (ajustado con {model['fitted_rows']} filas), "
+          f"varianza explicada: {explained}; {len(model['sample'])} puntos en la muestra")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Filtros y resúmenes por los campos extraídos de las descripciones
+
+Año de lanzamiento, marca, familia olfativa y perfumistas se extraen una vez al
+cargar el dataset (Utils.data_loader.extract_description_fields) y se guardan en
+los artefactos, así que filtrar o agregar por ellos no vuelve a leer el texto.
+Los perfumistas, que pueden ser varios por perfume, se consultan con el CSR de
+Utils.indexes.get_perfumer_index. Con el backend SQLite los mismos filtros van
+como **filters a Utils.sqlite_backend.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from Utils.data_loader import BRAND_COL, RATING_COL, UNKNOWN_YEAR, YEAR_COL, page_column
+from Utils.indexes import get_perfumer_index
+
+# Marcas que muestra el resumen por marca
+TOP_BRANDS = 15
+
+
+def field_options(df):
+    """
+    Opciones de los filtros (mismas claves que sqlite_backend.filter_options)
+    Returns:
+        dict: years (mínimo y máximo conocidos, o None), brands y perfumers (orden alfabético)
+    """
+    years = df[YEAR_COL].to_numpy()
+    known = years[years != UNKNOWN_YEAR]
+    return {
+        'years': (int(known.min()), int(known.max())) if len(known) else None,
+        'brands': sorted(df[BRAND_COL].dropna().unique().tolist()),
+        'perfumers': get_perfumer_index(df)['names'].tolist(),
+    }
+
+
+def field_filters(options, container=None):
+    """
+    Controles de año de lanzamiento, marca y perfumista para la barra lateral
+    Returns:
+        dict: years (inclusivos), brands y perfumers; None en los que no filtran
+    """
+    container = st.sidebar if container is None else container
+    filters = {'years': None, 'brands': None, 'perfumers': None}
+    if options['years'] is not None and options['years'][0] < options['years'][1]:
+        low, high = options['years']
+        years = container.slider("Año de Lanzamiento", low, high, (low, high))
+        # Con el rango completo también se incluyen los perfumes sin año
+        if tuple(years) != (low, high):
+            filters['years'] = tuple(years)
+    filters['brands'] = container.multiselect("Marcas", options['brands'], placeholder="Todas") or None
+    filters['perfumers'] = container.multiselect(
+        "Perfumistas", options['perfumers'], placeholder="Todos",
+        help="Perfumes en los que participó alguno de los perfumistas elegidos"
+    ) or None
+    return filters
+
+
+def perfumer_mask(df, perfumers):
+    """
+    Filas con alguno de los perfumistas elegidos (recorre solo el CSR, sin texto)
+    Returns:
+        np.ndarray: Máscara booleana
+    """
+    index = get_perfumer_index(df)
+    hits = np.isin(index['names'], perfumers)[index['codes']]
+    # Aciertos acumulados: una fila coincide si su tramo de codes suma alguno
+    cumulative = np.concatenate([[0], np.cumsum(hits)])
+    offsets = np.asarray(index['offsets'])
+    return cumulative[offsets[1:]] > cumulative[offsets[:-1]]
+
+
+def field_mask(df, years=None, brands=None, perfumers=None):
+    """
+    Filas del DataFrame que cumplen los filtros de field_filters
+    Returns:
+        np.ndarray | None: Máscara booleana (None = sin filtro)
+    """
+    masks = []
+    if years is not None:
+        launch = df[YEAR_COL].to_numpy()
+        masks.append((launch >= years[0]) & (launch <= years[1]))
+    if brands is not None:
+        masks.append(df[BRAND_COL].isin(brands).to_numpy())
+    if perfumers is not None:
+        masks.append(perfumer_mask(df, perfumers))
+    if not masks:
+        return None
+    return np.logical_and.reduce(masks)
+
+
+def launch_year_counts(df):
+    """
+    Perfumes por año de lanzamiento (sin los que no tienen año)
+    Returns:
+        tuple: (años, conteos), de un año al siguiente sin huecos
+    """
+    years = df[YEAR_COL].to_numpy()
+    known = years[years != UNKNOWN_YEAR].astype(np.int64)
+    if len(known) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    first = known.min()
+    counts = np.bincount(known - first)
+    return np.arange(first, first + len(counts)), counts
+
+
+def brand_summary(df, top_n=TOP_BRANDS):
+    """
+    Marcas con más perfumes y su rating promedio
+    Returns:
+        pd.DataFrame: brand, perfumes y rating, de más a menos perfumes
+    """
+    codes, brands = pd.factorize(df[BRAND_COL])
+    known = codes >= 0
+    counts = np.bincount(codes[known], minlength=len(brands))
+    rating = page_column(df, RATING_COL).to_numpy(dtype=np.float64)
+    rated = known & ~np.isnan(rating)
+    rating_sums = np.bincount(codes[rated], weights=rating[rated], minlength=len(brands))
+    rating_counts = np.bincount(codes[rated], minlength=len(brands))
+    top = np.argsort(-counts, kind='stable')[:top_n]
+    return pd.DataFrame({
+        'brand': np.asarray(brands, dtype=object)[top],
+        'perfumes': counts[top],
+        'rating': np.divide(rating_sums[top], rating_counts[top],
+                            out=np.full(len(top), np.nan), where=rating_counts[top] > 0),
+    })
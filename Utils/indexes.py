@@ -0,0 +1,312 @@
+import functools
+import os
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import PERFUMER_SEPARATOR, PERFUMERS_COL, get_accord_stats
+from Utils.singleflight import single_flight
+
+# Índices y agregados derivados de un DataFrame compartido (cache_resource):
+# se calculan una vez por objeto y se liberan cuando el DataFrame desaparece.
+_memo = {}
+_memo_lock = threading.Lock()
+
+# Funciones memorizadas cuyo valor para las primeras filas se deriva del DataFrame completo
+_prefix_slicers = []
+# Funciones memorizadas cuyo valor se extiende con filas agregadas al final
+_extenders = []
+
+# Vecinos precalculados por perfume (get_neighbor_table) y bloque de filas por producto.
+# El costo es cuadrático: por encima de NEIGHBOR_TABLE_MAX_ROWS los artefactos no
+# incluyen la tabla y get_similar_perfumes calcula cada consulta (costo lineal)
+NEIGHBOR_K = 20
+NEIGHBOR_BLOCK_ROWS = 1024
+NEIGHBOR_TABLE_MAX_ROWS = int(os.environ.get('PERFUME_NEIGHBOR_TABLE_ROWS', 20_000))
+
+# Bordes de los histogramas de intensidad por acorde (página 1)
+ACCORD_HISTOGRAM_EDGES = 15
+
+
+def _forget(key):
+    with _memo_lock:
+        _memo.pop(key, None)
+
+
+def memoize_per_frame(func):
+    """
+    Memoriza func(df) por identidad del DataFrame
+    Pensado para los DataFrames cacheados, que son el mismo objeto en todas las
+    sesiones; las llamadas concurrentes se deduplican con single_flight.
+    """
+    compute = single_flight(func)
+
+    @functools.wraps(func)
+    def wrapper(df):
+        hit = peek(wrapper, df)
+        if hit is not None:
+            return hit
+        value = compute(df)
+        seed(wrapper, df, value)
+        return value
+    return wrapper
+
+
+def seed(func, df, value):
+    """
+    Registra en la memoria un valor ya calculado para df
+    Lo usan extend_frame_indexes, slice_frame_indexes y los artefactos precalculados
+    (Utils.artifacts), que entregan los índices sin recalcularlos.
+    """
+    key = (func.__qualname__, id(df))
+    try:
+        ref = weakref.ref(df, lambda _ref, key=key: _forget(key))
+    except TypeError:
+        return
+    with _memo_lock:
+        _memo[key] = (ref, value)
+
+
+def peek(func, df):
+    """Valor memorizado de func para df, o None si todavía no se calculó"""
+    with _memo_lock:
+        hit = _memo.get((func.__qualname__, id(df)))
+    return hit[1] if hit is not None and hit[0]() is df else None
+
+
+def _normalized_accords(df, accord_columns):
+    values = df[accord_columns].to_numpy(dtype=np.float32, na_value=0)
+    norms = np.linalg.norm(values, axis=1)
+    has_accords = norms > 0
+    matrix = np.divide(values, norms[:, None], out=np.zeros_like(values), where=has_accords[:, None])
+    return matrix, has_accords
+
+
+@memoize_per_frame
+def get_accord_index(df):
+    """
+    Matriz de acordes normalizada para búsquedas de similitud
+    Returns:
+        dict: columns, names, matrix (filas con norma L2 = 1, float32),
+              has_accords (filas con algún acorde) y position (nombre -> primera fila)
+    """
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    matrix, has_accords = _normalized_accords(df, accord_columns)
+
+    names = df['name'].to_numpy()
+    position = {}
+    for i, name in enumerate(names):
+        position.setdefault(name, i)
+
+    return {
+        'columns': accord_columns,
+        'names': names,
+        'matrix': matrix,
+        'has_accords': has_accords,
+        'position': position,
+    }
+
+
+@memoize_per_frame
+def get_cached_accord_stats(df):
+    """Estadísticas de acordes (get_accord_stats) memorizadas para el DataFrame compartido"""
+    return get_accord_stats(df)
+
+
+@memoize_per_frame
+def get_accord_histograms(df):
+    """
+    Histogramas de intensidad (valores > 0) por acorde, como los de la página 1
+    Returns:
+        dict: columna -> (conteos, bordes); solo acordes presentes en algún perfume
+    """
+    histograms = {}
+    for col in [col for col in df.columns if col.startswith('accords.')]:
+        values = df[col].dropna()
+        non_zero_values = values[values > 0]
+        if len(non_zero_values) > 0:
+            bins = np.linspace(non_zero_values.min(), non_zero_values.max(), ACCORD_HISTOGRAM_EDGES)
+            histograms[col] = np.histogram(non_zero_values, bins=bins)
+    return histograms
+
+
+@memoize_per_frame
+def get_neighbor_table(df):
+    """
+    Los NEIGHBOR_K perfumes más similares (coseno de acordes) de cada fila
+    Mismos candidatos que get_similar_perfumes: con acordes y con otro nombre.
+    El producto se hace por bloques de filas para acotar la memoria.
+    Returns:
+        dict: neighbors (posiciones, -1 = sin vecino) y scores, ambos de forma (filas, k)
+    """
+    index = get_accord_index(df)
+    matrix, has_accords = index['matrix'], index['has_accords']
+    name_codes = pd.factorize(index['names'])[0]
+    candidates = np.flatnonzero(has_accords)
+    n_rows = len(matrix)
+    k = min(NEIGHBOR_K, len(candidates))
+    neighbors = np.full((n_rows, NEIGHBOR_K), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, NEIGHBOR_K), dtype=np.float32)
+    if k == 0:
+        return {'neighbors': neighbors, 'scores': scores}
+
+    candidate_matrix = matrix[candidates]
+    candidate_codes = name_codes[candidates]
+    for start in range(0, n_rows, NEIGHBOR_BLOCK_ROWS):
+        rows = np.arange(start, min(n_rows, start + NEIGHBOR_BLOCK_ROWS))
+        rows = rows[has_accords[rows]]
+        if len(rows) == 0:
+            continue
+        similarity = matrix[rows] @ candidate_matrix.T
+        # Excluir el mismo perfume (mismo nombre); los nombres vacíos nunca coinciden
+        same = (name_codes[rows, None] == candidate_codes[None, :]) & (name_codes[rows, None] >= 0)
+        similarity[same] = -np.inf
+        top = np.argpartition(similarity, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        valid = np.isfinite(top_scores)
+        neighbors[rows, :k] = np.where(valid, candidates[top], -1)
+        scores[rows, :k] = np.where(valid, top_scores, 0)
+    return {'neighbors': neighbors, 'scores': scores}
+
+
+def _perfumer_csr(perfumers):
+    credits = perfumers.astype(object).str.split(PERFUMER_SEPARATOR)
+    counts = credits.str.len().fillna(0).to_numpy(dtype=np.int64)
+    codes, names = pd.factorize(credits.explode().dropna(), sort=True)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return {'names': np.asarray(names, dtype=object), 'codes': codes.astype(np.int32), 'offsets': offsets}
+
+
+@memoize_per_frame
+def get_perfumer_index(df):
+    """
+    Perfumistas de cada fila en formato CSR (una fila puede tener varios)
+    Returns:
+        dict: names (perfumistas en orden alfabético), codes (int32, posición en names)
+              y offsets (int64, filas + 1): los de la fila i son codes[offsets[i]:offsets[i + 1]]
+    """
+    return _perfumer_csr(df[PERFUMERS_COL])
+
+
+def extend_accord_index(index, tail, offset):
+    """
+    Extiende un índice de acordes con filas agregadas al final
+    Solo se normalizan las filas nuevas; el índice de nombres conserva la primera aparición.
+    Args:
+        index (dict): Índice del DataFrame anterior (get_accord_index)
+        tail (pd.DataFrame): Filas nuevas
+        offset (int): Posición de la primera fila nueva en el DataFrame extendido
+    """
+    matrix, has_accords = _normalized_accords(tail, index['columns'])
+    names = tail['name'].to_numpy()
+    position = dict(index['position'])
+    for i, name in enumerate(names, start=offset):
+        position.setdefault(name, i)
+    return dict(
+        index,
+        names=np.concatenate([index['names'], names]),
+        matrix=np.vstack([index['matrix'], matrix]),
+        has_accords=np.concatenate([index['has_accords'], has_accords]),
+        position=position,
+    )
+
+
+def register_extender(func, extender):
+    """
+    Declara cómo extender func(df) con filas agregadas al final sin recalcularlo
+    Args:
+        func: Función memorizada con memoize_per_frame
+        extender (callable): extender(valor_anterior, tail, offset) -> valor para el DataFrame
+            extendido, o None si hay que recalcularlo (p. ej. cambiaron las columnas)
+    """
+    _extenders.append((func, extender))
+
+
+register_extender(get_accord_index, extend_accord_index)
+
+
+def extend_perfumer_index(index, tail, offset):
+    """Agrega las filas nuevas al CSR de perfumistas (los nombres nuevos se intercalan en orden)"""
+    if PERFUMERS_COL not in tail.columns:
+        return None
+    added = _perfumer_csr(tail[PERFUMERS_COL])
+    names = np.union1d(index['names'], added['names']).astype(object)
+    remap_old = np.searchsorted(names, index['names']).astype(np.int32)
+    remap_new = np.searchsorted(names, added['names']).astype(np.int32)
+    return {
+        'names': names,
+        'codes': np.concatenate([remap_old[index['codes']], remap_new[added['codes']]]),
+        'offsets': np.concatenate([index['offsets'], index['offsets'][-1] + added['offsets'][1:]]),
+    }
+
+
+register_extender(get_perfumer_index, extend_perfumer_index)
+
+
+def extend_frame_indexes(old, new, tail):
+    """
+    Traslada al DataFrame extendido los índices ya calculados para el anterior
+    Los índices que no existían se calcularán bajo demanda, como siempre.
+    """
+    for func, extender in _extenders:
+        value = peek(func, old)
+        if value is not None:
+            value = extender(value, tail, len(old))
+        if value is not None:
+            seed(func, new, value)
+
+
+def register_prefix_slicer(func, slicer):
+    """
+    Declara cómo derivar func(view) de func(frame) cuando view son las primeras filas de frame
+    Args:
+        func: Función memorizada con memoize_per_frame
+        slicer (callable): slicer(valor_del_frame, n_filas) -> valor para la vista
+    """
+    _prefix_slicers.append((func, slicer))
+
+
+def _slice_accord_index(index, n_rows):
+    # La normalización de acordes es por fila: basta con recortar
+    return dict(
+        index,
+        names=index['names'][:n_rows],
+        matrix=index['matrix'][:n_rows],
+        has_accords=index['has_accords'][:n_rows],
+        position={name: pos for name, pos in index['position'].items() if pos < n_rows},
+    )
+
+
+register_prefix_slicer(get_accord_index, _slice_accord_index)
+
+
+def _slice_perfumer_index(index, n_rows):
+    # Solo los perfumistas que aparecen en las primeras filas, como al calcularlo sobre la vista
+    codes = index['codes'][:index['offsets'][n_rows]]
+    used = np.unique(codes)
+    return {
+        'names': index['names'][used],
+        'codes': np.searchsorted(used, codes).astype(np.int32),
+        'offsets': index['offsets'][:n_rows + 1],
+    }
+
+
+register_prefix_slicer(get_perfumer_index, _slice_perfumer_index)
+
+
+def slice_frame_indexes(frame, view):
+    """
+    Traslada a una vista de las primeras filas (load_catalog) los índices del DataFrame completo
+    Solo se derivan los ya calculados (o mapeados desde los artefactos); el resultado
+    es idéntico a calcularlos sobre la vista.
+    """
+    for func, slicer in _prefix_slicers:
+        value = peek(func, frame)
+        if value is not None and peek(func, view) is None:
+            seed(func, view, slicer(value, len(view)))
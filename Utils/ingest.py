@@ -0,0 +1,373 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import (
+    BRAND_COL, DATA_PATH, FAMILY_COL, NUMERIC_PREFIXES, RATING_COL, RATING_COUNT_COL, YEAR_COL,
+    clean_perfume_frame
+)
+from Utils.appends import appended_since, read_tail, source_state
+from Utils.singleflight import single_flight
+
+# Almacén columnar en disco (Parquet, un row group por bloque) junto a sus estadísticas
+STORE_DIR = os.environ.get('PERFUME_STORE_DIR', 'data/store')
+CHUNK_ROWS = int(os.environ.get('PERFUME_CHUNK_ROWS', 20_000))
+STORE_VERSION = 4
+
+# Las columnas de votos y porcentajes se guardan en float32 (la mitad de memoria);
+# las de calificación siguen en float64 para que los filtros por umbral sean exactos
+EXACT_PREFIXES = ('calificationNumbers.',)
+
+# Histograma de rating en pasos de 0.1
+RATING_BINS = np.linspace(0, 5, 51)
+
+VOTE_PREFIXES = ('calificationText.', 'timeSeasons.', 'timeDay.', 'longevity.',
+                 'sillage.', 'gender.', 'price.')
+
+
+def _numeric_columns(columns):
+    return [col for col in columns if any(prefix in col for prefix in NUMERIC_PREFIXES)]
+
+
+def typed_chunk(chunk):
+    """
+    Limpia un bloque del CSV y fija tipos compactos y estables entre bloques
+    Returns:
+        pd.DataFrame: Numéricas en float32/float64, año de lanzamiento en int16 y texto
+                      (también marca y familia, cuyas categorías cambian entre bloques) como object
+    """
+    chunk = clean_perfume_frame(chunk)
+    dtypes = {}
+    for col in _numeric_columns(chunk.columns):
+        dtypes[col] = 'float64' if col.startswith(EXACT_PREFIXES) else 'float32'
+    if YEAR_COL in chunk.columns:
+        dtypes[YEAR_COL] = 'int16'
+    for col in chunk.columns:
+        if col not in dtypes:
+            dtypes[col] = 'object'
+    return chunk.astype(dtypes)
+
+
+def iter_typed_chunks(path=DATA_PATH, chunk_rows=CHUNK_ROWS, offset=0):
+    """
+    Lee el CSV por bloques de chunk_rows filas con tipos fijos
+    La memoria usada depende del tamaño del bloque, no del tamaño del archivo.
+    Args:
+        offset (int): Byte donde empezar (filas agregadas al final, ver Utils.appends)
+    Yields:
+        pd.DataFrame: Un bloque tipado por iteración
+    """
+    # Las columnas de texto se leen como str para que un bloque sin valores no cambie de tipo
+    header = pd.read_csv(path, nrows=0).columns
+    text_columns = {col: str for col in header if col not in _numeric_columns(header)}
+    if offset:
+        chunks = read_tail(path, offset, chunksize=chunk_rows, dtype=text_columns)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_rows, dtype=text_columns)
+    for chunk in chunks:
+        yield typed_chunk(chunk)
+
+
+class CatalogStats:
+    """
+    Estadísticas del catálogo acumuladas bloque a bloque
+    Frecuencia e intensidad de acordes, suma de votos por columna e histograma de rating.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.rated_rows = 0
+        self.total_reviews = 0.0
+        self.rating_histogram = np.zeros(len(RATING_BINS) - 1, dtype=np.int64)
+        self.accord_frequency = {}
+        self.accord_intensity_sum = {}
+        self.accord_max = {}
+        self.vote_sums = {}
+
+    def update(self, chunk):
+        """Incorpora un bloque tipado"""
+        self.rows += len(chunk)
+
+        rating = chunk[RATING_COL].to_numpy(dtype=np.float64)
+        rated = ~np.isnan(rating)
+        self.rated_rows += int(rated.sum())
+        self.rating_histogram += np.histogram(rating[rated], bins=RATING_BINS)[0]
+        self.total_reviews += float(np.nansum(chunk[RATING_COUNT_COL].to_numpy(dtype=np.float64)))
+
+        accord_columns = [col for col in chunk.columns if col.startswith('accords.')]
+        if accord_columns:
+            values = chunk[accord_columns].to_numpy(dtype=np.float64)
+            positive = values > 0
+            frequency = positive.sum(axis=0)
+            intensity = np.where(positive, values, 0).sum(axis=0)
+            peak = np.where(positive, values, 0).max(axis=0, initial=0)
+            for col, f, s, m in zip(accord_columns, frequency, intensity, peak):
+                self.accord_frequency[col] = self.accord_frequency.get(col, 0) + int(f)
+                self.accord_intensity_sum[col] = self.accord_intensity_sum.get(col, 0.0) + float(s)
+                self.accord_max[col] = max(self.accord_max.get(col, 0.0), float(m))
+
+        vote_columns = [col for col in chunk.columns if col.startswith(VOTE_PREFIXES)]
+        if vote_columns:
+            sums = np.nansum(chunk[vote_columns].to_numpy(dtype=np.float64), axis=0)
+            for col, total in zip(vote_columns, sums):
+                self.vote_sums[col] = self.vote_sums.get(col, 0.0) + float(total)
+
+    def accord_stats(self):
+        """
+        Estadísticas de acordes con el formato de get_accord_stats
+        (sin mediana ni desviación, que no se pueden acumular de forma exacta)
+        """
+        stats = {}
+        for col, frequency in self.accord_frequency.items():
+            if frequency > 0:
+                stats[col] = {
+                    'frequency': frequency,
+                    'mean_intensity': self.accord_intensity_sum[col] / frequency,
+                    'max_intensity': self.accord_max[col],
+                    'perfume_percentage': frequency / self.rows * 100,
+                }
+        return stats
+
+    @classmethod
+    def from_dict(cls, summary):
+        """Reconstruye los acumuladores guardados por to_dict (para ingestas incrementales)"""
+        stats = cls()
+        acc = summary['accumulators']
+        stats.rows = acc['rows']
+        stats.rated_rows = acc['rated_rows']
+        stats.total_reviews = acc['total_reviews']
+        stats.rating_histogram = np.asarray(acc['rating_histogram'], dtype=np.int64)
+        stats.accord_frequency = dict(acc['accord_frequency'])
+        stats.accord_intensity_sum = dict(acc['accord_intensity_sum'])
+        stats.accord_max = dict(acc['accord_max'])
+        stats.vote_sums = dict(acc['vote_sums'])
+        return stats
+
+    def to_dict(self):
+        return {
+            'accumulators': {
+                'rows': self.rows,
+                'rated_rows': self.rated_rows,
+                'total_reviews': self.total_reviews,
+                'rating_histogram': self.rating_histogram.tolist(),
+                'accord_frequency': self.accord_frequency,
+                'accord_intensity_sum': self.accord_intensity_sum,
+                'accord_max': self.accord_max,
+                'vote_sums': self.vote_sums,
+            },
+            'rows': self.rows,
+            'rated_rows': self.rated_rows,
+            'total_reviews': self.total_reviews,
+            'rating_bins': RATING_BINS.tolist(),
+            'rating_histogram': self.rating_histogram.tolist(),
+            'accord_stats': self.accord_stats(),
+            'vote_sums': self.vote_sums,
+        }
+
+
+def store_path(path=DATA_PATH, store_dir=STORE_DIR):
+    """Directorio del almacén columnar correspondiente a un CSV"""
+    return os.path.join(store_dir, os.path.splitext(os.path.basename(path))[0])
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Para el almacén columnar se necesita pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+
+def _write_json(path, payload):
+    # Escritura atómica: los lectores nunca ven un JSON a medio escribir
+    tmp = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(payload, fh, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _write_part(chunks, part_path, stats, schema=None, on_chunk=None):
+    """
+    Escribe una parte del almacén (un row group por bloque) y acumula sus estadísticas
+    Returns:
+        int: Filas escritas
+    """
+    pa, pq = _require_pyarrow()
+    tmp = f'{part_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            stats.update(chunk)
+            if schema is None:
+                # Esquema fijo desde el primer bloque: texto siempre como string aunque venga vacío
+                schema = pa.schema([
+                    (col, pa.string() if dtype == object else pa.from_numpy_dtype(dtype))
+                    for col, dtype in chunk.dtypes.items()
+                ])
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+            if on_chunk is not None:
+                on_chunk(stats.rows, chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp, part_path)
+    return rows
+
+
+def _part_name(number):
+    return f'part-{number:05d}.parquet'
+
+
+def ingest_catalog(path=DATA_PATH, store_dir=STORE_DIR, chunk_rows=CHUNK_ROWS, on_chunk=None):
+    """
+    Ingesta completa por bloques: tipa cada bloque, acumula estadísticas y lo escribe al almacén
+    El almacén se escribe en un directorio temporal y se publica con un rename atómico.
+    Args:
+        on_chunk (callable): Recibe (filas procesadas, bloque) tras cada bloque (progreso)
+    Returns:
+        dict: Estadísticas del catálogo completo
+    """
+    _require_pyarrow()
+    target = store_path(path, store_dir)
+    tmp = f'{target}.tmp-{os.getpid()}-{threading.get_ident()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    state = source_state(path)
+    stats = CatalogStats()
+    rows = _write_part(iter_typed_chunks(path, chunk_rows), os.path.join(tmp, _part_name(0)),
+                       stats, on_chunk=on_chunk)
+
+    summary = stats.to_dict()
+    _write_json(os.path.join(tmp, 'stats.json'), summary)
+    _write_json(os.path.join(tmp, 'meta.json'), {
+        'store_version': STORE_VERSION,
+        'source': os.path.abspath(path),
+        'state': state,
+        'parts': [{'file': _part_name(0), 'rows': rows}] if rows else [],
+        'rows': rows,
+    })
+
+    old = f'{target}.old-{os.getpid()}'
+    if os.path.exists(target):
+        os.rename(target, old)
+    os.rename(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return summary
+
+
+def append_to_store(path=DATA_PATH, store_dir=STORE_DIR, chunk_rows=CHUNK_ROWS, on_chunk=None):
+    """
+    Ingesta incremental: si el CSV solo creció por el final, procesa únicamente las filas nuevas
+    Las filas nuevas se escriben como una parte más y las estadísticas se actualizan a partir
+    de los acumuladores guardados, sin releer el resto del catálogo. meta.json se reescribe al
+    final, así que los lectores ven el almacén anterior o el nuevo, nunca uno intermedio.
+    Returns:
+        int | None: Filas agregadas, o None si el cambio no es un agregado al final
+    """
+    directory = store_path(path, store_dir)
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    meta = _read_json(meta_path)
+    if meta.get('store_version') != STORE_VERSION or meta.get('source') != os.path.abspath(path):
+        return None
+    offset = appended_since(path, meta.get('state'))
+    if offset is None:
+        return None
+
+    _, pq = _require_pyarrow()
+    state = source_state(path)
+    stats = CatalogStats.from_dict(_read_json(os.path.join(directory, 'stats.json')))
+    schema = pq.read_schema(os.path.join(directory, meta['parts'][0]['file'])) if meta['parts'] else None
+    part = _part_name(len(meta['parts']))
+    rows = _write_part(iter_typed_chunks(path, chunk_rows, offset=offset), os.path.join(directory, part),
+                       stats, schema=schema, on_chunk=on_chunk)
+
+    _write_json(os.path.join(directory, 'stats.json'), stats.to_dict())
+    parts = meta['parts'] + ([{'file': part, 'rows': rows}] if rows else [])
+    _write_json(meta_path, dict(meta, state=state, parts=parts, rows=meta['rows'] + rows))
+    return rows
+
+
+def _store_meta(path, store_dir):
+    meta = os.path.join(store_path(path, store_dir), 'meta.json')
+    return _read_json(meta) if os.path.exists(meta) else None
+
+
+def _store_is_current(path, store_dir):
+    meta = _store_meta(path, store_dir)
+    if meta is None or meta.get('store_version') != STORE_VERSION:
+        return False
+    stat = os.stat(path)
+    return (meta['state']['size'], meta['state']['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+
+
+@single_flight
+def ensure_store(path=DATA_PATH, store_dir=STORE_DIR):
+    """
+    Deja el almacén al día con el CSV
+    Si solo se agregaron filas al final, las ingiere de forma incremental;
+    si el archivo se reescribió, reconstruye el almacén completo.
+    Returns:
+        str: Directorio del almacén
+    """
+    if not _store_is_current(path, store_dir):
+        if append_to_store(path, store_dir) is None:
+            ingest_catalog(path, store_dir)
+    return store_path(path, store_dir)
+
+
+def catalog_stats(path=DATA_PATH, store_dir=STORE_DIR):
+    """Estadísticas del catálogo completo calculadas durante la ingesta"""
+    return _read_json(os.path.join(ensure_store(path, store_dir), 'stats.json'))
+
+
+def read_store(columns=None, n_rows=None, path=DATA_PATH, store_dir=STORE_DIR):
+    """
+    Lee del almacén solo las columnas y filas pedidas
+    Args:
+        columns (list): Columnas a leer (None = todas)
+        n_rows (int): Primeras filas a leer (None = todas); solo se leen los row groups necesarios
+    Returns:
+        pd.DataFrame
+    """
+    pa, pq = _require_pyarrow()
+    directory = ensure_store(path, store_dir)
+    files = [os.path.join(directory, part['file']) for part in _read_json(os.path.join(directory, 'meta.json'))['parts']]
+
+    batches = []
+    remaining = n_rows
+    for file in files:
+        parquet = pq.ParquetFile(file)
+        if remaining is None:
+            batches.extend(parquet.read(columns=columns).to_batches())
+            continue
+        for batch in parquet.iter_batches(batch_size=min(n_rows, CHUNK_ROWS), columns=columns):
+            batches.append(batch.slice(0, remaining))
+            remaining -= min(remaining, batch.num_rows)
+            if remaining == 0:
+                break
+        if remaining == 0:
+            break
+    if not batches:
+        return pd.DataFrame(columns=columns)
+    frame = pa.Table.from_batches(batches).to_pandas()
+    # Mismos tipos que load_perfume_data para los campos categóricos de la descripción
+    categorical = [col for col in (BRAND_COL, FAMILY_COL) if col in frame.columns]
+    return frame.astype({col: 'category' for col in categorical}) if categorical else frame
@@ -0,0 +1,249 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from Utils.memory import memory_accounting_enabled, render_memory_panel
+
+METRICS_PATH = os.environ.get('PERFUME_METRICS_FILE', 'metrics/perf_metrics.prom')
+
+# Registros del rerun en curso; una lista por ejecución del script
+_records = contextvars.ContextVar('perfume_rerun_records', default=None)
+_rerun = contextvars.ContextVar('perfume_rerun_info', default=None)
+# Último rerun de cada página en este proceso: es lo que se exporta
+_snapshot = {}
+_snapshot_lock = threading.Lock()
+
+
+def metrics_enabled():
+    """
+    La exportación de métricas se activa con PERFUME_METRICS=1
+    """
+    return os.environ.get('PERFUME_METRICS') == '1'
+
+
+def figure_bytes_enabled():
+    """
+    Medir el JSON de cada figura la serializa otra vez: solo con PERFUME_FIGURE_BYTES=1
+    """
+    return os.environ.get('PERFUME_FIGURE_BYTES') == '1'
+
+
+def diagnostics_enabled():
+    """
+    El panel de diagnóstico es oculto: se activa con ?diagnostics=1 o PERFUME_DIAGNOSTICS=1
+    """
+    if os.environ.get('PERFUME_DIAGNOSTICS') == '1':
+        return True
+    try:
+        return st.query_params.get('diagnostics') == '1'
+    except Exception:
+        return False
+
+
+def _row_count(value):
+    if value is None or isinstance(value, (str, bytes)):
+        return None
+    shape = getattr(value, 'shape', None)
+    if shape is not None and len(shape) > 0:
+        return int(shape[0])
+    if isinstance(value, (list, tuple, dict)):
+        return len(value)
+    return None
+
+
+def _figure_bytes(value):
+    info = _rerun.get()
+    if _records.get() is None or info is None or not info['figure_bytes']:
+        return None
+    if hasattr(value, 'to_plotly_json') and hasattr(value, 'to_json'):
+        return len(value.to_json())
+    return None
+
+
+def _record(stage, kind, elapsed, rows_in=None, rows_out=None, figure_bytes=None):
+    records = _records.get()
+    if records is None:
+        return
+    records.append({
+        'stage': stage,
+        'kind': kind,
+        'seconds': elapsed,
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'figure_bytes': figure_bytes,
+    })
+
+
+def instrument(stage=None, kind='compute'):
+    """
+    Decorador que registra tiempo, filas de entrada/salida y bytes de figura
+    Args:
+        stage (str): Nombre de la etapa (por defecto el nombre de la función)
+        kind (str): Tipo de etapa: load, filter, aggregate, figure, compute
+    """
+    def decorator(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _records.get() is None:
+                return func(*args, **kwargs)
+            rows_in = _row_count(args[0]) if args else None
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            figure_bytes = _figure_bytes(result) if kind == 'figure' else None
+            rows_out = None if figure_bytes is not None else _row_count(result)
+            _record(name, kind, elapsed, rows_in, rows_out, figure_bytes)
+            return result
+        return wrapper
+    return decorator
+
+
+def record_stage(stage, kind, started, rows_in=None, rows_out=None, figure=None):
+    """
+    Registra una etapa iniciada en `started` (time.perf_counter()) que termina ahora
+    Pensado para scripts de página donde envolver el bloque en un with es invasivo.
+    """
+    if _records.get() is None:
+        return
+    elapsed = time.perf_counter() - started
+    _record(stage, kind, elapsed, rows_in, rows_out, _figure_bytes(figure) if figure is not None else None)
+
+
+@contextmanager
+def track(stage, kind='compute', rows_in=None):
+    """
+    Context manager equivalente a instrument para bloques de código
+    El bloque puede completar rows_out o figure en el dict que se entrega.
+    """
+    info = {'rows_in': rows_in, 'rows_out': None, 'figure': None}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        elapsed = time.perf_counter() - start
+        figure_bytes = _figure_bytes(info['figure']) if info['figure'] is not None else None
+        _record(stage, kind, elapsed, info['rows_in'], info['rows_out'], figure_bytes)
+
+
+def begin_rerun(page):
+    """
+    Marca el inicio de un rerun de la página y reinicia sus registros
+    Si ni la exportación ni el panel están activos, la instrumentación no registra nada.
+    """
+    _records.set([] if metrics_enabled() or diagnostics_enabled() else None)
+    _rerun.set({'page': page, 'start': time.perf_counter(), 'figure_bytes': figure_bytes_enabled()})
+
+
+def get_rerun_metrics():
+    """
+    Registros acumulados en el rerun actual
+    """
+    return list(_records.get() or [])
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(snapshot):
+    """
+    Serializa el último rerun de cada página en formato de texto de Prometheus
+    Args:
+        snapshot (dict): página -> {'records': registros, 'rerun_seconds': duración}
+    Returns:
+        str: Exposición con un único # TYPE por métrica y una muestra por serie
+    """
+    lines = ['# TYPE perfume_rerun_duration_seconds gauge']
+    for page, rerun in sorted(snapshot.items()):
+        lines.append(f'perfume_rerun_duration_seconds{{page="{_escape(page)}"}} {rerun["rerun_seconds"]:.6f}')
+
+    # Una etapa que se ejecuta varias veces en el rerun suma su tiempo y conserva su último registro
+    stages = {}
+    for page, rerun in sorted(snapshot.items()):
+        for r in rerun['records']:
+            key = (page, r['stage'], r['kind'])
+            previous = stages.get(key)
+            stages[key] = dict(r, seconds=r['seconds'] + (previous['seconds'] if previous else 0.0))
+
+    series = {
+        'perfume_stage_duration_seconds': 'seconds',
+        'perfume_stage_rows_in': 'rows_in',
+        'perfume_stage_rows_out': 'rows_out',
+        'perfume_figure_json_bytes': 'figure_bytes',
+    }
+    for metric, field in series.items():
+        samples = [(key, r) for key, r in stages.items() if r[field] is not None]
+        if not samples:
+            continue
+        lines.append(f'# TYPE {metric} gauge')
+        for (page, stage, kind), r in samples:
+            labels = f'page="{_escape(page)}",stage="{_escape(stage)}",kind="{_escape(kind)}"'
+            value = f'{r[field]:.6f}' if field == 'seconds' else str(r[field])
+            lines.append(f'{metric}{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _write_metrics(page, records, rerun_seconds):
+    """
+    Reemplaza el archivo de métricas por la foto actual (escritura atómica: tmp + rename)
+    """
+    with _snapshot_lock:
+        _snapshot[page] = {'records': records, 'rerun_seconds': rerun_seconds}
+        text = format_prometheus(_snapshot)
+        directory = os.path.dirname(METRICS_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f'{METRICS_PATH}.tmp-{os.getpid()}'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+        os.replace(tmp, METRICS_PATH)
+
+
+def finish_rerun():
+    """
+    Cierra el rerun: exporta las métricas y dibuja los paneles ocultos si están activos
+    """
+    info = _rerun.get()
+    records = get_rerun_metrics()
+    if info is None:
+        return records
+    rerun_seconds = time.perf_counter() - info['start']
+    if metrics_enabled() and records:
+        try:
+            _write_metrics(info['page'], records, rerun_seconds)
+        except OSError:
+            pass  # las métricas nunca deben romper la página
+    if diagnostics_enabled():
+        render_diagnostics_panel(records, rerun_seconds)
+    if memory_accounting_enabled():
+        render_memory_panel()
+    return records
+
+
+def render_diagnostics_panel(records, rerun_seconds):
+    """
+    Panel lateral con el costo de cada etapa del rerun actual
+    """
+    import pandas as pd
+
+    with st.sidebar.expander("Diagnóstico de rendimiento", expanded=False):
+        st.caption(f"Rerun completo: {rerun_seconds * 1000:.1f} ms")
+        if not records:
+            st.write("Sin etapas instrumentadas en este rerun.")
+            return
+        table = pd.DataFrame(records)
+        table['ms'] = (table['seconds'] * 1000).round(2)
+        table['KB figura'] = (table['figure_bytes'] / 1024).round(1)
+        table = table.sort_values('ms', ascending=False)
+        st.dataframe(
+            table[['stage', 'kind', 'ms', 'rows_in', 'rows_out', 'KB figura']],
+            use_container_width=True,
+            hide_index=True
+        )
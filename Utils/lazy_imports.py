@@ -0,0 +1,45 @@
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Módulo diferido: la importación real ocurre en el primer acceso a un atributo
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_target'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_target']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_lazy_target'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """
+    Devuelve un accesor perezoso para el módulo indicado
+    Args:
+        name (str): Nombre completo del módulo (p. ej. 'plotly.express')
+    Returns:
+        LazyModule: Proxy que importa el módulo al primer uso
+    """
+    return LazyModule(name)
+
+
+def is_loaded(module):
+    """
+    Indica si un accesor perezoso ya realizó la importación real
+    """
+    if isinstance(module, LazyModule):
+        return module.__dict__['_lazy_target'] is not None
+    return True
@@ -0,0 +1,101 @@
+import numpy as np
+
+from Utils.data_loader import RATING_COL, RATING_COUNT_COL, page_column, value_score
+from Utils.indexes import get_cached_accord_stats, memoize_per_frame
+from Utils.ranking import bayesian_rating, positive_reception
+
+# Primer bloque de posiciones que revisa top_k con filtro (se duplica en cada vuelta)
+SCAN_BLOCK = 256
+
+
+def _value_score(df):
+    return df['value_score'] if 'value_score' in df.columns else value_score(df)
+
+
+# Tablas de posiciones disponibles: nombre -> (etiqueta, score por fila; NaN = fuera de la tabla).
+# Para agregar una tabla basta con una entrada: su orden se calcula una vez por DataFrame.
+LEADERBOARDS = {
+    'rating': ('Rating', lambda df: page_column(df, RATING_COL)),
+    'rating_count': ('Número de reseñas', lambda df: page_column(df, RATING_COUNT_COL)),
+    # Priors del DataFrame completo: el orden es fijo y se precalcula (ver Utils.ranking.best_rated
+    # para priors del filtro actual)
+    'bayesian_rating': ('Rating ajustado por reseñas', bayesian_rating),
+    'positive_reception': ('Recepción positiva (Wilson)', positive_reception),
+    'value_score': ('Relación calidad-precio', _value_score),
+}
+
+
+@memoize_per_frame
+def get_leaderboard_scores(df):
+    """
+    Score de cada fila en cada tabla de posiciones
+    Returns:
+        dict: tabla -> np.ndarray float (NaN en las filas sin score)
+    """
+    return {board: np.asarray(score(df), dtype=float) for board, (_, score) in LEADERBOARDS.items()}
+
+
+@memoize_per_frame
+def get_sort_orders(df):
+    """
+    Posiciones de las filas ordenadas de mayor a menor score, una por tabla de posiciones
+    Las filas sin score (NaN) quedan fuera; en los empates se conserva el orden del CSV.
+    Returns:
+        dict: tabla -> array de posiciones
+    """
+    orders = {}
+    for board, scores in get_leaderboard_scores(df).items():
+        order = np.argsort(-scores, kind='stable')
+        orders[board] = order[:np.count_nonzero(~np.isnan(scores))]
+    return orders
+
+
+def top_k(df, board, k=10, mask=None):
+    """
+    Posiciones de las k filas con mayor score que cumplen el filtro
+    Recorre el orden precalculado en bloques crecientes y se detiene apenas
+    encuentra k filas de la máscara: no ordena ni recorre todo el catálogo.
+    Args:
+        df (pd.DataFrame): DataFrame compartido (el orden se memoriza por objeto)
+        board (str): Tabla de posiciones (ver LEADERBOARDS)
+        k (int): Cantidad de filas
+        mask (array-like de bool): Filtro actual por posición (None = sin filtro)
+    Returns:
+        np.ndarray: Posiciones, de mayor a menor score
+    """
+    order = get_sort_orders(df)[board]
+    if mask is None:
+        return order[:k]
+    mask = np.asarray(mask, dtype=bool)
+    found = []
+    needed = k
+    start, block = 0, max(SCAN_BLOCK, 4 * k)
+    while needed > 0 and start < len(order):
+        positions = order[start:start + block]
+        hits = positions[mask[positions]][:needed]
+        found.append(hits)
+        needed -= len(hits)
+        start += block
+        block *= 2
+    return np.concatenate(found) if found else order[:0]
+
+
+def leaderboard(df, board, k=10, mask=None, columns=('name',)):
+    """
+    Top k de una tabla de posiciones bajo el filtro actual
+    Returns:
+        pd.DataFrame: Columnas pedidas más 'score', de mayor a menor
+    """
+    positions = top_k(df, board, k, mask)
+    rows = df[list(columns)].take(positions)
+    return rows.assign(score=get_leaderboard_scores(df)[board][positions])
+
+
+@memoize_per_frame
+def get_accord_leaderboard(df):
+    """
+    Acordes ordenados de más a menos frecuentes, con sus estadísticas
+    Returns:
+        list: Pares (columna, estadísticas) como get_accord_stats
+    """
+    return sorted(get_cached_accord_stats(df).items(), key=lambda x: x[1]['frequency'], reverse=True)
@@ -0,0 +1,196 @@
+import os
+import sys
+import threading
+import weakref
+
+import numpy as np
+import streamlit as st
+
+# Registro de DataFrames/ndarrays vivos: id -> metadatos + weakref
+_registry = {}
+_lock = threading.Lock()
+
+SHARED_SESSION = 'compartido'
+
+try:
+    from numpy.lib.array_utils import byte_bounds as _byte_bounds
+except ImportError:  # numpy < 2.0
+    _byte_bounds = np.byte_bounds
+
+
+def memory_accounting_enabled():
+    """
+    Modo de contabilidad de memoria: ?memory=1 o PERFUME_MEMORY_ACCOUNTING=1
+    """
+    if os.environ.get('PERFUME_MEMORY_ACCOUNTING') == '1':
+        return True
+    try:
+        return st.query_params.get('memory') == '1'
+    except Exception:
+        return False
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        ctx = None
+    return ctx.session_id if ctx is not None else 'sin-sesion'
+
+
+def _call_site(depth):
+    frame = sys._getframe(depth + 1)
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+def _buffers(obj):
+    """
+    Rangos de memoria [inicio, fin) de los buffers que respaldan el objeto
+    """
+    if isinstance(obj, np.ndarray):
+        arrays = [obj]
+    else:
+        arrays = []
+        for _, series in obj.items():
+            values = series.array
+            data = getattr(values, '_ndarray', None)
+            if data is None:
+                data = getattr(values, '_data', None)
+            if isinstance(data, np.ndarray):
+                arrays.append(data)
+            else:
+                codes = getattr(values, 'codes', None)
+                if isinstance(codes, np.ndarray):
+                    arrays.append(codes)
+    ranges = []
+    for arr in arrays:
+        if arr.nbytes == 0:
+            continue
+        low, high = _byte_bounds(arr)
+        ranges.append((low, high))
+    return ranges
+
+
+def _nbytes(obj):
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    return int(obj.memory_usage(index=True, deep=False).sum())
+
+
+def _overlap(ranges, other):
+    total = 0
+    for low, high in ranges:
+        for o_low, o_high in other:
+            total += max(0, min(high, o_high) - max(low, o_low))
+    return total
+
+
+def track_frame(obj, label, parent=None, shared=False):
+    """
+    Registra un DataFrame o ndarray vivo para la contabilidad de memoria
+    Args:
+        obj: DataFrame o ndarray a contabilizar
+        label (str): Nombre lógico (p. ej. 'df_filtered')
+        parent: Objeto del que deriva; permite detectar copias innecesarias
+        shared (bool): True si el objeto es compartido entre sesiones (cache_resource)
+    Returns:
+        El mismo objeto, para poder encadenar la llamada
+    """
+    if obj is None or not memory_accounting_enabled():
+        return obj
+    ranges = _buffers(obj)
+    nbytes = _nbytes(obj)
+    shared_bytes = _overlap(ranges, _buffers(parent)) if parent is not None else 0
+    rows = len(obj)
+    parent_rows = len(parent) if parent is not None else None
+
+    flag = ''
+    if parent is not None:
+        if shared_bytes == 0 and rows == parent_rows:
+            flag = 'copia innecesaria'
+        elif shared_bytes == 0:
+            flag = 'copia de filtro'
+        elif shared_bytes >= sum(high - low for low, high in ranges):
+            flag = 'vista'
+
+    entry = {
+        'session': SHARED_SESSION if shared else _session_id(),
+        'label': label,
+        'call_site': _call_site(1),
+        'rows': rows,
+        'bytes': nbytes,
+        'shared_bytes': shared_bytes,
+        'flag': flag,
+    }
+    key = id(obj)
+    try:
+        ref = weakref.ref(obj, lambda _ref, key=key: _forget(key))
+    except TypeError:
+        return obj
+    with _lock:
+        _registry[key] = (ref, entry)
+    return obj
+
+
+def _forget(key):
+    with _lock:
+        _registry.pop(key, None)
+
+
+def memory_report():
+    """
+    Objetos vivos registrados con sus bytes atribuidos
+    Returns:
+        list[dict]: Una fila por objeto vivo
+    """
+    with _lock:
+        items = list(_registry.values())
+    rows = []
+    for ref, entry in items:
+        if ref() is None:
+            continue
+        row = dict(entry)
+        row['owned_bytes'] = row['bytes'] - row['shared_bytes']
+        rows.append(row)
+    return rows
+
+
+def session_totals(report=None):
+    """
+    Bytes propios por sesión (los objetos compartidos se cuentan aparte)
+    """
+    totals = {}
+    for row in report if report is not None else memory_report():
+        totals[row['session']] = totals.get(row['session'], 0) + row['owned_bytes']
+    return totals
+
+
+def render_memory_panel():
+    """
+    Tabla de memoria viva por sesión y sitio de llamada en la barra lateral
+    """
+    import pandas as pd
+
+    report = memory_report()
+    with st.sidebar.expander("Memoria por sesión", expanded=False):
+        if not report:
+            st.write("No hay objetos registrados.")
+            return
+        current = _session_id()
+        totals = session_totals(report)
+        st.caption(
+            f"Esta sesión: {totals.get(current, 0) / 1024 ** 2:.2f} MB propios · "
+            f"compartido: {totals.get(SHARED_SESSION, 0) / 1024 ** 2:.2f} MB · "
+            f"sesiones vivas: {len([s for s in totals if s != SHARED_SESSION])}"
+        )
+        table = pd.DataFrame(report)
+        table['MB'] = (table['bytes'] / 1024 ** 2).round(3)
+        table['MB propios'] = (table['owned_bytes'] / 1024 ** 2).round(3)
+        table['session'] = table['session'].str.slice(0, 8)
+        st.dataframe(
+            table[['session', 'label', 'call_site', 'rows', 'MB', 'MB propios', 'flag']]
+            .sort_values('MB propios', ascending=False),
+            use_container_width=True,
+            hide_index=True
+        )
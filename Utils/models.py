@@ -0,0 +1,161 @@
+"""
+Modelos derivados del dataset guardados en disco por versión del CSV
+
+Los usan las familias olfativas (Utils.clusters) y el mapa de aromas
+(Utils.embedding): cada modelo vive en un directorio propio con un manifest
+JSON y sus arreglos .npy (abiertos con mmap de solo lectura), dentro del
+subdirectorio de su CSV (Utils.appends.source_directory). Cuando el CSV solo
+creció al final, el modelo de la versión anterior se extiende con las filas
+nuevas en lugar de volver a ajustarse.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Utils.appends import appended_since, source_directory, source_state
+from Utils.data_loader import is_large_source, load_perfume_data, loaded_source
+from Utils.indexes import get_accord_index
+
+MANIFEST = 'manifest.json'
+
+
+def model_path(model_dir, params, state):
+    """Directorio del modelo para unos parámetros y un estado del CSV (Utils.appends.source_state)"""
+    key = json.dumps({'params': params, 'state': state}, sort_keys=True)
+    return os.path.join(model_dir, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def save_model(model_dir, target, arrays, manifest):
+    """
+    Escribe el modelo de forma atómica y borra las versiones anteriores del directorio
+    Args:
+        model_dir (str): Directorio de modelos de un solo CSV (ver build_model)
+        arrays (dict): nombre -> np.ndarray (se guardan como .npy)
+        manifest (dict): Datos JSON del modelo
+    Returns:
+        str: Directorio del modelo
+    """
+    tmp = os.path.join(model_dir, f'.tmp-{os.getpid()}-{threading.get_ident()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f'{name}.npy'), np.asarray(array))
+        with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as fh:
+            json.dump(dict(manifest, arrays=sorted(arrays)), fh, ensure_ascii=False)
+        os.rename(tmp, target)
+    except OSError:
+        # Otro proceso guardó primero el modelo de la misma versión
+        if not os.path.exists(os.path.join(target, MANIFEST)):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # Solo se conserva el modelo del estado actual
+    for entry in os.listdir(model_dir):
+        if entry != os.path.basename(target) and not entry.startswith('.tmp-'):
+            shutil.rmtree(os.path.join(model_dir, entry), ignore_errors=True)
+    return target
+
+
+def open_model(directory):
+    """Manifest más arreglos del modelo (mmap de solo lectura)"""
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as fh:
+        model = json.load(fh)
+    for name in model['arrays']:
+        model[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+    return model
+
+
+def previous_model(path, model_dir, params):
+    """Modelo guardado para una versión anterior del CSV que solo creció al final"""
+    if not os.path.isdir(model_dir):
+        return None
+    candidates = []
+    for entry in os.listdir(model_dir):
+        manifest_path = os.path.join(model_dir, entry, MANIFEST)
+        if not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path, encoding='utf-8') as fh:
+            manifest = json.load(fh)
+        if manifest.get('params') == params and appended_since(path, manifest['state']) is not None:
+            candidates.append((manifest['state']['size'], os.path.join(model_dir, entry)))
+    return open_model(max(candidates)[1]) if candidates else None
+
+
+def training_frame(path, columns=None):
+    """
+    Dataset con el que se ajusta o extiende un modelo, junto al estado del CSV que refleja
+    Args:
+        columns (list): Columnas que usa el modelo con catálogos grandes (None = nombre y acordes)
+    """
+    if is_large_source(path):
+        # Catálogo grande: del almacén columnar solo se leen las columnas del modelo
+        from Utils.ingest import read_store
+        if columns is None:
+            header = pd.read_csv(path, nrows=0).columns
+            columns = ['name'] + [col for col in header if col.startswith('accords.')]
+        return read_store(columns=columns, path=path), source_state(path)
+    frame = load_perfume_data(path)
+    # El DataFrame en memoria puede ser de una versión anterior del CSV (sin refrescar):
+    # el modelo se guarda para la versión que describen sus filas
+    loaded = loaded_source(path)
+    state = loaded['source'] if loaded is not None and loaded['frame'] is frame else source_state(path)
+    return frame, state
+
+
+def accord_matrix(frame, columns=None):
+    """
+    Matriz de acordes normalizada del DataFrame (get_accord_index), alineada a columns
+    Returns:
+        tuple: (matriz, índice de acordes)
+    """
+    index = get_accord_index(frame)
+    matrix = index['matrix']
+    if columns is not None and index['columns'] != list(columns):
+        # Mismas columnas que el modelo (las que falten cuentan como cero)
+        position = {col: j for j, col in enumerate(index['columns'])}
+        aligned = np.zeros((len(matrix), len(columns)), dtype=matrix.dtype)
+        for j, col in enumerate(columns):
+            if col in position:
+                aligned[:, j] = matrix[:, position[col]]
+        matrix = aligned
+    return matrix, index
+
+
+def build_model(path, model_dir, params, fit, extend, columns=None):
+    """
+    Modelo para el estado actual del CSV: desde disco, extendido o ajustado y guardado
+    Args:
+        params (dict): Parámetros que versionan el modelo (formato, hiperparámetros)
+        fit (callable): fit(frame) -> (arrays, manifest)
+        extend (callable): extend(modelo_anterior, tail) -> (arrays, manifest) con las filas nuevas
+                           (None = el modelo se vuelve a ajustar con todo el dataset)
+        columns (list): Columnas que necesitan fit y extend (ver training_frame)
+    Returns:
+        dict: Manifest (con rows y state) más los arreglos
+    """
+    # Cada CSV tiene sus versiones aparte: podar las anteriores no borra las de otra fuente
+    model_dir = source_directory(model_dir, path)
+    directory = model_path(model_dir, params, source_state(path))
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        return open_model(directory)
+
+    os.makedirs(model_dir, exist_ok=True)
+    frame, state = training_frame(path, columns)
+    directory = model_path(model_dir, params, state)
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        return open_model(directory)
+
+    previous = previous_model(path, model_dir, params) if extend is not None else None
+    if previous is not None and previous['rows'] <= len(frame):
+        arrays, manifest = extend(previous, frame.iloc[previous['rows']:])
+    else:
+        arrays, manifest = fit(frame)
+    manifest = dict(manifest, params=params, state=state, rows=len(frame))
+    return open_model(save_model(model_dir, directory, arrays, manifest))
@@ -0,0 +1,57 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def figure_workers():
+    """
+    Hilos del pool de figuras: PERFUME_FIGURE_WORKERS o min(4, núcleos)
+    Con 1 las figuras se construyen en secuencia, como antes.
+    """
+    configured = os.environ.get('PERFUME_FIGURE_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # Un solo pool acotado por proceso, compartido por todas las sesiones
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=figure_workers(),
+                                               thread_name_prefix='perfume-figures')
+    return _executor
+
+
+def build_figures(builders, *args, executor=None, **kwargs):
+    """
+    Construye varias figuras independientes en paralelo
+    Las agregaciones de pandas/NumPy liberan el GIL, así que los constructores se
+    solapan en hosts con varios núcleos. Cada tarea corre en una copia del contexto
+    del rerun, por lo que la instrumentación (Utils.instrumentation) sigue registrando
+    sus etapas. Los constructores no deben llamar a st.* (solo devuelven la figura).
+    Args:
+        builders (list): Funciones create_* que reciben los mismos argumentos
+        *args, **kwargs: Argumentos comunes (normalmente df_filtered)
+        executor (ThreadPoolExecutor): Pool alternativo (por defecto el del proceso)
+    Returns:
+        list: Figuras en el mismo orden que builders (orden determinista para el layout)
+    """
+    if executor is None:
+        if figure_workers() == 1 or len(builders) <= 1:
+            return [builder(*args, **kwargs) for builder in builders]
+        executor = _get_executor()
+
+    futures = [
+        executor.submit(contextvars.copy_context().run, builder, *args, **kwargs)
+        for builder in builders
+    ]
+    # result() relanza la excepción del constructor correspondiente, en orden
+    return [future.result() for future in futures]
@@ -1,10 +1,9 @@
 import streamlit as st
 import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
 import numpy as np
-from io import BytesIO
-import base64
+
+from Utils.instrumentation import instrument
 
 # PALETAS PERSONALIZADAS PARA EL DASHBOARD
 PERFUME_PALETTES = {
@@ -74,13 +73,22 @@ def download_plot_button(fig, filename_prefix):
         help="Descarga el gráfico como archivo HTML interactivo"
     )
 
-def create_radar_chart(data, categories, values, title="", colors=None):
+@instrument(kind='figure')
+def create_radar_chart(data, categories, values=None, title="", colors=None, radial_max=None):
     """
     Crea un gráfico de radar personalizado
+    Args:
+        data (dict): Nombre de la serie -> valores por categoría (lista o array)
+        radial_max (float): Máximo del eje radial (por defecto, el mayor valor de las series)
     """
     if colors is None:
         colors = PERFUME_PALETTES['primary']
     
+    # Máximo de todas las series en una sola operación
+    if radial_max is None:
+        series = np.asarray(list(data.values()), dtype=float)
+        radial_max = float(np.nanmax(series)) if series.size and np.isfinite(series).any() else 1.0
+    
     fig = go.Figure()
     
     for i, (name, vals) in enumerate(zip(data.keys(), data.values())):
@@ -97,7 +105,7 @@ def create_radar_chart(data, categories, values, title="", colors=None):
         polar=dict(
             radialaxis=dict(
                 visible=True,
-                range=[0, max(max(vals) for vals in data.values())],
+                range=[0, radial_max],
                 tickfont=dict(size=10),
                 gridcolor='#E5E5E5'
             ),
@@ -117,6 +125,7 @@ def create_radar_chart(data, categories, values, title="", colors=None):
     
     return fig
 
+@instrument(kind='figure')
 def create_correlation_heatmap(correlation_matrix, title=""):
     """
     Crea un heatmap de correlaciones personalizado
@@ -134,8 +143,7 @@ def create_correlation_heatmap(correlation_matrix, title=""):
         ],
         zmid=0,
         colorbar=dict(
-            title="Correlación",
-            titleside="right",
+            title=dict(text="Correlación", side="right"),
             tickmode="linear",
             tick0=-1,
             dtick=0.5
@@ -155,6 +163,7 @@ def create_correlation_heatmap(correlation_matrix, title=""):
     
     return fig
 
+@instrument(kind='figure')
 def create_bar_chart(data, x_col, y_col, title="", color_col=None, horizontal=False):
     """
     Crea gráfico de barras personalizado
@@ -194,6 +203,7 @@ def create_bar_chart(data, x_col, y_col, title="", color_col=None, horizontal=Fa
     
     return fig
 
+@instrument(kind='figure')
 def create_scatter_plot(data, x_col, y_col, title="", size_col=None, color_col=None, hover_data=None):
     """
     Crea scatter plot personalizado
@@ -252,6 +262,7 @@ def create_scatter_plot(data, x_col, y_col, title="", size_col=None, color_col=N
     
     return fig
 
+@instrument(kind='figure')
 def create_histogram(data, column, title="", bins=20):
     """
     Crea histograma personalizado
@@ -274,6 +285,7 @@ def create_histogram(data, column, title="", bins=20):
     
     return fig
 
+@instrument(kind='figure')
 def create_box_plot(data, category_col, value_col, title=""):
     """
     Crea box plot personalizado
@@ -304,6 +316,7 @@ def create_box_plot(data, category_col, value_col, title=""):
     
     return fig
 
+@instrument(kind='figure')
 def create_sunburst_chart(data, path_cols, value_col, title=""):
     """
     Crea gráfico sunburst personalizado
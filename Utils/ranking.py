@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import RATING_COL, RATING_COUNT_COL, dominant_gender, page_column
+from Utils.indexes import memoize_per_frame
+
+SENTIMENT_COLUMNS = ['calificationText.MeEncanta', 'calificationText.MeGusta',
+                     'calificationText.MeEsIndiferente', 'calificationText.NoMeGusta',
+                     'calificationText.LaOdio']
+# Cuánto cuenta cada sentimiento como opinión positiva (Me encanta = 1 ... La odio = 0)
+SENTIMENT_WEIGHTS = np.array([1.0, 0.75, 0.5, 0.25, 0.0])
+
+# z del intervalo de Wilson (95 %)
+WILSON_Z = 1.96
+
+# Estadísticos suficientes por perfume: sumados sobre cualquier subconjunto dan sus priors
+STAT_COLUMNS = ['perfumes', 'reviews', 'rating_x_reviews', 'log_reviews']
+
+
+@memoize_per_frame
+def get_rating_statistics(df):
+    """
+    Rating, reseñas y recepción por perfume, más la matriz de estadísticos suficientes
+    Se calcula una vez por DataFrame compartido; los priors de cada filtro salen de
+    un producto máscara x matriz (subset_priors), sin volver a recorrer columnas.
+    Returns:
+        dict: rating, reviews, positive_share (NaN sin sentimientos) y matrix (filas x STAT_COLUMNS)
+    """
+    rating = page_column(df, RATING_COL).to_numpy(dtype=float)
+    reviews = page_column(df, RATING_COUNT_COL).fillna(0).to_numpy(dtype=float)
+    rated = ~np.isnan(rating)
+
+    # Los sentimientos vienen como porcentajes relativos (el mayor vale 100)
+    positive_share = np.full(len(df), np.nan)
+    available = [col for col in SENTIMENT_COLUMNS if col in df.columns]
+    if len(available) == len(SENTIMENT_COLUMNS):
+        votes = df[SENTIMENT_COLUMNS].to_numpy(dtype=float, na_value=0)
+        totals = votes.sum(axis=1)
+        np.divide(votes @ SENTIMENT_WEIGHTS, totals, out=positive_share, where=totals > 0)
+
+    rated_reviews = np.where(rated, reviews, 0)
+    matrix = np.column_stack([
+        rated.astype(float),
+        rated_reviews,
+        np.where(rated, rating * reviews, 0),
+        np.log1p(rated_reviews),
+    ])
+    return {'rating': rating, 'reviews': reviews, 'positive_share': positive_share, 'matrix': matrix}
+
+
+def _priors(totals):
+    perfumes, reviews, rating_x_reviews, log_reviews = totals
+    if perfumes == 0 or reviews == 0:
+        return {'mean_rating': np.nan, 'weight': 0.0, 'perfumes': int(perfumes)}
+    return {
+        # Rating medio ponderado por reseñas del subconjunto
+        'mean_rating': rating_x_reviews / reviews,
+        # Media geométrica de reseñas: cerca de la mediana y aditiva (se suma como log1p)
+        'weight': float(np.expm1(log_reviews / perfumes)),
+        'perfumes': int(perfumes),
+    }
+
+
+def subset_priors(df, mask=None):
+    """
+    Priors del subconjunto filtrado: rating medio y peso (reseñas típicas)
+    Args:
+        mask (array-like de bool): Filas del filtro actual (None = todo el DataFrame)
+    Returns:
+        dict: mean_rating, weight y perfumes (con rating)
+    """
+    matrix = get_rating_statistics(df)['matrix']
+    totals = matrix.sum(axis=0) if mask is None else np.asarray(mask, dtype=float) @ matrix
+    return _priors(totals)
+
+
+def bayesian_rating(df, priors=None):
+    """
+    Rating bayesiano: (reseñas * rating + peso * rating medio) / (reseñas + peso)
+    Un 4.9 con 3 reseñas queda cerca del promedio; un 4.16 con miles casi no se mueve.
+    Returns:
+        np.ndarray: NaN para perfumes sin rating
+    """
+    stats = get_rating_statistics(df)
+    priors = subset_priors(df) if priors is None else priors
+    reviews, weight = stats['reviews'], priors['weight']
+    total = reviews + weight
+    return np.divide(reviews * stats['rating'] + weight * priors['mean_rating'], total,
+                     out=np.full(len(reviews), np.nan), where=total > 0)
+
+
+def wilson_lower_bound(share, n, z=WILSON_Z):
+    """
+    Cota inferior del intervalo de Wilson para una proporción observada en n votos
+    Returns:
+        np.ndarray: NaN donde no hay proporción o votos
+    """
+    share = np.asarray(share, dtype=float)
+    n = np.asarray(n, dtype=float)
+    z2 = z * z
+    with np.errstate(invalid='ignore', divide='ignore'):
+        center = share + z2 / (2 * n)
+        margin = z * np.sqrt(share * (1 - share) / n + z2 / (4 * n * n))
+        bound = (center - margin) / (1 + z2 / n)
+    return np.where(n > 0, bound, np.nan)
+
+
+def positive_reception(df):
+    """
+    Recepción positiva: cota de Wilson de la proporción de opiniones positivas
+    Las proporciones de calificationText.* se aplican al total de reseñas del perfume.
+    """
+    stats = get_rating_statistics(df)
+    return wilson_lower_bound(stats['positive_share'], stats['reviews'])
+
+
+def best_rated(df, mask=None, k=1):
+    """
+    Perfumes mejor valorados del filtro actual, con priors recalculados para ese filtro
+    Returns:
+        tuple: (posiciones de mayor a menor rating bayesiano, scores, priors)
+    """
+    priors = subset_priors(df, mask)
+    scores = bayesian_rating(df, priors)
+    candidates = np.flatnonzero(~np.isnan(scores) if mask is None
+                                else np.asarray(mask, dtype=bool) & ~np.isnan(scores))
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    positions = candidates[np.argsort(-scores[candidates], kind='stable')]
+    return positions, scores[positions], priors
+
+
+def group_bayesian_rating(df, codes, n_groups, mask=None):
+    """
+    Rating bayesiano por grupo (p. ej. género) con los priors del filtro actual
+    Las sumas por grupo salen de los mismos estadísticos suficientes (bincount por columna).
+    Args:
+        codes (np.ndarray): Grupo de cada fila (0..n_groups-1, -1 = sin grupo)
+    Returns:
+        np.ndarray: Un rating por grupo (NaN si el grupo no tiene perfumes con rating)
+    """
+    matrix = get_rating_statistics(df)['matrix']
+    weights = np.ones(len(matrix)) if mask is None else np.asarray(mask, dtype=float)
+    valid = codes >= 0
+    group_totals = np.column_stack([
+        np.bincount(codes[valid], weights=(matrix[:, j] * weights)[valid], minlength=n_groups)
+        for j in range(matrix.shape[1])
+    ])
+    priors = subset_priors(df, mask)
+    perfumes, reviews, rating_x_reviews, _ = group_totals.T
+    weight = priors['weight']
+    return np.where(perfumes > 0,
+                    (rating_x_reviews + weight * priors['mean_rating']) / np.maximum(reviews + weight, 1e-12),
+                    np.nan)
+
+
+@memoize_per_frame
+def get_gender_groups(df):
+    """
+    Género dominante de cada fila como código de grupo (-1 = sin votos de género)
+    Returns:
+        tuple: (códigos, etiquetas)
+    """
+    genders = df['gender_dominant'] if 'gender_dominant' in df.columns else dominant_gender(df)
+    codes, labels = pd.factorize(genders)
+    return codes, np.asarray(labels, dtype=object)
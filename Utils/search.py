@@ -0,0 +1,373 @@
+"""
+Búsqueda de texto completo (BM25) sobre las descripciones de los perfumes
+
+El índice invertido se construye una vez por versión del CSV y se guarda en disco
+(SEARCH_DIR) con Utils.models: por término, los perfumes que lo contienen como
+diferencias entre posiciones codificadas en bytes variables (varbyte) y la
+frecuencia del término en cada uno. Una consulta solo decodifica las listas de
+sus términos, así que responde en milisegundos aun con 1M de descripciones. Las
+filas agregadas al final del CSV se tokenizan y se suman al índice existente.
+
+Uso (desde la raíz del repositorio, para construirlo antes de lanzar los workers):
+    python -m Utils.search "amaderado 2019"
+"""
+import argparse
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from Utils.data_loader import DATA_PATH
+from Utils.models import build_model
+from Utils.singleflight import single_flight
+
+SEARCH_DIR = os.environ.get('PERFUME_SEARCH_DIR', 'data/search')
+SEARCH_VERSION = 1
+
+# Tokenizador: minúsculas sin acentos, alfanuméricos de al menos MIN_TOKEN_LENGTH caracteres
+TOKEN_PATTERN = r'[a-z0-9]+'
+MIN_TOKEN_LENGTH = 2
+# Palabras vacías del español (sin acentos, como quedan tras el plegado)
+STOPWORDS = frozenset('''
+    a al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+    durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este
+    esto estos fue fueron ha han hasta hay la las le les lo los mas me mi mis mucho muy
+    ni no nos o otra otras otro otros para pero poco por porque que quien se sea ser si
+    sin sobre son su sus tambien tan tanto te tiene tienen todo todos tu tus u un una
+    uno unos y ya
+'''.split())
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Descripciones tokenizadas por bloque al construir el índice
+BUILD_CHUNK_ROWS = 100_000
+# Resultados por consulta
+SEARCH_TOP_N = 20
+
+SEARCH_PARAMS = {
+    'search_version': SEARCH_VERSION,
+    'min_token_length': MIN_TOKEN_LENGTH,
+    'stopwords': sorted(STOPWORDS),
+}
+
+# Claves de postings: término (24 bits) | perfume (32 bits) | frecuencia (8 bits)
+_DOC_BITS, _TF_BITS = 32, 8
+_MAX_TF = (1 << _TF_BITS) - 1
+
+
+def _fold(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def tokenize(text):
+    """
+    Términos de un texto: sin acentos, en minúsculas y sin palabras vacías
+    Returns:
+        list: Términos en orden de aparición
+    """
+    if not isinstance(text, str):
+        return []
+    return [token for token in re.findall(TOKEN_PATTERN, _fold(text))
+            if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS]
+
+
+def _tokenize_series(texts):
+    # Mismo criterio que tokenize, con los métodos vectorizados de pandas
+    folded = (texts.fillna('').astype(str).str.normalize('NFKD')
+              .str.encode('ascii', 'ignore').str.decode('ascii').str.lower())
+    tokens = pd.Series(folded.str.findall(TOKEN_PATTERN).to_numpy(), index=np.arange(len(texts))).explode()
+    tokens = tokens.dropna()
+    return tokens[(tokens.str.len() >= MIN_TOKEN_LENGTH) & ~tokens.isin(list(STOPWORDS))]
+
+
+def _chunk_postings(texts, offset, vocabulary):
+    """Claves de postings y largos (en términos) de un bloque de descripciones"""
+    tokens = _tokenize_series(texts)
+    codes, uniques = pd.factorize(tokens.to_numpy())
+    term_ids = np.array([vocabulary.setdefault(term, len(vocabulary)) for term in uniques], dtype=np.uint64)
+    docs = tokens.index.to_numpy().astype(np.uint64) + np.uint64(offset)
+    pairs, tf = np.unique((term_ids[codes] << np.uint64(_DOC_BITS)) | docs, return_counts=True)
+    keys = (pairs << np.uint64(_TF_BITS)) | np.minimum(tf, _MAX_TF).astype(np.uint64)
+    lengths = np.bincount(tokens.index.to_numpy(), minlength=len(texts)).astype(np.uint32)
+    return keys, lengths
+
+
+def _varbyte_encode(values):
+    """Enteros no negativos en bytes de 7 bits; el último byte de cada valor lleva el bit alto"""
+    values = values.astype(np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28):
+        n_bytes += values >= (1 << bits)
+    ends = np.cumsum(n_bytes)
+    starts = ends - n_bytes
+    encoded = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    for k in range(5):
+        has = n_bytes > k
+        encoded[starts[has] + k] = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+    if len(ends):
+        encoded[ends - 1] |= 0x80
+    return encoded, starts
+
+
+def _varbyte_decode(encoded, count=None):
+    encoded = np.asarray(encoded)
+    if count == len(encoded):
+        # Todos los valores caben en un byte (listas densas): basta con quitar el bit alto
+        return (encoded & 0x7F).astype(np.uint64)
+    ends = np.flatnonzero(encoded & 0x80) + 1
+    if len(ends) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    starts = np.concatenate([[0], ends[:-1]])
+    shift = (np.arange(len(encoded)) - np.repeat(starts, ends - starts)) * 7
+    parts = (encoded & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def _encode_index(keys, n_terms):
+    """Arreglos del índice a partir de las claves ordenadas (término, perfume)"""
+    terms = (keys >> np.uint64(_DOC_BITS + _TF_BITS)).astype(np.int64)
+    docs = (keys >> np.uint64(_TF_BITS)) & np.uint64((1 << _DOC_BITS) - 1)
+    doc_freq = np.bincount(terms, minlength=n_terms).astype(np.int64)
+    posting_offsets = np.concatenate([[0], np.cumsum(doc_freq)])
+    # Diferencias entre perfumes consecutivos de cada término (el primero va completo)
+    gaps = docs.copy()
+    gaps[1:] -= docs[:-1]
+    first = posting_offsets[:-1][doc_freq > 0]
+    gaps[first] = docs[first]
+    encoded, starts = _varbyte_encode(gaps)
+    byte_offsets = np.append(starts, len(encoded))[posting_offsets]
+    return {
+        'postings': encoded,
+        'byte_offsets': byte_offsets,
+        'posting_offsets': posting_offsets,
+        'tf': (keys & np.uint64(_MAX_TF)).astype(np.uint8),
+    }
+
+
+def _decode_keys(model):
+    """Claves de postings de todo el índice (para extenderlo con filas nuevas)"""
+    posting_offsets = np.asarray(model['posting_offsets'])
+    doc_freq = np.diff(posting_offsets)
+    terms = np.repeat(np.arange(len(doc_freq), dtype=np.uint64), doc_freq)
+    gaps = _varbyte_decode(model['postings'])
+    # Suma acumulada por término: a cada lista se le descuenta lo acumulado antes de su inicio
+    totals = np.cumsum(gaps)
+    present = doc_freq > 0
+    starts = posting_offsets[:-1][present]
+    docs = totals - np.repeat(totals[starts] - gaps[starts], doc_freq[present])
+    tf = np.asarray(model['tf'], dtype=np.uint64)
+    return (((terms << np.uint64(_DOC_BITS)) | docs) << np.uint64(_TF_BITS)) | tf
+
+
+def _index_texts(descriptions, vocabulary, offset=0):
+    keys, lengths = [], []
+    for start in range(0, len(descriptions), BUILD_CHUNK_ROWS):
+        chunk_keys, chunk_lengths = _chunk_postings(
+            descriptions.iloc[start:start + BUILD_CHUNK_ROWS], offset + start, vocabulary
+        )
+        keys.append(chunk_keys)
+        lengths.append(chunk_lengths)
+    if not keys:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint32)
+    return np.concatenate(keys), np.concatenate(lengths)
+
+
+def _fit_model(frame):
+    vocabulary = {}
+    keys, lengths = _index_texts(frame['description'], vocabulary)
+    keys.sort()
+    arrays = dict(_encode_index(keys, len(vocabulary)), doc_lengths=lengths)
+    return arrays, {'vocabulary': list(vocabulary), 'docs': len(frame)}
+
+
+def _extend_model(previous, tail):
+    # Filas agregadas al final: solo se tokenizan las nuevas y se mezclan con las claves existentes
+    vocabulary = {term: i for i, term in enumerate(previous['vocabulary'])}
+    keys, lengths = _index_texts(tail['description'], vocabulary, offset=previous['docs'])
+    keys = np.concatenate([_decode_keys(previous), keys])
+    keys.sort()
+    arrays = dict(_encode_index(keys, len(vocabulary)),
+                  doc_lengths=np.concatenate([previous['doc_lengths'], lengths]))
+    return arrays, {'vocabulary': list(vocabulary), 'docs': previous['docs'] + len(tail)}
+
+
+def build_search_index(path=DATA_PATH, search_dir=SEARCH_DIR):
+    """
+    Índice invertido para el estado actual del CSV, desde disco o construido y guardado
+    Returns:
+        dict: vocabulary, docs, postings (varbyte), byte_offsets, posting_offsets, tf y doc_lengths
+    """
+    return build_model(path, search_dir, SEARCH_PARAMS, _fit_model, _extend_model,
+                       columns=['name', 'description'])
+
+
+@st.cache_resource(show_spinner="Construyendo el índice de búsqueda...")
+@single_flight
+def load_search_index(path=DATA_PATH):
+    """
+    Índice de búsqueda compartido entre sesiones (arreglos mapeados desde disco)
+    """
+    return _with_lookup(build_search_index(path))
+
+
+def _with_lookup(model):
+    # Diccionario término -> id y largo promedio, calculados una vez al abrir el índice
+    model['term_ids'] = {term: i for i, term in enumerate(model['vocabulary'])}
+    model['avg_length'] = float(np.mean(model['doc_lengths'])) if model['docs'] else 0.0
+    return model
+
+
+def postings(model, term_id):
+    """
+    Perfumes (posiciones del CSV) que contienen el término y su frecuencia en cada uno
+    """
+    start, stop = model['byte_offsets'][term_id], model['byte_offsets'][term_id + 1]
+    first, last = model['posting_offsets'][term_id], model['posting_offsets'][term_id + 1]
+    docs = np.cumsum(_varbyte_decode(model['postings'][start:stop], last - first)).astype(np.int64)
+    return docs, np.asarray(model['tf'][first:last], dtype=np.float32)
+
+
+def search_scores(query, n_rows=None, require_all=True, model=None):
+    """
+    Puntaje BM25 de cada perfume para la consulta
+    Args:
+        n_rows (int): Solo las primeras n_rows posiciones del CSV (None = todas)
+        require_all (bool): Solo puntúan los perfumes que contienen todos los términos
+    Returns:
+        np.ndarray | None: float32 por posición (0 = no coincide), o None si la consulta
+                           no tiene términos
+    """
+    model = load_search_index() if model is None else model
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return None
+    n_rows = model['docs'] if n_rows is None else min(n_rows, model['docs'])
+    scores = np.zeros(n_rows, dtype=np.float32)
+    term_ids = [model['term_ids'].get(term) for term in terms]
+    if require_all and None in term_ids:
+        return scores
+    hits = np.zeros(n_rows, dtype=np.int16)
+    lengths = model['doc_lengths']
+    length_weight = np.float32(BM25_K1 * BM25_B / max(model['avg_length'], 1e-9))
+    for term_id in [t for t in term_ids if t is not None]:
+        docs, tf = postings(model, term_id)
+        keep = docs < n_rows
+        docs, tf = docs[keep], tf[keep]
+        doc_freq = model['posting_offsets'][term_id + 1] - model['posting_offsets'][term_id]
+        idf = np.float32(np.log(1 + (model['docs'] - doc_freq + 0.5) / (doc_freq + 0.5)))
+        norm = length_weight * lengths[docs].astype(np.float32) + np.float32(BM25_K1 * (1 - BM25_B))
+        scores[docs] += idf * tf * np.float32(BM25_K1 + 1) / (tf + norm)
+        hits[docs] += 1
+    if require_all:
+        scores[hits < len(term_ids)] = 0
+    return scores
+
+
+def search(query, top_n=SEARCH_TOP_N, n_rows=None, mask=None, require_all=True):
+    """
+    Los top_n perfumes más relevantes para la consulta (selección parcial, sin ordenar todo)
+    Args:
+        mask (np.ndarray): Posiciones candidatas (p. ej. los filtros de rating y género)
+    Returns:
+        tuple: (posiciones del CSV, puntajes), de mayor a menor relevancia
+    """
+    scores = search_scores(query, n_rows, require_all)
+    if scores is None:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    if mask is not None:
+        scores = np.where(np.asarray(mask)[:len(scores)], scores, 0)
+    positions = np.flatnonzero(scores > 0)
+    if len(positions) > top_n:
+        positions = positions[np.argpartition(-scores[positions], top_n - 1)[:top_n]]
+    positions = positions[np.argsort(-scores[positions], kind='stable')]
+    return positions, scores[positions]
+
+
+def search_filter(container=None, key=None):
+    """
+    Cuadro de búsqueda en las descripciones para la barra lateral de las páginas
+    Returns:
+        str | None: Consulta, o None si está vacía (sin filtro)
+    """
+    container = st.sidebar if container is None else container
+    query = container.text_input(
+        "Buscar en descripciones",
+        key=key,
+        placeholder="p. ej. amaderado 2019",
+        help="Perfumes cuya descripción contiene todos los términos (familia, año, perfumista, notas...)"
+    )
+    return query.strip() or None
+
+
+def search_mask(df, query):
+    """
+    Filas del DataFrame cuya descripción coincide con la consulta
+    El índice del DataFrame son las posiciones del CSV (como en load_catalog).
+    Returns:
+        np.ndarray | None: Máscara booleana (None = sin filtro)
+    """
+    if query is None:
+        return None
+    scores = search_scores(query)
+    if scores is None:
+        return None
+    positions = df.index.to_numpy()
+    inside = positions < len(scores)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[inside] = scores[positions[inside]] > 0
+    return mask
+
+
+def search_row_ids(query, n_rows=None):
+    """
+    Posiciones en el CSV (row_id del backend SQLite) que coinciden con la consulta
+    """
+    if query is None:
+        return None
+    scores = search_scores(query, n_rows)
+    return None if scores is None else np.flatnonzero(scores > 0).tolist()
+
+
+def ranked_results(df, query, top_n=SEARCH_TOP_N):
+    """
+    Filas del DataFrame más relevantes para la consulta, con su puntaje BM25
+    Returns:
+        pd.DataFrame: Filas de df (índice = posiciones del CSV) más la columna 'relevancia'
+    """
+    scores = search_scores(query)
+    if scores is None:
+        return df.iloc[0:0].assign(relevancia=[])
+    positions = df.index.to_numpy()
+    relevance = np.zeros(len(df), dtype=np.float32)
+    inside = positions < len(scores)
+    relevance[inside] = scores[positions[inside]]
+    matched = np.flatnonzero(relevance > 0)
+    if len(matched) > top_n:
+        matched = matched[np.argpartition(-relevance[matched], top_n - 1)[:top_n]]
+    matched = matched[np.argsort(-relevance[matched], kind='stable')]
+    return df.iloc[matched].assign(relevancia=relevance[matched])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('query', nargs='?', help='Consulta de prueba')
+    parser.add_argument('--data', default=DATA_PATH, help='CSV del dataset')
+    parser.add_argument('--dir', default=SEARCH_DIR, help='Directorio del índice')
+    args = parser.parse_args(argv)
+
+    model = _with_lookup(build_search_index(args.data, args.dir))
+    print(f"Índice de {model['docs']} descripciones, {len(model['vocabulary'])} términos, "
+          f"{len(model['postings']) / 2 ** 20:.1f} MB de postings")
+    if args.query:
+        scores = search_scores(args.query, model=model)
+        positions = np.flatnonzero(scores > 0) if scores is not None else []
+        print(f"{len(positions)} coincidencias para {args.query!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Simulador de mezclas: perfumes reales más cercanos a un perfil de acordes hipotético
+
+Usa la matriz de acordes normalizada de get_similar_perfumes (Utils.indexes), así
+que cada consulta es un producto y una selección top-K, sin ordenar el catálogo.
+En una mezcla de dos perfumes, la similitud coseno es lineal en la mezcla: la
+similitud de cada perfume contra todo el catálogo se calcula una vez y cada
+movimiento del slider solo combina esos dos vectores.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import RATING_COL, RATING_COUNT_COL, page_column
+from Utils.indexes import get_accord_index, memoize_per_frame
+
+# Perfumes devueltos por consulta
+SIMULATOR_TOP_N = 10
+
+# Vectores de similitud guardados por DataFrame (uno por perfume usado en mezclas)
+SIMILARITY_CACHE_SIZE = 16
+
+
+@memoize_per_frame
+def _get_similarity_cache(df):
+    return {'lock': threading.Lock(), 'vectors': OrderedDict()}
+
+
+def perfume_similarities(df, position):
+    """
+    Similitud coseno de un perfume contra todo el DataFrame (guardada por DataFrame)
+    Args:
+        position (int): Fila del perfume
+    Returns:
+        np.ndarray: float32, una por fila
+    """
+    cache = _get_similarity_cache(df)
+    with cache['lock']:
+        if position in cache['vectors']:
+            cache['vectors'].move_to_end(position)
+            return cache['vectors'][position]
+    index = get_accord_index(df)
+    similarity = index['matrix'] @ index['matrix'][position]
+    with cache['lock']:
+        cache['vectors'][position] = similarity
+        while len(cache['vectors']) > SIMILARITY_CACHE_SIZE:
+            cache['vectors'].popitem(last=False)
+    return similarity
+
+
+def top_matches(df, similarity, top_n=SIMULATOR_TOP_N, exclude=(), mask=None):
+    """
+    Los top_n perfumes con mayor similitud (selección parcial, sin ordenar el catálogo)
+    Args:
+        exclude (iterable): Filas que no pueden aparecer (p. ej. los perfumes de la mezcla)
+        mask (np.ndarray): Filas candidatas (None = todas las que tienen acordes)
+    Returns:
+        pd.DataFrame: Perfume, Similitud, Rating y Reseñas, de mayor a menor similitud
+    """
+    index = get_accord_index(df)
+    candidates = index['has_accords'] if mask is None else index['has_accords'] & mask
+    candidates = candidates.copy()
+    candidates[list(exclude)] = False
+    positions = np.flatnonzero(candidates)
+    if len(positions) > top_n:
+        best = np.argpartition(-similarity[positions], top_n - 1)[:top_n]
+        positions = positions[best]
+    positions = positions[np.argsort(-similarity[positions], kind='stable')]
+    return pd.DataFrame({
+        'Perfume': index['names'][positions],
+        'Similitud': similarity[positions].round(3),
+        'Rating': page_column(df, RATING_COL).to_numpy()[positions],
+        'Reseñas': page_column(df, RATING_COUNT_COL).to_numpy()[positions],
+    })
+
+
+def nearest_to_profile(df, intensities, top_n=SIMULATOR_TOP_N, mask=None):
+    """
+    Perfumes más cercanos a un perfil de intensidades objetivo
+    Solo se multiplican las columnas de los acordes del perfil.
+    Args:
+        intensities (dict): Columna de acorde ('accords.x') -> intensidad objetivo (0-100)
+    Returns:
+        pd.DataFrame: Ver top_matches (vacío si el perfil no tiene intensidades)
+    """
+    index = get_accord_index(df)
+    position = {col: j for j, col in enumerate(index['columns'])}
+    columns = [position[col] for col, value in intensities.items() if col in position and value > 0]
+    weights = np.array([value for col, value in intensities.items() if col in position and value > 0],
+                       dtype=np.float32)
+    if len(columns) == 0:
+        empty = np.zeros(len(index['names']), dtype=bool)
+        return top_matches(df, empty.astype(np.float32), top_n, mask=empty)
+    similarity = index['matrix'][:, columns] @ (weights / np.linalg.norm(weights))
+    return top_matches(df, similarity, top_n, mask=mask)
+
+
+def nearest_to_blend(df, first, second, weight, top_n=SIMULATOR_TOP_N, mask=None):
+    """
+    Perfumes más cercanos a la mezcla (1 - weight) * first + weight * second
+    Las similitudes de cada perfume se reutilizan: cos(x, mezcla) =
+    ((1 - w) cos(x, a) + w cos(x, b)) / ||(1 - w) a + w b||, con a y b normalizados.
+    Args:
+        first, second (str): Nombres de los perfumes mezclados
+        weight (float): Proporción del segundo perfume (0-1)
+    Returns:
+        pd.DataFrame | None: Ver top_matches (None si algún perfume no existe o no tiene acordes)
+    """
+    index = get_accord_index(df)
+    a, b = index['position'].get(first), index['position'].get(second)
+    if a is None or b is None or not (index['has_accords'][a] and index['has_accords'][b]):
+        return None
+    similarity_a, similarity_b = perfume_similarities(df, a), perfume_similarities(df, b)
+    # ||(1 - w) a + w b||² con ||a|| = ||b|| = 1 y a·b = cos(a, b)
+    norm = np.sqrt((1 - weight) ** 2 + weight ** 2 + 2 * weight * (1 - weight) * similarity_a[b])
+    similarity = ((1 - weight) * similarity_a + weight * similarity_b) / max(norm, 1e-12)
+    return top_matches(df, similarity, top_n, exclude=(a, b), mask=mask)
@@ -0,0 +1,102 @@
+import functools
+import threading
+
+
+class _Call:
+    """Cómputo en curso compartido por todos los que esperan la misma clave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplica cómputos concurrentes: si varias sesiones piden la misma clave
+    mientras se calcula, solo una ejecuta la función y el resto espera su resultado.
+    No guarda el resultado al terminar; se combina con st.cache_* o memoize_per_frame.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Ejecuta func(*args, **kwargs) una sola vez por clave en vuelo
+        Returns:
+            El resultado de la ejecución compartida (o relanza su excepción)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Claves que se están calculando en este momento"""
+        with self._lock:
+            return list(self._calls)
+
+
+_group = SingleFlight()
+
+
+def _argument_key(value):
+    # Los DataFrames/ndarrays no son hashables: se identifican por objeto
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ('id', id(value))
+
+
+def single_flight(func=None, *, key=None):
+    """
+    Decorador: las llamadas concurrentes con los mismos argumentos comparten un cómputo
+    Args:
+        key (callable): Construye la clave a partir de los argumentos (opcional)
+    """
+    def decorator(inner):
+        name = f"{inner.__module__}.{inner.__qualname__}"
+
+        @functools.wraps(inner)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                call_key = (name, key(*args, **kwargs))
+            else:
+                call_key = (name,
+                            tuple(_argument_key(a) for a in args),
+                            tuple(sorted((k, _argument_key(v)) for k, v in kwargs.items())))
+            return _group.do(call_key, inner, *args, **kwargs)
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def in_flight():
+    """Cómputos deduplicados en curso (útil para diagnóstico)"""
+    return _group.in_flight()
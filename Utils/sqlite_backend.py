@@ -0,0 +1,354 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from pandas.io import sql as pandas_sql
+
+from Utils.data_loader import (
+    BRAND_COL, CATALOG_ROWS, DATA_PATH, PERFUMER_SEPARATOR, PERFUMERS_COL, RATING_COL, RATING_COUNT_COL,
+    UNKNOWN_YEAR, YEAR_COL, clean_perfume_frame, dominant_gender, value_score
+)
+from Utils.appends import appended_since, read_tail, source_state
+from Utils.singleflight import single_flight
+
+# Base de datos en disco compartida por todos los workers (vía la caché de páginas del SO)
+SQLITE_PATH = os.environ.get('PERFUME_SQLITE_PATH', 'data/perfumes.sqlite')
+SCHEMA_VERSION = 4
+TABLE = 'perfumes'
+CHUNK_ROWS = 50_000
+MMAP_BYTES = 256 * 1024 * 1024
+
+# Columnas derivadas e indexadas para los filtros de las páginas
+DERIVED_COLUMNS = ['rating', 'rating_count', 'gender_dominant', 'value_score']
+# Campos de la descripción (Utils.data_loader.extract_description_fields) también indexados
+FIELD_INDEX_COLUMNS = [YEAR_COL, BRAND_COL]
+# Una fila por perfumista de cada perfume: la versión relacional del CSR de get_perfumer_index
+PERFUMER_TABLE = 'perfumer_credits'
+
+_local = threading.local()
+
+
+def quote(name):
+    """Nombre de columna entre comillas para SQL (las columnas del CSV llevan puntos)"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _source_signature(csv_path, state, rows):
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'source': os.path.abspath(csv_path),
+        'state': state,
+        'rows': rows,
+    }
+
+
+def _stored_signature(db_path):
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with closing(sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)) as con:
+            row = con.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def _with_derived_columns(chunk, start):
+    """Agrega row_id (posición en el CSV) y las columnas derivadas que se indexan"""
+    return chunk.assign(
+        row_id=np.arange(start, start + len(chunk), dtype=np.int64),
+        rating=chunk[RATING_COL],
+        rating_count=chunk[RATING_COUNT_COL],
+        gender_dominant=dominant_gender(chunk),
+        value_score=value_score(chunk),
+    )
+
+
+def _perfumer_rows(chunk, start):
+    """Filas (row_id, perfumer) de la tabla de perfumistas para un bloque que empieza en start"""
+    credits = chunk[PERFUMERS_COL].astype(object).str.split(PERFUMER_SEPARATOR).explode().dropna()
+    return pd.DataFrame({
+        'row_id': start + chunk.index.get_indexer(credits.index).astype(np.int64),
+        'perfumer': credits.to_numpy(),
+    })
+
+
+def _insert_chunk(con, chunk, start):
+    """Inserta un bloque limpio del CSV (con sus columnas derivadas) y sus perfumistas"""
+    chunk = _with_derived_columns(chunk, start)
+    chunk.to_sql(TABLE, con, if_exists='append', index=False)
+    _perfumer_rows(chunk, start).to_sql(PERFUMER_TABLE, con, if_exists='append', index=False)
+    return chunk
+
+
+def build_database(csv_path=DATA_PATH, db_path=SQLITE_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Construye la base SQLite a partir del CSV, por bloques y sin cargarlo entero
+    Se escribe en un archivo temporal que reemplaza al anterior de forma atómica,
+    así los workers que estén leyendo nunca ven una base a medio construir.
+    Returns:
+        str: Ruta de la base construida
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{db_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    con = sqlite3.connect(tmp_path)
+    try:
+        con.execute('PRAGMA journal_mode = OFF')
+        con.execute('PRAGMA synchronous = OFF')
+        state = source_state(csv_path)
+        start = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            chunk = clean_perfume_frame(chunk)
+            if start == 0:
+                schema = _with_derived_columns(chunk, start)
+                con.execute(pandas_sql.get_schema(schema, TABLE, keys='row_id', con=con))
+                con.execute(f'CREATE TABLE {PERFUMER_TABLE} (row_id INTEGER, perfumer TEXT)')
+            start += len(_insert_chunk(con, chunk, start))
+
+        for column in DERIVED_COLUMNS + FIELD_INDEX_COLUMNS:
+            con.execute(f'CREATE INDEX idx_{TABLE}_{column} ON {TABLE} ({quote(column)})')
+        con.execute(f'CREATE INDEX idx_{PERFUMER_TABLE} ON {PERFUMER_TABLE} (perfumer, row_id)')
+        con.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        signature = _source_signature(csv_path, state, start)
+        con.execute("INSERT INTO meta VALUES ('signature', ?)", (json.dumps(signature),))
+        con.commit()
+        con.execute('ANALYZE')
+    finally:
+        con.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def append_rows(csv_path=DATA_PATH, db_path=SQLITE_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Inserta solo las filas agregadas al final del CSV desde la última construcción
+    Los índices se actualizan con cada INSERT; todo ocurre en una transacción, así
+    que los lectores ven la base anterior o la nueva.
+    Returns:
+        int | None: Filas insertadas, o None si el cambio no es un agregado al final
+    """
+    stored = _stored_signature(db_path)
+    if not stored or stored.get('schema_version') != SCHEMA_VERSION \
+            or stored.get('source') != os.path.abspath(csv_path):
+        return None
+    offset = appended_since(csv_path, stored['state'])
+    if offset is None:
+        return None
+
+    state = source_state(csv_path)
+    start = stored['rows']
+    con = sqlite3.connect(db_path)
+    try:
+        with con:
+            for chunk in read_tail(csv_path, offset, chunksize=chunk_rows):
+                start += len(_insert_chunk(con, clean_perfume_frame(chunk), start))
+            signature = _source_signature(csv_path, state, start)
+            con.execute("UPDATE meta SET value = ? WHERE key = 'signature'", (json.dumps(signature),))
+    finally:
+        con.close()
+    return start - stored['rows']
+
+
+def _is_current(csv_path, db_path):
+    stored = _stored_signature(db_path)
+    if not stored or stored.get('schema_version') != SCHEMA_VERSION:
+        return False
+    stat = os.stat(csv_path)
+    return (stored['state']['size'], stored['state']['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+
+
+@single_flight
+def ensure_database(csv_path=DATA_PATH, db_path=SQLITE_PATH):
+    """
+    Deja la base al día con el CSV
+    Si solo se agregaron filas al final se insertan esas filas; si el archivo se
+    reescribió (o la base no existe) se reconstruye completa.
+    Returns:
+        str: Ruta de la base lista para consultar
+    """
+    if not _is_current(csv_path, db_path):
+        if append_rows(csv_path, db_path) is None:
+            build_database(csv_path, db_path)
+    return db_path
+
+
+def connect(db_path=SQLITE_PATH):
+    """
+    Conexión de solo lectura reutilizada por hilo
+    mmap hace que las páginas de la base se lean desde la caché del SO, compartida
+    entre procesos, en lugar de copiarse a la memoria de cada worker.
+    """
+    ensure_database(db_path=db_path)
+    # Tras una reconstrucción el archivo es otro (os.replace): se reabre la conexión
+    key = (db_path, os.stat(db_path).st_ino)
+    connections = _local.__dict__.setdefault('connections', {})
+    con = connections.get(key)
+    if con is None:
+        for old_key in [k for k in connections if k[0] == db_path]:
+            connections.pop(old_key).close()
+        con = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        con.execute(f'PRAGMA mmap_size = {MMAP_BYTES}')
+        connections[key] = con
+    return con
+
+
+def _where(min_rating=None, min_reviews=None, genders=None, min_value_score=None, n_rows=CATALOG_ROWS,
+           row_ids=None, years=None, brands=None, perfumers=None):
+    """
+    Cláusula WHERE equivalente a los filtros de las páginas 2 y 3 (solo perfumes con rating)
+    row_ids restringe a posiciones del CSV (p. ej. las familias elegidas, Utils.clusters, o la
+    región del mapa de aromas, Utils.embedding). years, brands y perfumers son los filtros
+    de Utils.fields (años de lanzamiento inclusivos, marcas y perfumistas).
+    """
+    clauses = ['rating IS NOT NULL']
+    params = []
+    if n_rows is not None:
+        clauses.append('row_id < ?')
+        params.append(int(n_rows))
+    if min_rating is not None:
+        clauses.append('rating >= ?')
+        params.append(float(min_rating))
+    if min_reviews is not None:
+        clauses.append('rating_count >= ?')
+        params.append(float(min_reviews))
+    if min_value_score is not None:
+        clauses.append('value_score >= ?')
+        params.append(float(min_value_score))
+    if row_ids is not None:
+        clauses.append(f"row_id IN ({', '.join('?' * len(row_ids))})" if len(row_ids) else '0')
+        params.extend(int(i) for i in row_ids)
+    if years is not None:
+        clauses.append(f'{quote(YEAR_COL)} BETWEEN ? AND ?')
+        params.extend(int(year) for year in years)
+    if brands is not None:
+        clauses.append(f"{quote(BRAND_COL)} IN ({', '.join('?' * len(brands))})" if len(brands) else '0')
+        params.extend(brands)
+    if perfumers is not None:
+        clauses.append(f"row_id IN (SELECT row_id FROM {PERFUMER_TABLE} "
+                       f"WHERE perfumer IN ({', '.join('?' * len(perfumers))}))" if len(perfumers) else '0')
+        params.extend(perfumers)
+    if genders is not None:
+        labels = [g for g in genders if isinstance(g, str)]
+        condition = f"gender_dominant IN ({', '.join('?' * len(labels))})" if labels else '0'
+        # Los perfumes sin votos de género (NaN en pandas) se incluyen si se seleccionan
+        if len(labels) < len(genders):
+            condition = f'({condition} OR gender_dominant IS NULL)'
+        clauses.append(condition)
+        params.extend(labels)
+    return ' AND '.join(clauses), params
+
+
+def intersect_row_ids(*row_ids):
+    """
+    Intersección de varias restricciones row_ids (None = sin restricción)
+    Returns:
+        list | None: Posiciones en todas las restricciones, o None si no hay ninguna
+    """
+    restrictions = [ids for ids in row_ids if ids is not None]
+    if not restrictions:
+        return None
+    common = np.asarray(restrictions[0], dtype=np.int64)
+    for ids in restrictions[1:]:
+        common = np.intersect1d(common, np.asarray(ids, dtype=np.int64), assume_unique=True)
+    return common.tolist()
+
+
+def table_columns(db_path=SQLITE_PATH):
+    """Columnas de la tabla de perfumes, en el orden del CSV"""
+    rows = connect(db_path).execute(f'PRAGMA table_info({TABLE})').fetchall()
+    return [row[1] for row in rows]
+
+
+def columns_with_prefixes(prefixes, db_path=SQLITE_PATH):
+    """Columnas del CSV que empiezan por alguno de los prefijos (sin las derivadas)"""
+    return [col for col in table_columns(db_path)
+            if col.startswith(tuple(prefixes)) and col not in DERIVED_COLUMNS and col != 'row_id']
+
+
+def filter_options(n_rows=CATALOG_ROWS, db_path=SQLITE_PATH):
+    """
+    Rangos de los controles de filtro, calculados en SQL
+    Returns:
+        dict: max_rating_count, max_value_score, genders (en orden de aparición) y las
+              opciones de Utils.fields: years (mínimo y máximo conocidos), brands y perfumers
+    """
+    con = connect(db_path)
+    where, params = _where(n_rows=n_rows)
+    max_count, max_value, min_year, max_year = con.execute(
+        f'SELECT MAX(rating_count), MAX(value_score), MIN(NULLIF({quote(YEAR_COL)}, {UNKNOWN_YEAR})), '
+        f'MAX(NULLIF({quote(YEAR_COL)}, {UNKNOWN_YEAR})) FROM {TABLE} WHERE {where}', params
+    ).fetchone()
+    brands = [row[0] for row in con.execute(
+        f'SELECT DISTINCT {quote(BRAND_COL)} FROM {TABLE} WHERE {where} AND {quote(BRAND_COL)} IS NOT NULL '
+        f'ORDER BY {quote(BRAND_COL)}', params
+    )]
+    perfumers = [row[0] for row in con.execute(
+        f'SELECT DISTINCT perfumer FROM {PERFUMER_TABLE} '
+        f'WHERE row_id IN (SELECT row_id FROM {TABLE} WHERE {where}) ORDER BY perfumer', params
+    )]
+    genders = [row[0] for row in con.execute(
+        f'SELECT gender_dominant FROM {TABLE} WHERE {where} '
+        f'GROUP BY gender_dominant ORDER BY MIN(row_id)', params
+    )]
+    return {
+        'max_rating_count': max_count or 0,
+        'max_value_score': max_value or 0.0,
+        'genders': [np.nan if g is None else g for g in genders],
+        'years': None if min_year is None else (min_year, max_year),
+        'brands': brands,
+        'perfumers': perfumers,
+    }
+
+
+def query_perfumes(columns, db_path=SQLITE_PATH, **filters):
+    """
+    Filas filtradas, solo con las columnas pedidas
+    Args:
+        columns (list): Columnas del CSV necesarias para los gráficos
+        **filters: min_rating, min_reviews, genders, min_value_score, n_rows, row_ids,
+                   years, brands, perfumers
+    Returns:
+        pd.DataFrame: En el orden original del CSV, con las posiciones del CSV como índice
+                      (igual que load_catalog, para las máscaras por posición)
+    """
+    where, params = _where(**filters)
+    select = ', '.join(['row_id'] + [quote(col) for col in columns])
+    frame = pd.read_sql_query(
+        f'SELECT {select} FROM {TABLE} WHERE {where} ORDER BY row_id', connect(db_path),
+        params=params, index_col='row_id'
+    )
+    frame.index.name = None
+    return frame
+
+
+def summarize(sums=(), db_path=SQLITE_PATH, **filters):
+    """
+    Métricas agregadas en SQL sobre las filas filtradas
+    Args:
+        sums (list): Columnas cuya suma se necesita además de las métricas básicas
+    Returns:
+        dict: count, mean_rating, total_reviews, mean_value_score y una entrada por columna de sums
+    """
+    where, params = _where(**filters)
+    expressions = ['COUNT(*)', 'AVG(rating)', 'SUM(rating_count)', 'AVG(value_score)']
+    expressions += [f'TOTAL({quote(col)})' for col in sums]
+    row = connect(db_path).execute(
+        f"SELECT {', '.join(expressions)} FROM {TABLE} WHERE {where}", params
+    ).fetchone()
+    summary = {
+        'count': row[0],
+        'mean_rating': row[1],
+        'total_reviews': row[2] or 0,
+        'mean_value_score': row[3],
+    }
+    summary.update(zip(sums, row[4:]))
+    return summary
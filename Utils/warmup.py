@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+
+from Utils.data_loader import (
+    artifacts_enabled, is_large_source, load_catalog, load_perfume_data, refresh_perfume_data,
+    storage_backend
+)
+from Utils.indexes import get_accord_index, get_cached_accord_stats
+
+logger = logging.getLogger('perfume.warmup')
+
+_lock = threading.Lock()
+_started = threading.Event()
+_finished = threading.Event()
+_status = {'seconds': None, 'error': None}
+
+
+def refresh_interval():
+    """
+    Segundos entre revisiones del CSV en busca de filas nuevas (PERFUME_REFRESH_SECONDS, 0 = nunca)
+    """
+    return float(os.environ.get('PERFUME_REFRESH_SECONDS', 0))
+
+
+def refresh_sources():
+    """
+    Incorpora filas agregadas al final del CSV en los almacenes que estén en uso
+    Cada almacén procesa solo las filas nuevas (o se reconstruye si el archivo se reescribió).
+    Returns:
+        int | None: Filas nuevas en memoria (ver refresh_perfume_data)
+    """
+    if storage_backend() == 'sqlite':
+        from Utils.sqlite_backend import ensure_database
+        ensure_database()
+    if is_large_source():
+        from Utils.ingest import ensure_store
+        ensure_store()
+        return 0
+    return refresh_perfume_data()
+
+
+def _refresh_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            new_rows = refresh_sources()
+            if new_rows:
+                logger.info("Catálogo actualizado: %d filas nuevas", new_rows)
+        except Exception as error:
+            logger.warning("Actualización incremental fallida: %r", error)
+
+
+def warmup_enabled():
+    """
+    El precalentamiento se desactiva con PERFUME_WARMUP=0
+    """
+    return os.environ.get('PERFUME_WARMUP', '1') != '0'
+
+
+def _run():
+    start = time.perf_counter()
+    try:
+        if storage_backend() == 'sqlite':
+            # Las páginas 2 y 3 consultan la base en disco: basta con construirla
+            from Utils.sqlite_backend import ensure_database
+            ensure_database()
+        if is_large_source():
+            # Catálogo grande: ingesta por bloques al almacén columnar en lugar de cargarlo entero
+            from Utils.ingest import ensure_store
+            ensure_store()
+        else:
+            load_perfume_data()
+            if artifacts_enabled():
+                # Los workers que arranquen después mapean los artefactos en lugar de leer el CSV
+                from Utils.artifacts import ensure_artifacts
+                ensure_artifacts()
+        # Vista compartida por las páginas
+        catalog = load_catalog()
+        # Índices y agregados de la vista por defecto
+        get_accord_index(catalog)
+        get_cached_accord_stats(catalog)
+        # Agregados del explorador de marcas
+        from Utils.brands import get_brand_aggregates
+        get_brand_aggregates(catalog)
+        # Modelo de familias (filtro de todas las páginas): se lee de disco o se ajusta una vez
+        from Utils.clusters import load_cluster_model
+        load_cluster_model()
+        # Mapa de aromas (proyección precalculada que abren todas las páginas)
+        from Utils.embedding import load_embedding
+        load_embedding()
+        # Índice de búsqueda de las descripciones (filtro de texto de las páginas 2 y 3)
+        from Utils.search import load_search_index
+        load_search_index()
+        # Grupos de duplicados y flankers (explorador de marcas)
+        from Utils.duplicates import load_duplicate_model
+        load_duplicate_model()
+    except Exception as error:  # el precalentamiento nunca debe tumbar el servidor
+        _status['error'] = repr(error)
+        logger.warning("Precalentamiento fallido: %r", error)
+    finally:
+        _status['seconds'] = time.perf_counter() - start
+        _finished.set()
+    if refresh_interval() > 0:
+        _refresh_loop(refresh_interval())
+
+
+def start_warmup():
+    """
+    Lanza (una sola vez por proceso) el precalentamiento en segundo plano
+    Las sesiones que llegan mientras tanto esperan el mismo cómputo en vuelo
+    (single_flight) en lugar de repetirlo.
+    Returns:
+        bool: True si esta llamada lanzó el hilo
+    """
+    if not warmup_enabled():
+        return False
+    with _lock:
+        if _started.is_set():
+            return False
+        _started.set()
+    threading.Thread(target=_run, name='perfume-warmup', daemon=True).start()
+    return True
+
+
+def wait_for_warmup(timeout=None):
+    """
+    Espera a que termine el precalentamiento (útil en benchmarks)
+    Returns:
+        dict: Duración y error (si hubo) del precalentamiento
+    """
+    _finished.wait(timeout)
+    return dict(_status)
@@ -1,8 +1,15 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from Utils.data_loader import load_perfume_data, get_accord_stats
+from Utils.clusters import family_filter, family_mask
+from Utils.data_loader import RATING_COL, RATING_COUNT_COL, load_catalog, select_rows
+from Utils.embedding import map_mask, map_region_filter
+from Utils.leaderboards import get_accord_leaderboard, top_k
+from Utils.instrumentation import begin_rerun, finish_rerun, record_stage
+from Utils.warmup import start_warmup
 
 
 # Configuración de página principal
@@ -12,6 +19,8 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+start_warmup()
+begin_rerun('app')
 
 
 st.markdown("""
@@ -161,13 +170,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Cargar datos
-@st.cache_data
 def load_data():
-    df_full = load_perfume_data()
     # Tomar solo los primeros 521 perfumes que tienen información completa
-    return df_full.head(521)
+    return load_catalog()
 
+t_stage = time.perf_counter()
 df = load_data()
+record_stage('load_data', 'load', t_stage, rows_out=len(df))
 
 if df.empty:
     st.error("No se pudieron cargar los datos. Verifica que el archivo 'data/perfumes_ordenado.csv' existe.")
@@ -175,6 +184,21 @@ if df.empty:
 
 # Sidebar con información general
 st.sidebar.title("Información del Dataset")
+
+# Familias olfativas y región del mapa elegidas (mismos filtros que las demás páginas)
+families = family_filter()
+region = map_region_filter()
+catalog = df
+selected_rows = family_mask(catalog, families)
+region_rows = map_mask(catalog, region)
+if region_rows is not None:
+    selected_rows = region_rows if selected_rows is None else selected_rows & region_rows
+if selected_rows is not None:
+    df = select_rows(catalog, selected_rows)
+    if len(df) == 0:
+        st.warning("No hay perfumes en las familias o la región seleccionadas.")
+        finish_rerun()
+        st.stop()
 st.sidebar.metric("Total de Perfumes", f"{len(df):,}")
 
 # Calcular estadísticas rápidas
@@ -241,9 +265,8 @@ with col2:
 st.markdown("---")
 st.markdown('<h2 class="section-title">Insights Principales del Dataset</h2>', unsafe_allow_html=True)
 
-# Calcular insights
-accord_stats = get_accord_stats(df)
-top_accords = sorted(accord_stats.items(), key=lambda x: x[1]['frequency'], reverse=True)[:5]
+# Calcular insights (órdenes precalculados por tabla de posiciones, sin ordenar en cada rerun)
+top_accords = get_accord_leaderboard(df)[:5]
 
 insight_cols = st.columns(3)
 
@@ -260,8 +283,8 @@ with insight_cols[0]:
 
 with insight_cols[1]:
     # Perfume con más reviews
-    most_reviewed = df.loc[df['calificationNumbers.ratingCount'].idxmax()]
-    review_count = most_reviewed['calificationNumbers.ratingCount']
+    most_reviewed = catalog.iloc[top_k(catalog, 'rating_count', 1, selected_rows)[0]]
+    review_count = most_reviewed[RATING_COUNT_COL]
     st.markdown(f"""
     <div class="metric-card">
         <h4>Más Reseñado</h4>
@@ -272,7 +295,7 @@ with insight_cols[1]:
 
 with insight_cols[2]:
     # Rating más alto
-    highest_rated = df['calificationNumbers.ratingValue'].max()
+    highest_rated = catalog[RATING_COL].iloc[top_k(catalog, 'rating', 1, selected_rows)[0]]
     st.markdown(f"""
     <div class="metric-card">
         <h4>Rating Máximo</h4>
@@ -286,6 +309,7 @@ st.markdown("---")
 st.markdown('<h2 class="section-title">Vista General: Top 5 Acordes</h2>', unsafe_allow_html=True)
 
 # Crear gráfico de barras de top acordes
+t_stage = time.perf_counter()
 top_10_data = []
 for accord, stats in top_accords[:10]:
     top_10_data.append({
@@ -340,10 +364,13 @@ fig.update_layout(
     )
 )
 
+record_stage('top_acordes', 'figure', t_stage, rows_out=len(top_10_df), figure=fig)
+
 # Envolver el gráfico en un contenedor
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
 st.plotly_chart(fig, use_container_width=True, key="main_top_accords_chart")
 st.markdown('</div>', unsafe_allow_html=True)
+finish_rerun()
 yaxis=dict(
         gridcolor='#ECF0F1',
         linecolor='#BDC3C7'
@@ -0,0 +1,91 @@
+"""
+Benchmark de ingesta incremental: reconstrucción completa vs. agregar un 1 % de filas.
+
+Genera un catálogo sintético, lo escribe sin su último tramo, construye cada
+almacén (columnar en disco, SQLite y DataFrame en memoria con su índice de
+acordes), agrega el tramo al final del CSV y mide cuánto cuesta incorporarlo
+frente a reconstruir desde cero.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_append
+    python -m benchmarks.bench_append --rows 1m --fraction 0.01
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.harness import format_scale, parse_scale, write_results
+from benchmarks.datasets import synthetic_catalog, write_catalog_csv
+from benchmarks.synthetic import write_csv_chunk
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run(n_rows, fraction, seed=0):
+    import pandas as pd
+    from Utils import data_loader, indexes, ingest, sqlite_backend
+
+    tail_rows = max(1, int(n_rows * fraction))
+    df = synthetic_catalog(n_rows, seed=seed)
+    results = {'rows': n_rows, 'tail_rows': tail_rows}
+
+    with tempfile.TemporaryDirectory(prefix='perfume-append-') as tmp:
+        csv_path = write_catalog_csv(df.iloc[:n_rows - tail_rows], os.path.join(tmp, 'catalogo.csv'))
+        store_dir = os.path.join(tmp, 'store')
+        db_path = os.path.join(tmp, 'catalogo.sqlite')
+
+        # Estado inicial de cada almacén
+        ingest.ingest_catalog(csv_path, store_dir)
+        sqlite_backend.build_database(csv_path, db_path)
+        indexes.get_accord_index(data_loader.load_perfume_data(csv_path))
+
+        with open(csv_path, 'ab') as fh:
+            write_csv_chunk(df.iloc[n_rows - tail_rows:], fh, header=False)
+
+        cases = {
+            'almacen_columnar': (lambda: ingest.append_to_store(csv_path, store_dir),
+                                 lambda: ingest.ingest_catalog(csv_path, store_dir)),
+            'sqlite': (lambda: sqlite_backend.append_rows(csv_path, db_path),
+                       lambda: sqlite_backend.build_database(csv_path, db_path)),
+            'memoria': (lambda: data_loader.refresh_perfume_data(csv_path),
+                        lambda: indexes.get_accord_index.__wrapped__(
+                            data_loader.clean_perfume_frame(pd.read_csv(csv_path)))),
+        }
+        for name, (append, rebuild) in cases.items():
+            append_s, added = _timed(append)
+            rebuild_s, _ = _timed(rebuild)
+            results[name] = {
+                'append_s': append_s,
+                'rebuild_s': rebuild_s,
+                'added_rows': added,
+                'ratio': append_s / rebuild_s,
+            }
+            print(f"{name:<17} incremental={append_s * 1000:9.1f} ms  completa={rebuild_s * 1000:9.1f} ms  "
+                  f"razón={append_s / rebuild_s:6.3f}  filas nuevas={added}", flush=True)
+        shutil.rmtree(store_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='100k', help='Filas del catálogo: 100k, 1m...')
+    parser.add_argument('--fraction', type=float, default=0.01, help='Fracción agregada al final')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    n_rows = parse_scale(args.rows)
+    print(f"Catálogo de {format_scale(n_rows)} filas, agregando {args.fraction:.1%}")
+    results = run(n_rows, args.fraction, args.seed)
+    path = write_results('append', results, args.output)
+    print(f"\nResultados escritos en {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de artefactos mapeados: N workers leyendo el CSV vs. mapeando los artefactos.
+
+Genera un catálogo sintético, construye sus artefactos (Utils.artifacts) y
+lanza N procesos que cargan el dataset y su índice de acordes, como haría cada
+servidor de Streamlit detrás del balanceador. Con los N procesos vivos a la vez
+mide el tiempo de carga y, en Linux, la memoria de cada uno: RSS, privada y PSS
+(la memoria compartida se reparte entre los procesos que la mapean).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_artifacts
+    python -m benchmarks.bench_artifacts --rows 200k --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import ROOT, format_scale, parse_scale, write_results
+from benchmarks.datasets import synthetic_catalog, write_catalog_csv
+
+# Proceso hijo: carga, reporta y espera a que el padre mida a todos los workers juntos
+CHILD_SCRIPT = """
+import json, sys, time
+t_start = time.perf_counter()
+from Utils.data_loader import load_perfume_data
+from Utils.indexes import get_accord_index
+df = load_perfume_data(sys.argv[1])
+get_accord_index(df)
+print(json.dumps({'load_s': time.perf_counter() - t_start, 'rows': len(df)}), flush=True)
+sys.stdin.read()
+"""
+
+
+def _memory(pid):
+    """RSS, privada y PSS en MB (smaps_rollup de Linux; None en otros sistemas)"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            fields = dict(line.split(':', 1) for line in fh if ':' in line)
+    except OSError:
+        return None
+    kb = {key: int(value.split()[0]) for key, value in fields.items() if value.strip().endswith('kB')}
+    return {
+        'rss_mb': kb['Rss'] / 1024,
+        'private_mb': (kb['Private_Clean'] + kb['Private_Dirty']) / 1024,
+        'pss_mb': kb['Pss'] / 1024,
+    }
+
+
+def run_workers(csv_path, workers, use_artifacts, artifact_dir):
+    env = dict(os.environ, PERFUME_ARTIFACTS='1' if use_artifacts else '0',
+               PERFUME_ARTIFACT_DIR=artifact_dir, PERFUME_METRICS='0', PYTHONPATH=ROOT)
+    procs = [
+        subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT, csv_path], cwd=ROOT, env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    try:
+        reports = [json.loads(proc.stdout.readline()) for proc in procs]
+        memory = [_memory(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    result = {
+        'load_s_median': statistics.median(r['load_s'] for r in reports),
+        'rows': reports[0]['rows'],
+    }
+    if all(memory):
+        for key in ('rss_mb', 'private_mb', 'pss_mb'):
+            result[f'{key}_total'] = sum(m[key] for m in memory)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='100k', help='Filas del catálogo: 100k, 1m...')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    from Utils.artifacts import build_artifacts
+
+    n_rows = parse_scale(args.rows)
+    results = {'rows': n_rows, 'workers': args.workers}
+    with tempfile.TemporaryDirectory(prefix='perfume-artifacts-') as tmp:
+        csv_path = write_catalog_csv(synthetic_catalog(n_rows, seed=args.seed), os.path.join(tmp, 'catalogo.csv'))
+        artifact_dir = os.path.join(tmp, 'artifacts')
+        start = time.perf_counter()
+        build_artifacts(csv_path, artifact_dir)
+        results['build_s'] = time.perf_counter() - start
+        print(f"Catálogo de {format_scale(n_rows)} filas, artefactos construidos en {results['build_s']:.2f} s")
+
+        for name, use_artifacts in (('csv', False), ('artefactos', True)):
+            results[name] = run_workers(csv_path, args.workers, use_artifacts, artifact_dir)
+            line = f"{name:<11} carga={results[name]['load_s_median'] * 1000:8.1f} ms"
+            if 'pss_mb_total' in results[name]:
+                line += (f"  RSS total={results[name]['rss_mb_total']:8.1f} MB"
+                         f"  privada total={results[name]['private_mb_total']:8.1f} MB"
+                         f"  PSS total={results[name]['pss_mb_total']:8.1f} MB")
+            print(line, flush=True)
+
+    path = write_results('artifacts', results, args.output)
+    print(f"\nResultados escritos en {path}")
+
+
+if __name__ == '__main__':
+    main()
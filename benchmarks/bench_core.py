@@ -0,0 +1,201 @@
+"""
+Benchmarks de Utils/data_loader y de los constructores de gráficos.
+
+Mide a varias escalas sintéticas (por defecto 1k, 100k y 1M filas):
+
+- load_perfume_data, get_accord_stats, filter_perfumes_by_accords,
+  get_perfume_profile, get_perfume_profiles (20 perfumes), get_similar_perfumes,
+  export_filtered_data
+- cada create_* de pages/page2.py, pages/page3.py y Utils/plotting.py
+
+Los resultados se escriben en benchmarks/results/core.json y, si existe,
+se comparan contra la línea base guardada.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_core
+    python -m benchmarks.bench_core --scales 1k 100k --only page3
+    python -m benchmarks.bench_core --save-baseline
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+
+from benchmarks.harness import (
+    ROOT, compare_to_baseline, format_scale, load_results, parse_scale,
+    time_call, write_results
+)
+from benchmarks.bench_figures import named_page_builders
+from benchmarks.datasets import loaded_catalog, synthetic_catalog, write_catalog_csv
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'core.json')
+DEFAULT_SCALES = ['1k', '100k', '1m']
+
+
+def data_loader_cases(df, csv_path):
+    """
+    Casos de Utils/data_loader sobre un catálogo ya cargado
+    """
+    from Utils import data_loader
+
+    target = df['name'].iloc[0]
+    batch = df['name'].iloc[:20].tolist()
+
+    def load():
+        return data_loader.load_perfume_data(csv_path)
+
+    return {
+        # Carga en frío: sin la caché de Streamlit ni el último DataFrame cargado
+        'data_loader.load_perfume_data': (load, lambda: data_loader.forget_perfume_data(csv_path)),
+        'data_loader.get_accord_stats': (lambda: data_loader.get_accord_stats(df), None),
+        'data_loader.filter_perfumes_by_accords': (
+            lambda: data_loader.filter_perfumes_by_accords(df, ['Amaderado', 'Cítrico', 'Dulce'], 50), None),
+        'data_loader.get_perfume_profile': (lambda: data_loader.get_perfume_profile(df, target), None),
+        'data_loader.get_perfume_profiles[20]': (lambda: data_loader.get_perfume_profiles(df, batch), None),
+        'data_loader.get_similar_perfumes': (lambda: data_loader.get_similar_perfumes(df, target), None),
+        'data_loader.export_filtered_data[csv]': (lambda: data_loader.export_filtered_data(df, 'csv'), None),
+        'data_loader.export_filtered_data[json]': (lambda: data_loader.export_filtered_data(df, 'json'), None),
+    }
+
+
+def page_cases(df, module_name, prepare_name):
+    """
+    Casos para cada create_* de una página, sobre los datos preparados por la página
+    """
+    module = importlib.import_module(module_name)
+    prepared = getattr(module, prepare_name)(df)
+    short = module_name.split('.')[-1]
+    cases = {f'{short}.{prepare_name}': (lambda: getattr(module, prepare_name)(df), None)}
+    for name, builder in named_page_builders(module).items():
+        cases[f'{short}.{name}'] = (lambda builder=builder: builder(prepared), None)
+    return cases
+
+
+def plotting_cases(df):
+    """
+    Casos para los create_* de Utils/plotting con entradas derivadas del catálogo
+    """
+    import pandas as pd
+    from Utils import plotting
+    from Utils.data_loader import get_accord_stats
+
+    stats = get_accord_stats(df)
+    top = sorted(stats.items(), key=lambda x: x[1]['frequency'], reverse=True)[:8]
+    top_columns = [col for col, _ in top]
+    top_df = pd.DataFrame({
+        'acorde': [col.replace('accords.', '') for col in top_columns],
+        'frecuencia': [s['frequency'] for _, s in top],
+    })
+    radar_data = {
+        'Frecuencia': [s['perfume_percentage'] for _, s in top],
+        'Intensidad': [s['mean_intensity'] for _, s in top],
+    }
+    gender_cols = [col for col in df.columns if col.startswith('gender.')]
+    scored = df.assign(
+        gender_dominant=df[gender_cols].fillna(-1).idxmax(axis=1).str.replace('gender.', '')
+    )
+    rating = 'calificationNumbers.ratingValue'
+    count = 'calificationNumbers.ratingCount'
+    rated = scored.dropna(subset=[rating])
+
+    return {
+        'plotting.create_radar_chart': (
+            lambda: plotting.create_radar_chart(radar_data, top_df['acorde'].tolist(), None), None),
+        'plotting.create_correlation_heatmap': (
+            lambda: plotting.create_correlation_heatmap(df[top_columns].corr()), None),
+        'plotting.create_bar_chart': (
+            lambda: plotting.create_bar_chart(top_df, 'acorde', 'frecuencia'), None),
+        'plotting.create_scatter_plot': (
+            lambda: plotting.create_scatter_plot(rated, count, rating, size_col=rating, hover_data=['name']), None),
+        'plotting.create_histogram': (lambda: plotting.create_histogram(rated, rating), None),
+        'plotting.create_box_plot': (
+            lambda: plotting.create_box_plot(rated, 'gender_dominant', rating), None),
+        'plotting.create_sunburst_chart': (
+            lambda: plotting.create_sunburst_chart(top_df, ['acorde'], 'frecuencia'), None),
+    }
+
+
+def collect_cases(df, csv_path, only=None):
+    """
+    Reúne todos los casos y aplica el filtro --only (subcadena del nombre)
+    """
+    cases = {}
+    cases.update(data_loader_cases(df, csv_path))
+    cases.update(page_cases(df, 'pages.page2', 'prepare_rating_data'))
+    cases.update(page_cases(df, 'pages.page3', 'prepare_usage_data'))
+    cases.update(plotting_cases(df))
+    if only:
+        cases = {name: case for name, case in cases.items() if any(token in name for token in only)}
+    return cases
+
+
+def run(scales, repeat, only=None, seed=0):
+    """
+    Ejecuta todos los casos a cada escala
+    Returns:
+        dict: {caso: {escala: medición}}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='perfume-bench-') as tmp:
+        for n_rows in scales:
+            label = format_scale(n_rows)
+            df = synthetic_catalog(n_rows, seed=seed)
+            csv_path = write_catalog_csv(df, os.path.join(tmp, f'catalog_{label}.csv'))
+            # A gran escala una sola repetición ya es representativa
+            reps = repeat if n_rows < 1_000_000 else 1
+            for name, (func, setup) in collect_cases(loaded_catalog(df), csv_path, only).items():
+                try:
+                    measurement = time_call(func, repeat=reps, setup=setup)
+                except Exception as e:  # un caso roto no debe abortar la suite
+                    measurement = {'error': f'{type(e).__name__}: {str(e).strip().splitlines()[0]}'}
+                measurement['rows'] = n_rows
+                results.setdefault(name, {})[label] = measurement
+                shown = f"{measurement['median_s'] * 1000:10.1f} ms" if 'median_s' in measurement else measurement['error']
+                print(f"[{label:>4}] {name:<55} {shown}", flush=True)
+            os.remove(csv_path)
+    return results
+
+
+def print_comparison(rows):
+    if not rows:
+        print("Sin casos comparables con la línea base.")
+        return
+    print(f"\n{'caso':<55} {'escala':>6} {'base (ms)':>12} {'actual (ms)':>12} {'razón':>7}  estado")
+    for row in rows:
+        print(f"{row['case']:<55} {row['scale']:>6} {row['baseline_s'] * 1000:12.1f} "
+              f"{row['current_s'] * 1000:12.1f} {row['ratio']:7.2f}  {row['status']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES, help='Escalas: 1k, 100k, 1m...')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', default=None, help='Subcadenas de casos a ejecutar')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Guarda estos resultados como línea base')
+    parser.add_argument('--threshold', type=float, default=1.15, help='Razón que se considera regresión')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run([parse_scale(s) for s in args.scales], args.repeat, args.only, args.seed)
+    path = write_results('core', results, args.output)
+    print(f"\nResultados escritos en {path}")
+
+    if args.save_baseline:
+        write_results('core', results, args.baseline)
+        print(f"Línea base guardada en {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        rows = compare_to_baseline(results, load_results(args.baseline)['results'], args.threshold)
+        print_comparison(rows)
+        if args.fail_on_regression and any(row['status'] == 'regresión' for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark de construcción paralela de figuras por página.
+
+Para cada página (pages/page2.py y pages/page3.py) construye todas sus figuras
+create_* sobre los datos preparados, en secuencia y con Utils.parallel.build_figures
+usando pools de distinto tamaño, y reporta la latencia total y la aceleración.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_figures
+    python -m benchmarks.bench_figures --scales 100k 1m --workers 1 2 4 8
+"""
+import argparse
+import importlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import format_scale, parse_scale, time_call, write_results
+from benchmarks.datasets import loaded_catalog, synthetic_catalog
+
+PAGES = {
+    'page2': ('pages.page2', 'prepare_rating_data'),
+    'page3': ('pages.page3', 'prepare_usage_data'),
+}
+DEFAULT_SCALES = ['1k', '100k']
+
+
+def _affinity_heatmaps(name, builder):
+    # El mapa de afinidad recibe los totales de Utils.affinity y una dimensión: un caso por dimensión
+    from Utils.affinity import AFFINITY_DIMENSIONS, affinity
+
+    def case(dimension):
+        return lambda prepared: builder(affinity(prepared), dimension)
+
+    return {f'{name}[{dimension}]': case(dimension) for dimension in AFFINITY_DIMENSIONS}
+
+
+# Constructores que no reciben solo los datos preparados: nombre -> casos explícitos
+SPECIAL_BUILDERS = {
+    'create_accord_affinity_heatmap': _affinity_heatmaps,
+}
+
+
+def named_page_builders(module):
+    """
+    Constructores create_* de la página por nombre, en orden alfabético
+    Cada uno recibe solo los datos preparados (los de SPECIAL_BUILDERS se envuelven).
+    """
+    builders = {}
+    for name in sorted(dir(module)):
+        if not name.startswith('create_') or not callable(getattr(module, name)):
+            continue
+        if name in SPECIAL_BUILDERS:
+            builders.update(SPECIAL_BUILDERS[name](name, getattr(module, name)))
+        else:
+            builders[name] = getattr(module, name)
+    return builders
+
+
+def page_builders(module):
+    """Constructores create_* de la página, en orden alfabético"""
+    return list(named_page_builders(module).values())
+
+
+def run(scales, workers, repeat, seed=0):
+    """
+    Mide cada página a cada escala, en secuencia y con cada tamaño de pool
+    Returns:
+        dict: {página: {escala: {'secuencial': medición, 'hilos=N': medición}}}
+    """
+    from Utils.parallel import build_figures
+
+    results = {}
+    for n_rows in scales:
+        label = format_scale(n_rows)
+        df = loaded_catalog(synthetic_catalog(n_rows, seed=seed))
+        for page, (module_name, prepare_name) in PAGES.items():
+            module = importlib.import_module(module_name)
+            prepared = getattr(module, prepare_name)(df)
+            builders = page_builders(module)
+            # Calentamiento: importaciones diferidas y cachés de plotly fuera de la medición
+            for builder in builders:
+                builder(prepared)
+
+            row = {'figures': len(builders), 'rows': n_rows}
+            row['secuencial'] = time_call(lambda: [b(prepared) for b in builders], repeat=repeat)
+            base = row['secuencial']['median_s']
+            print(f"[{label:>4}] {page} secuencial {base * 1000:10.1f} ms", flush=True)
+            for count in workers:
+                with ThreadPoolExecutor(max_workers=count) as pool:
+                    measurement = time_call(
+                        lambda: build_figures(builders, prepared, executor=pool), repeat=repeat)
+                measurement['speedup'] = base / measurement['median_s']
+                row[f'hilos={count}'] = measurement
+                print(f"[{label:>4}] {page} hilos={count:<2}    {measurement['median_s'] * 1000:10.1f} ms "
+                      f"(x{measurement['speedup']:.2f})", flush=True)
+            results.setdefault(page, {})[label] = row
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES, help='Escalas: 1k, 100k, 1m...')
+    parser.add_argument('--workers', nargs='+', type=int,
+                        default=sorted({2, min(4, os.cpu_count() or 1), os.cpu_count() or 1}),
+                        help='Tamaños de pool a comparar')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    results = run([parse_scale(s) for s in args.scales], args.workers, args.repeat, args.seed)
+    path = write_results('figures', results, args.output)
+    print(f"\nResultados escritos en {path}")
+
+
+if __name__ == '__main__':
+    main()
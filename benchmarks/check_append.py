@@ -0,0 +1,157 @@
+"""
+Verificación de la ingesta incremental: agregar filas al final equivale a reconstruir.
+
+Escribe un catálogo sintético pequeño, lo carga con load_perfume_data y modifica
+el CSV de cuatro formas. refresh_perfume_data debe extender el DataFrame (y su
+matriz de acordes) solo si las filas se agregaron al final; si el inicio se
+reescribió, el corte anterior no terminaba en una fila completa o el archivo se
+truncó, debe pedir una recarga completa. En todos los casos el DataFrame final
+tiene que ser igual al de leer el CSV desde cero.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.check_append
+    python -m benchmarks.check_append --rows 2000
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import expect
+from benchmarks.datasets import synthetic_catalog, write_catalog_csv
+from benchmarks.synthetic import write_csv_chunk
+
+
+def _rebuilt(path):
+    from Utils.data_loader import clean_perfume_frame
+    return clean_perfume_frame(pd.read_csv(path))
+
+
+def _same_as_rebuild(path, name):
+    """El DataFrame de load_perfume_data y su matriz de acordes coinciden con una lectura completa"""
+    from Utils.data_loader import load_perfume_data
+    from Utils.indexes import get_accord_index
+
+    frame, expected = load_perfume_data(path), _rebuilt(path)
+    try:
+        # Las categorías de una columna extendida pueden quedar en otro orden
+        pd.testing.assert_frame_equal(frame, expected, check_categorical=False)
+    except AssertionError as e:
+        raise AssertionError(f"{name}: el DataFrame difiere de la reconstrucción\n{e}") from None
+    index, rebuilt = get_accord_index(frame), get_accord_index.__wrapped__(expected)
+    expect(index['columns'] == rebuilt['columns'], f"{name}: columnas de acordes distintas")
+    expect(np.array_equal(np.asarray(index['matrix']), np.asarray(rebuilt['matrix'])),
+           f"{name}: la matriz de acordes difiere de la reconstrucción")
+
+
+def _start(path, df, partial=b''):
+    """
+    Escribe el CSV inicial y lo carga (con su matriz de acordes) como lo haría la app
+    Returns:
+        dict: Estado del CSV que quedó registrado al cargarlo
+    """
+    from Utils.data_loader import forget_perfume_data, load_perfume_data, loaded_source
+    from Utils.indexes import get_accord_index
+
+    forget_perfume_data(path)
+    write_catalog_csv(df, path)
+    with open(path, 'ab') as fh:
+        fh.write(partial)
+    get_accord_index(load_perfume_data(path))
+    loaded = loaded_source(path)
+    expect(loaded is not None, "no se pudo cargar el CSV inicial")
+    return loaded['source']
+
+
+def _rows_bytes(df):
+    with tempfile.TemporaryFile() as fh:
+        write_csv_chunk(df, fh, header=False)
+        fh.seek(0)
+        return fh.read()
+
+
+def check_pure_append(path, head, tail):
+    from Utils.appends import appended_since
+    from Utils.data_loader import refresh_perfume_data
+
+    state = _start(path, head)
+    with open(path, 'ab') as fh:
+        fh.write(_rows_bytes(tail))
+    expect(appended_since(path, state) == state['size'], "agregado: no se detectó el punto de corte")
+    added = refresh_perfume_data(path)
+    expect(added == len(tail), f"agregado: se incorporaron {added} filas en lugar de {len(tail)}")
+    _same_as_rebuild(path, 'agregado')
+
+
+def check_rewritten_head(path, head, tail):
+    from Utils.appends import appended_since
+    from Utils.data_loader import refresh_perfume_data
+
+    state = _start(path, head)
+    # Mismas filas nuevas al final, pero la primera fila cambia (el archivo también crece)
+    rewritten = head.copy()
+    rewritten.iloc[0, rewritten.columns.get_loc('name')] = 'Perfume Reescrito'
+    write_catalog_csv(pd.concat([rewritten, tail]), path)
+    expect(appended_since(path, state) is None, "inicio reescrito: se tomó como agregado")
+    expect(refresh_perfume_data(path) is None, "inicio reescrito: no pidió recarga completa")
+    _same_as_rebuild(path, 'inicio reescrito')
+
+
+def check_partial_row(path, head, tail):
+    from Utils.appends import appended_since
+    from Utils.data_loader import refresh_perfume_data
+
+    # El CSV inicial termina a mitad de una fila (se estaba escribiendo al cargarlo):
+    # el corte queda después del primer campo, así que la fila se lee con valores faltantes
+    rows = _rows_bytes(tail)
+    cut = rows.index(b',') + 1
+    state = _start(path, head, partial=rows[:cut])
+    with open(path, 'ab') as fh:
+        fh.write(rows[cut:])
+    expect(appended_since(path, state) is None, "fila incompleta: se tomó como agregado")
+    expect(refresh_perfume_data(path) is None, "fila incompleta: no pidió recarga completa")
+    _same_as_rebuild(path, 'fila incompleta')
+
+
+def check_truncated(path, head, tail):
+    from Utils.appends import appended_since
+    from Utils.data_loader import refresh_perfume_data
+
+    state = _start(path, pd.concat([head, tail]))
+    write_catalog_csv(head, path)
+    expect(appended_since(path, state) is None, "truncado: se tomó como agregado")
+    expect(refresh_perfume_data(path) is None, "truncado: no pidió recarga completa")
+    _same_as_rebuild(path, 'truncado')
+
+
+CHECKS = {
+    'agregado al final': check_pure_append,
+    'inicio reescrito': check_rewritten_head,
+    'fila incompleta': check_partial_row,
+    'archivo truncado': check_truncated,
+}
+
+
+def run(n_rows, tail_rows, seed=0):
+    df = synthetic_catalog(n_rows, seed=seed)
+    head, tail = df.iloc[:n_rows - tail_rows], df.iloc[n_rows - tail_rows:]
+    with tempfile.TemporaryDirectory(prefix='perfume-check-append-') as tmp:
+        path = os.path.join(tmp, 'catalogo.csv')
+        for name, check in CHECKS.items():
+            check(path, head, tail)
+            print(f"{name:<18} ok", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=600, help='Filas del catálogo')
+    parser.add_argument('--tail', type=int, default=60, help='Filas agregadas al final')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    run(args.rows, args.tail, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Verificación de la detección de duplicados y flankers sobre un catálogo armado a mano.
+
+Nueve perfumes con resultado conocido: copias exactas (siempre en el grupo de su
+original, sin depender de los candidatos LSH), un flanker de la misma marca con
+acordes parecidos, perfumes sin acordes que solo se unen con un nombre de línea
+idéntico, y nombres o acordes parecidos que no deben agruparse (otra marca,
+acordes distintos). Comprueba los grupos de find_duplicates fila por fila.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.check_duplicates
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import expect
+from Utils.data_loader import URL_COL
+
+FRESH = {'accords.cítrico': 100.0, 'accords.acuático': 80.0, 'accords.aromático': 45.0}
+FRESH_FLANKER = {'accords.cítrico': 95.0, 'accords.acuático': 85.0, 'accords.aromático': 50.0}
+WOODY = {'accords.amaderado': 100.0, 'accords.cálido especiado': 70.0, 'accords.cuero': 40.0}
+NONE = {}
+
+# (nombre, marca, slug de la URL, acordes, grupo esperado: fila más baja del grupo o -1)
+CATALOG = [
+    ('Acqua di Gio Armani para Hombres', 'armani', 'acqua-di-gio', FRESH, 0),
+    # Copia exacta (otra URL): mismo grupo que la fila 0
+    ('Acqua di Gio Armani para Hombres', 'armani', 'acqua-di-gio', FRESH, 0),
+    # Flanker: nombre parecido y acordes casi iguales
+    ('Acqua di Gio Profumo Armani para Hombres', 'armani', 'acqua-di-gio-profumo', FRESH_FLANKER, 0),
+    ('Code Armani para Hombres', 'armani', 'code', WOODY, 3),
+    # Sin acordes y mismo nombre de línea (la concentración no cuenta): se une por el nombre
+    ('Acqua di Gio Eau de Parfum Armani para Hombres', 'armani', 'acqua-di-gio-eau-de-parfum', NONE, 0),
+    # Sin acordes y nombre parecido pero no idéntico: queda solo
+    ('Acqua di Gioia Armani para Mujeres', 'armani', 'acqua-di-gioia', NONE, -1),
+    # Mismo nombre y acordes, otra marca: queda solo
+    ('Acqua di Gio Otra Casa para Hombres', 'otra-casa', 'acqua-di-gio', FRESH, -1),
+    # Nombre parecido, acordes distintos: queda solo
+    ('Acqua di Gio Profondo Armani para Hombres', 'armani', 'acqua-di-gio-profondo', WOODY, -1),
+    # Copia exacta de la fila 3: se agrupa con ella
+    ('Code Armani para Hombres', 'armani', 'code', WOODY, 3),
+]
+
+
+def catalog_frame():
+    """DataFrame con las columnas que usa Utils.duplicates (nombre, URL y acordes)"""
+    columns = sorted({col for *_, accords, _ in CATALOG for col in accords})
+    rows = []
+    for i, (name, brand, slug, accords, _) in enumerate(CATALOG):
+        url = f'https://www.fragrantica.es/perfume/{brand}/{slug}-{1000 + i}.html'
+        rows.append(dict({'name': name, URL_COL: url}, **{col: accords.get(col, np.nan) for col in columns}))
+    return pd.DataFrame(rows)
+
+
+def check_groups(workers=1):
+    from Utils.duplicates import find_duplicates, line_keys
+    from Utils.models import accord_matrix
+
+    frame = catalog_frame()
+    keys, brands = line_keys(frame)
+    matrix, index = accord_matrix(frame)
+    groups, stats = find_duplicates(keys, brands, matrix, index['has_accords'], workers=workers)
+    expected = [group for *_, group in CATALOG]
+    for row, (actual, wanted) in enumerate(zip(groups.tolist(), expected)):
+        expect(actual == wanted, f"fila {row} ({CATALOG[row][0]}): grupo {actual}, se esperaba {wanted}")
+    expect(stats['exact_copies'] == 2, f"se contaron {stats['exact_copies']} copias exactas en lugar de 2")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=1, help='Hilos de find_duplicates')
+    args = parser.parse_args(argv)
+
+    stats = check_groups(args.workers)
+    print(f"grupos             ok  ({stats['group_count']} grupos, {stats['grouped_rows']} filas)")
+
+
+if __name__ == '__main__':
+    main()
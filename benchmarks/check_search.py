@@ -0,0 +1,142 @@
+"""
+Verificación del índice de búsqueda: códec varbyte, claves de postings y extensión.
+
+Comprueba que decodificar lo codificado devuelva los mismos valores (saltos de
+127, 128 y 2^28 o más, y el atajo de listas de un byte por valor), que las claves
+término | perfume | frecuencia sobrevivan al índice comprimido, y que extender el
+índice de un CSV con las filas agregadas al final dé el mismo índice (y los mismos
+puntajes BM25) que construirlo desde cero con el CSV completo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.check_search
+    python -m benchmarks.check_search --rows 3000
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import expect
+from benchmarks.datasets import synthetic_catalog, write_catalog_csv
+from benchmarks.synthetic import write_csv_chunk
+
+QUERIES = ['vanilla', 'fresh citrus', 'woody amber', 'rose']
+
+
+def check_varbyte():
+    from Utils.search import _varbyte_decode, _varbyte_encode
+
+    edges = [0, 1, 126, 127, 128, 129, (1 << 14) - 1, 1 << 14, (1 << 21) - 1, 1 << 21,
+             (1 << 28) - 1, 1 << 28, (1 << 28) + 1, (1 << 32) - 1]
+    rng = np.random.default_rng(0)
+    cases = {
+        'bordes': np.array(edges, dtype=np.uint64),
+        'saltos de 127': np.full(50, 127, dtype=np.uint64),
+        'saltos de 128': np.full(50, 128, dtype=np.uint64),
+        'saltos >= 2^28': rng.integers(1 << 28, 1 << 32, 50, dtype=np.uint64),
+        'aleatorios': rng.integers(0, 1 << 32, 1000, dtype=np.uint64),
+        'vacío': np.zeros(0, dtype=np.uint64),
+    }
+    for name, values in cases.items():
+        encoded, starts = _varbyte_encode(values)
+        expect(np.array_equal(_varbyte_decode(encoded), values), f"varbyte {name}: no se recuperan los valores")
+        expect(np.array_equal(_varbyte_decode(encoded, len(values)), values),
+               f"varbyte {name}: falla con la cantidad de valores conocida")
+        # Cada valor también se decodifica solo, desde su byte de inicio
+        ends = np.append(starts[1:], len(encoded))
+        for i in range(0, len(values), max(1, len(values) // 20)):
+            single = _varbyte_decode(encoded[starts[i]:ends[i]], 1)
+            expect(single.tolist() == [values[i]], f"varbyte {name}: el valor {i} no se decodifica solo")
+
+    # Atajo: todos los valores caben en un byte (count == bytes)
+    small = rng.integers(0, 128, 500, dtype=np.uint64)
+    encoded, _ = _varbyte_encode(small)
+    expect(len(encoded) == len(small), "varbyte: los valores < 128 deberían ocupar un byte")
+    expect(np.array_equal(_varbyte_decode(encoded, len(small)), small), "varbyte: el atajo de un byte falla")
+
+
+def check_keys():
+    from Utils.search import _DOC_BITS, _MAX_TF, _TF_BITS, _decode_keys, _encode_index, postings
+
+    # Términos con listas vacías en medio, perfumes separados por 127, 128 y >= 2^28, y tf al máximo
+    lists = {
+        0: [(0, 1), (127, 2), (255, 3), (383, _MAX_TF)],
+        3: [(5, 1)],
+        4: [(1, 7), (1 + (1 << 28), 1), (2 + (1 << 28), 2), ((1 << _DOC_BITS) - 1, _MAX_TF)],
+        9: [(i * 128, 1 + i % _MAX_TF) for i in range(300)],
+    }
+    n_terms = 12
+    keys = np.array(sorted(
+        (term << (_DOC_BITS + _TF_BITS)) | (doc << _TF_BITS) | tf
+        for term, docs in lists.items() for doc, tf in docs
+    ), dtype=np.uint64)
+    model = _encode_index(keys, n_terms)
+    expect(np.array_equal(_decode_keys(model), keys), "claves: _decode_keys no devuelve las claves originales")
+    for term in range(n_terms):
+        docs, tf = postings(model, term)
+        expected = lists.get(term, [])
+        expect(docs.tolist() == [doc for doc, _ in expected], f"claves: perfumes del término {term} distintos")
+        expect(tf.tolist() == [float(t) for _, t in expected], f"claves: frecuencias del término {term} distintas")
+
+
+def _same_index(actual, expected, name):
+    from Utils.search import _with_lookup, search_scores
+
+    expect(list(actual['vocabulary']) == list(expected['vocabulary']), f"{name}: vocabulario distinto")
+    expect(actual['docs'] == expected['docs'], f"{name}: cantidad de perfumes distinta")
+    for array in ('postings', 'byte_offsets', 'posting_offsets', 'tf', 'doc_lengths'):
+        expect(np.array_equal(np.asarray(actual[array]), np.asarray(expected[array])),
+               f"{name}: el arreglo {array} difiere de la reconstrucción")
+    actual, expected = _with_lookup(dict(actual)), _with_lookup(dict(expected))
+    for query in QUERIES:
+        expect(np.array_equal(search_scores(query, model=actual), search_scores(query, model=expected)),
+               f"{name}: puntajes distintos para '{query}'")
+
+
+def check_extend(n_rows, tail_rows, seed=0):
+    from Utils.data_loader import clean_perfume_frame, refresh_perfume_data
+    from Utils.search import _extend_model, _fit_model, build_search_index
+
+    df = synthetic_catalog(n_rows, seed=seed)
+    with tempfile.TemporaryDirectory(prefix='perfume-check-search-') as tmp:
+        path = write_catalog_csv(df.iloc[:n_rows - tail_rows], os.path.join(tmp, 'catalogo.csv'))
+        head = clean_perfume_frame(pd.read_csv(path))
+        search_dir = os.path.join(tmp, 'search')
+        build_search_index(path, search_dir)
+
+        with open(path, 'ab') as fh:
+            write_csv_chunk(df.iloc[n_rows - tail_rows:], fh, header=False)
+        full = clean_perfume_frame(pd.read_csv(path))
+        arrays, manifest = _fit_model(full)
+        rebuilt = dict(manifest, **arrays)
+
+        # En memoria: índice de las primeras filas extendido con el resto
+        arrays, manifest = _fit_model(head)
+        arrays, manifest = _extend_model(dict(manifest, **arrays), full.iloc[len(head):])
+        _same_index(dict(manifest, **arrays), rebuilt, 'extensión')
+
+        # En disco: tras incorporar las filas nuevas (como el refresco de la app), el índice
+        # guardado (mapeado con mmap) se extiende
+        expect(refresh_perfume_data(path) == tail_rows, "no se detectaron las filas agregadas")
+        _same_index(build_search_index(path, search_dir), rebuilt, 'extensión en disco')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000, help='Filas del catálogo')
+    parser.add_argument('--tail', type=int, default=100, help='Filas agregadas al final')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    check_varbyte()
+    print("varbyte            ok", flush=True)
+    check_keys()
+    print("claves             ok", flush=True)
+    check_extend(args.rows, args.tail, args.seed)
+    print("extensión          ok", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import numpy as np
+
+from Utils.data_loader import DATA_PATH, clean_perfume_frame
+from benchmarks.synthetic import generate_frame, load_model, write_csv_chunk
+
+
+def synthetic_catalog(n_rows, seed=0, source=DATA_PATH):
+    """
+    Genera en memoria un catálogo calibrado con el dataset real
+    Args:
+        n_rows (int): Filas del catálogo resultante
+        seed (int): Semilla del generador aleatorio
+        source (str): CSV de referencia para calibrar el modelo
+    Returns:
+        pd.DataFrame: Catálogo con el mismo esquema que el CSV original
+    """
+    return generate_frame(load_model(source), n_rows, np.random.default_rng(seed))
+
+
+def loaded_catalog(df):
+    """
+    Catálogo sintético tal como lo entrega load_perfume_data
+    Las páginas usan las columnas derivadas de la descripción (año, marca, familia y
+    perfumistas); el CSV se escribe con el DataFrame de synthetic_catalog, sin ellas.
+    """
+    return clean_perfume_frame(df)
+
+
+def write_catalog_csv(df, path):
+    """
+    Escribe un catálogo sintético con el formato del CSV original
+    """
+    with open(path, 'wb') as fh:
+        write_csv_chunk(df, fh, header=True)
+    return path
@@ -0,0 +1,128 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def environment_info():
+    """
+    Describe el entorno en el que se tomaron las mediciones
+    """
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    for package in ('numpy', 'pandas', 'plotly', 'streamlit'):
+        module = sys.modules.get(package)
+        if module is not None:
+            info[package] = getattr(module, '__version__', 'desconocida')
+    return info
+
+
+def write_results(name, payload, output=None):
+    """
+    Guarda resultados en JSON dentro de benchmarks/results/
+    Returns:
+        str: Ruta del archivo escrito
+    """
+    path = output or os.path.join(RESULTS_DIR, f'{name}.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {'benchmark': name, 'environment': environment_info(), 'results': payload}
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(document, fh, indent=2, ensure_ascii=False)
+    return path
+
+
+def parse_scale(text):
+    """
+    Convierte '1k', '100k' o '1m' en número de filas
+    """
+    text = str(text).strip().lower()
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def format_scale(n_rows):
+    """
+    Representación corta de una escala (1000 -> '1k')
+    """
+    if n_rows >= 1_000_000 and n_rows % 1_000_000 == 0:
+        return f'{n_rows // 1_000_000}m'
+    if n_rows >= 1_000 and n_rows % 1_000 == 0:
+        return f'{n_rows // 1_000}k'
+    return str(n_rows)
+
+
+def time_call(func, repeat=3, setup=None):
+    """
+    Mide el tiempo de pared de una llamada
+    Args:
+        func (callable): Función sin argumentos a medir
+        repeat (int): Número de repeticiones
+        setup (callable): Se ejecuta antes de cada repetición, fuera del cronómetro
+    Returns:
+        dict: median_s, min_s y runs (segundos)
+    """
+    runs = []
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {
+        'median_s': statistics.median(runs),
+        'min_s': min(runs),
+        'runs': runs,
+    }
+
+
+def load_results(path):
+    """
+    Lee un archivo de resultados escrito por write_results
+    """
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def compare_to_baseline(results, baseline, threshold=1.15):
+    """
+    Compara resultados {caso: {escala: {'median_s': ...}}} contra una línea base
+    Args:
+        threshold (float): Razón actual/base a partir de la cual se marca regresión
+    Returns:
+        list[dict]: Una fila por caso y escala presentes en ambos
+    """
+    rows = []
+    for case, scales in results.items():
+        for scale, current in scales.items():
+            previous = baseline.get(case, {}).get(scale)
+            if not previous or 'median_s' not in current or 'median_s' not in previous:
+                continue
+            ratio = current['median_s'] / previous['median_s'] if previous['median_s'] > 0 else float('inf')
+            rows.append({
+                'case': case,
+                'scale': scale,
+                'baseline_s': previous['median_s'],
+                'current_s': current['median_s'],
+                'ratio': ratio,
+                'status': 'regresión' if ratio > threshold else ('mejora' if ratio < 1 / threshold else 'igual'),
+            })
+    return rows
+
+
+def expect(condition, message):
+    """
+    Verificación de los scripts check_*: falla con el mensaje (también con python -O)
+    """
+    if not condition:
+        raise AssertionError(message)
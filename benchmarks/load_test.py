@@ -0,0 +1,205 @@
+"""
+Prueba de carga multi-sesión con ejecución headless de las páginas.
+
+Cada sesión simulada es un proceso independiente (como un worker del servidor)
+que ejecuta la página con AppTest y reproduce una secuencia grabada de
+interacciones (barridos de sliders, alternancia de multiselects...). Todas las
+sesiones arrancan a la vez y se reporta, por sesión y en conjunto:
+
+- latencia de cada rerun (p50/p95/p99)
+- tiempo de CPU (usuario + sistema)
+- pico de memoria residente (RSS)
+
+Los escenarios viven en benchmarks/scenarios/*.json:
+
+    {"page": "pages/page2.py",
+     "steps": [
+        {"widget": "slider", "label": "Rating Mínimo", "values": [0.0, 4.0]},
+        {"widget": "multiselect", "label": "Géneros a Analizar", "toggle": ["femenino"]},
+        {"widget": "rerun", "times": 3}
+     ]}
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.load_test --sessions 8
+    python -m benchmarks.load_test --sessions 4 --scenario benchmarks/scenarios/page2_ratings.json
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.harness import ROOT, write_results
+
+SCENARIO_DIR = os.path.join(ROOT, 'benchmarks', 'scenarios')
+
+
+def load_scenario(path):
+    with open(path, encoding='utf-8') as fh:
+        scenario = json.load(fh)
+    scenario.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    return scenario
+
+
+def find_widget(at, kind, label):
+    """
+    Busca un widget por tipo y etiqueta en la app headless
+    """
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No existe un {kind} con etiqueta {label!r}")
+
+
+def iter_interactions(at, steps):
+    """
+    Aplica cada interacción del escenario y cede antes de cada rerun
+    """
+    for step in steps:
+        kind = step['widget']
+        if kind == 'rerun':
+            for _ in range(step.get('times', 1)):
+                yield 'rerun'
+            continue
+        if 'toggle' in step:
+            for option in step['toggle']:
+                widget = find_widget(at, kind, step['label'])
+                if option in widget.value:
+                    widget.unselect(option)
+                else:
+                    widget.select(option)
+                yield f"{kind}:{step['label']}:toggle={option}"
+        else:
+            for value in step['values']:
+                find_widget(at, kind, step['label']).set_value(value)
+                yield f"{kind}:{step['label']}={value}"
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_session(scenario, session_id, iterations=1, timeout=120, start_at=None):
+    """
+    Ejecuta una sesión simulada completa (en un proceso propio)
+    Returns:
+        dict: latencias por rerun, CPU y pico de RSS de la sesión
+    """
+    os.chdir(ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    if start_at is not None:
+        # Arranque sincronizado de todas las sesiones
+        time.sleep(max(0.0, start_at - time.time()))
+
+    cpu_start = _cpu_seconds()
+    at = AppTest.from_file(os.path.join(ROOT, scenario['page']), default_timeout=timeout)
+
+    t0 = time.perf_counter()
+    at.run()
+    first_render = time.perf_counter() - t0
+
+    reruns, errors = [], []
+    for _ in range(iterations):
+        for action in iter_interactions(at, scenario['steps']):
+            t0 = time.perf_counter()
+            at.run()
+            reruns.append(time.perf_counter() - t0)
+            if at.exception:
+                errors.append({'action': action, 'error': at.exception[0].message})
+
+    return {
+        'session': session_id,
+        'first_render_s': first_render,
+        'rerun_s': reruns,
+        'cpu_s': _cpu_seconds() - cpu_start,
+        'peak_rss_mb': _peak_rss_mb(),
+        'errors': errors,
+    }
+
+
+def percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    arr = np.asarray(values)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(arr.max())}
+
+
+def run_scenario(scenario, sessions, iterations=1, timeout=120):
+    """
+    Lanza N sesiones concurrentes del escenario y resume sus métricas
+    """
+    context = multiprocessing.get_context('spawn')
+    start_at = time.time() + 2.0 + 0.1 * sessions
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=sessions, mp_context=context) as pool:
+        futures = [pool.submit(run_session, scenario, i, iterations, timeout, start_at)
+                   for i in range(sessions)]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - t0
+
+    for result in results:
+        result['rerun_percentiles'] = percentiles(result['rerun_s'])
+    all_reruns = [value for result in results for value in result['rerun_s']]
+    return {
+        'page': scenario['page'],
+        'sessions': sessions,
+        'iterations': iterations,
+        'wall_s': wall,
+        'reruns': len(all_reruns),
+        'rerun_percentiles': percentiles(all_reruns),
+        'first_render': percentiles([r['first_render_s'] for r in results]),
+        'cpu_s_per_session': percentiles([r['cpu_s'] for r in results]),
+        'peak_rss_mb_per_session': percentiles([r['peak_rss_mb'] for r in results]),
+        'errors': sum(len(r['errors']) for r in results),
+        'per_session': results,
+    }
+
+
+def _ms(value):
+    return f"{value * 1000:8.1f}" if value is not None else '     n/a'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=4, help='Sesiones concurrentes')
+    parser.add_argument('--scenario', nargs='+', default=None,
+                        help='Archivos de escenario (por defecto todos los de benchmarks/scenarios)')
+    parser.add_argument('--iterations', type=int, default=1, help='Repeticiones de la secuencia por sesión')
+    parser.add_argument('--timeout', type=float, default=120, help='Tiempo máximo por rerun (s)')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    paths = args.scenario or sorted(glob.glob(os.path.join(SCENARIO_DIR, '*.json')))
+    report = {}
+    for path in paths:
+        scenario = load_scenario(path)
+        summary = run_scenario(scenario, args.sessions, args.iterations, args.timeout)
+        report[scenario['name']] = summary
+        p = summary['rerun_percentiles']
+        print(f"{scenario['name']:<18} sesiones={args.sessions} reruns={summary['reruns']:<4} "
+              f"p50={_ms(p['p50'])}ms p95={_ms(p['p95'])}ms p99={_ms(p['p99'])}ms "
+              f"CPU/sesión={summary['cpu_s_per_session']['p50']:.2f}s "
+              f"RSS pico={summary['peak_rss_mb_per_session']['max']:.0f}MB "
+              f"errores={summary['errors']}", flush=True)
+
+    path = write_results('load_test', report, args.output)
+    print(f"Resultados escritos en {path}")
+
+
+if __name__ == '__main__':
+    main()
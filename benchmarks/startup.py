@@ -0,0 +1,136 @@
+"""
+Perfil de arranque de cada página del dashboard.
+
+Para cada página lanza un intérprete nuevo con ``-X importtime`` que ejecuta
+la página en modo headless (AppTest) y mide:
+
+- costo de importación por módulo y por paquete raíz (formato importtime)
+- tiempo en frío desde el arranque del proceso hasta el primer render
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --pages pages/page2.py --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import ROOT, write_results
+
+DEFAULT_PAGES = ['app.py', 'pages/page1.py', 'pages/page2.py', 'pages/page3.py']
+
+# Script ejecutado en el proceso hijo: renderiza la página una vez y reporta
+# qué módulos se importaron durante el render.
+CHILD_SCRIPT = """
+import json, sys, time
+t_start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_harness = time.perf_counter()
+before = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+at.run()
+t_render = time.perf_counter()
+print(json.dumps({
+    'harness_s': t_harness - t_start,
+    'render_s': t_render - t_harness,
+    'exceptions': [e.message for e in at.exception],
+    'page_modules': sorted(set(sys.modules) - before),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Convierte la salida de -X importtime en una lista de registros
+    Returns:
+        list[dict]: module, self_us, cumulative_us, depth
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        records.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': depth,
+        })
+    return records
+
+
+def profile_page(page, top=15):
+    """
+    Ejecuta una página en un proceso nuevo y devuelve su perfil de arranque
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, page],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falló el perfil de {page}:\n{proc.stderr[-2000:]}")
+
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+    records = parse_importtime(proc.stderr)
+    page_modules = set(child['page_modules'])
+
+    # Costo atribuible a la página: módulos importados durante el render
+    by_package = {}
+    for rec in records:
+        if rec['module'] in page_modules:
+            root = rec['module'].split('.')[0]
+            by_package[root] = by_package.get(root, 0) + rec['self_us']
+
+    page_records = [r for r in records if r['module'] in page_modules]
+    page_records.sort(key=lambda r: r['cumulative_us'], reverse=True)
+
+    return {
+        'process_wall_s': wall,
+        'render_s': child['render_s'],
+        'harness_import_s': child['harness_s'],
+        'page_import_s': sum(by_package.values()) / 1e6,
+        'imports_by_package_ms': {
+            k: round(v / 1000, 2)
+            for k, v in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)
+        },
+        'top_modules': [
+            {'module': r['module'], 'cumulative_ms': round(r['cumulative_us'] / 1000, 2)}
+            for r in page_records[:top]
+        ],
+        'exceptions': child['exceptions'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', nargs='+', default=DEFAULT_PAGES)
+    parser.add_argument('--repeat', type=int, default=3, help='Arranques en frío por página')
+    parser.add_argument('--top', type=int, default=15, help='Módulos más costosos a listar')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for page in args.pages:
+        runs = [profile_page(page, top=args.top) for _ in range(args.repeat)]
+        summary = runs[-1]
+        for key in ('process_wall_s', 'render_s', 'harness_import_s', 'page_import_s'):
+            values = [run[key] for run in runs]
+            summary[key] = statistics.median(values)
+            summary[f'{key}_runs'] = values
+        results[page] = summary
+        print(f"{page:<20} arranque {summary['process_wall_s']:.2f}s  "
+              f"render {summary['render_s']:.2f}s  imports página {summary['page_import_s']:.2f}s")
+
+    path = write_results('startup', results, args.output)
+    print(f"Resultados escritos en {path}")
+
+
+if __name__ == '__main__':
+    main()
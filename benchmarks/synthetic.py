@@ -0,0 +1,459 @@
+"""
+Generador de catálogos sintéticos calibrado con data/perfumes_ordenado.csv.
+
+El modelo aprende del CSV real:
+
+- acordes: patrones conjuntos de presencia (qué acordes aparecen juntos y en
+  qué orden de intensidad) y la distribución de intensidad por rango
+- calificaciones: distribución de ratingCount y ratingValue condicionado a
+  log(ratingCount)
+- votos: presencia conjunta de los bloques, proporciones Dirichlet por bloque
+  (estaciones, día/noche, sentimientos, longevidad, sillage, género, precio) y
+  totales de votos correlacionados con la popularidad
+- pirámide olfativa: longitudes de las listas de notas y frecuencia de cada nota
+- texto: marcas, familias olfativas, años de lanzamiento y perfumistas, para
+  producir nombres, URLs y descripciones con el mismo formato que el original
+
+La generación es vectorizada con NumPy y se escribe por bloques, por lo que
+puede producir millones de filas sin mantenerlas en memoria.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.synthetic --rows 1m --output /tmp/catalogo_1m.csv
+    python -m benchmarks.synthetic --rows 10m --output /tmp/catalogo.parquet
+"""
+import argparse
+import ast
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from Utils.data_loader import DATA_PATH
+
+# Bloques de votos: los normalizados tienen su máximo en 100 por perfume,
+# los de conteo almacenan votos absolutos.
+VOTE_GROUPS = {
+    'calificationText.': 'normalized',
+    'timeSeasons.': 'normalized',
+    'timeDay.': 'normalized',
+    'longevity.': 'counts',
+    'sillage.': 'counts',
+    'gender.': 'counts',
+    'price.': 'counts',
+}
+
+PYRAMID_COLUMNS = ['piramidFragrance.salida', 'piramidFragrance.corazon',
+                   'piramidFragrance.base', 'piramidFragrance.ingredientes']
+
+GENDER_PHRASES = ['para Mujeres', 'para Hombres y Mujeres', 'para Hombres']
+
+RATING = 'calificationNumbers.ratingValue'
+RATING_COUNT = 'calificationNumbers.ratingCount'
+BEST_RATING = 'calificationNumbers.bestRating'
+
+PERFUMER_PATTERNS = [
+    re.compile(r'fue creada por ([^.]+)\.'),
+    re.compile(r'La Nariz detrás de esta fragrancia es ([^.]+)\.'),
+]
+
+
+def _quantiles(values, n=101):
+    """Resume una muestra empírica en una tabla de cuantiles"""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.zeros(n)
+    return np.quantile(values, np.linspace(0, 1, n))
+
+
+def _sample_quantiles(rng, table, size):
+    """Muestrea por transformada inversa interpolando la tabla de cuantiles"""
+    u = rng.random(size)
+    return np.interp(u, np.linspace(0, 1, len(table)), table)
+
+
+def _frequencies(items):
+    """Vocabulario y probabilidades de una lista de elementos"""
+    counts = pd.Series(items, dtype=object).value_counts()
+    if counts.empty:
+        return np.array([''], dtype=object), np.array([1.0])
+    return counts.index.to_numpy(dtype=object), (counts / counts.sum()).to_numpy()
+
+
+def _parse_note_list(text):
+    if not isinstance(text, str):
+        return None
+    try:
+        notes = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return None
+    return [str(n) for n in notes] if isinstance(notes, list) else None
+
+
+def _dirichlet_alpha(proportions):
+    """Ajuste de una Dirichlet por método de momentos"""
+    mean = proportions.mean(axis=0)
+    var = proportions.var(axis=0)
+    valid = (var > 0) & (mean > 0) & (mean < 1)
+    if not valid.any():
+        return np.maximum(mean, 1e-3) * 10
+    precision = np.median(mean[valid] * (1 - mean[valid]) / var[valid] - 1)
+    return np.maximum(mean, 1e-3) * max(precision, 0.5)
+
+
+def fit_catalog_model(df):
+    """
+    Aprende la estructura marginal y conjunta del catálogo real
+    Args:
+        df (pd.DataFrame): Dataset original (tal como está en el CSV)
+    Returns:
+        dict: Modelo con todo lo necesario para generate_frame
+    """
+    model = {'columns': list(df.columns)}
+
+    # ACORDES: patrón de presencia ordenado por intensidad + intensidad por rango
+    accord_columns = [col for col in df.columns if col.startswith('accords.')]
+    accords = np.nan_to_num(df[accord_columns].to_numpy(dtype=float))
+    order = np.argsort(-accords, axis=1, kind='stable')
+    present = np.take_along_axis(accords, order, axis=1) > 0
+    max_rank = int(present.sum(axis=1).max()) if len(df) else 0
+    ranks = np.full(accords.shape, -1, dtype=np.int16)
+    rows = np.repeat(np.arange(len(df)), accords.shape[1])
+    ranks[rows, order.ravel()] = np.tile(np.arange(accords.shape[1]), len(df))
+    ranks[accords <= 0] = -1
+    sorted_values = -np.sort(-accords, axis=1)
+    model['accord_columns'] = accord_columns
+    model['accord_ranks'] = ranks
+    model['rank_quantiles'] = np.vstack([
+        _quantiles(sorted_values[sorted_values[:, r] > 0, r]) for r in range(max_rank)
+    ]) if max_rank else np.zeros((0, 101))
+
+    # CALIFICACIONES: log(ratingCount) y rating | log(ratingCount)
+    rated = df[RATING].notna() & (df[RATING_COUNT] > 0)
+    log_count = np.log(df.loc[rated, RATING_COUNT].to_numpy(dtype=float))
+    rating = df.loc[rated, RATING].to_numpy(dtype=float)
+    slope, intercept = np.polyfit(log_count, rating, 1) if rated.sum() > 1 else (0.0, 4.0)
+    model['rated_probability'] = float(rated.mean())
+    model['log_count_quantiles'] = _quantiles(log_count)
+    model['rating_fit'] = (float(slope), float(intercept))
+    model['rating_residuals'] = _quantiles(rating - (slope * log_count + intercept))
+    model['rating_range'] = (float(np.nanmin(rating)), float(np.nanmax(rating)))
+
+    # VOTOS: presencia conjunta de bloques, proporciones y totales
+    groups = {}
+    presence = []
+    for prefix, kind in VOTE_GROUPS.items():
+        columns = [col for col in df.columns if col.startswith(prefix)]
+        values = df[columns].to_numpy(dtype=float)
+        observed = ~np.isnan(values).all(axis=1)
+        presence.append(observed)
+        filled = np.nan_to_num(values[observed])
+        totals = filled.sum(axis=1)
+        proportions = filled[totals > 0] / totals[totals > 0, None]
+        group = {'columns': columns, 'kind': kind, 'alpha': _dirichlet_alpha(proportions)}
+        if kind == 'counts':
+            # log(total de votos) = a * log(ratingCount) + b + ruido
+            counts = df.loc[observed, RATING_COUNT].to_numpy(dtype=float)
+            ok = (totals > 0) & (counts > 0)
+            x, y = np.log(counts[ok]), np.log(totals[ok])
+            a, b = np.polyfit(x, y, 1) if ok.sum() > 1 else (0.0, float(np.mean(y)) if len(y) else 0.0)
+            group['total_fit'] = (float(a), float(b))
+            group['total_residuals'] = _quantiles(y - (a * x + b))
+        groups[prefix] = group
+    presence = np.column_stack(presence)
+    patterns, pattern_counts = np.unique(presence, axis=0, return_counts=True)
+    model['vote_groups'] = groups
+    model['vote_patterns'] = patterns
+    model['vote_pattern_p'] = pattern_counts / pattern_counts.sum()
+
+    # PIRÁMIDE: patrón de presencia conjunto, longitudes y vocabulario por columna
+    pyramid = {}
+    notes_present = []
+    for col in PYRAMID_COLUMNS:
+        parsed = df[col].map(_parse_note_list) if col in df.columns else pd.Series([None] * len(df))
+        notes_present.append(parsed.notna().to_numpy())
+        lists = [notes for notes in parsed if notes]
+        vocab, probs = _frequencies([note for notes in lists for note in notes])
+        lengths = np.array([len(notes) for notes in lists]) if lists else np.array([1])
+        pyramid[col] = {
+            'vocab': vocab,
+            'p': probs,
+            'lengths': np.bincount(lengths) / len(lengths),
+        }
+    patterns, pattern_counts = np.unique(np.column_stack(notes_present), axis=0, return_counts=True)
+    model['pyramid'] = pyramid
+    model['pyramid_patterns'] = patterns
+    model['pyramid_pattern_p'] = pattern_counts / pattern_counts.sum()
+
+    # TEXTO: marcas, familias, años, perfumistas y palabras de línea
+    descriptions = df['description'].fillna('').astype(str)
+    brands = df['PerfumeURL'].fillna('').str.extract(r'/perfume/([^/]+)/')[0].dropna()
+    model['brands'] = _frequencies(brands.tolist())
+    families = descriptions.str.extract(r'familia olfativa (.+?) para ')[0].dropna()
+    model['families'] = _frequencies(families.tolist())
+    years = descriptions.str.extract(r'se lanzó en (\d{4})')[0].dropna().astype(int)
+    model['year_quantiles'] = _quantiles(years)
+    model['year_probability'] = float(len(years) / max(len(df), 1))
+    perfumers = []
+    with_perfumer = 0
+    for text in descriptions:
+        found = False
+        for pattern in PERFUMER_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                found = True
+                perfumers.extend(p.strip() for p in re.split(r',\s*|\s+y\s+', match.group(1)) if p.strip())
+        with_perfumer += found
+    model['perfumers'] = _frequencies(perfumers)
+    model['perfumer_probability'] = with_perfumer / max(len(df), 1)
+    phrases = df['name'].fillna('').str.extract(r'(para .+)$')[0].dropna()
+    phrase_counts = phrases.value_counts()
+    model['gender_phrases'] = (
+        phrase_counts.index.to_numpy(dtype=object), (phrase_counts / phrase_counts.sum()).to_numpy()
+    ) if len(phrase_counts) else (np.array(GENDER_PHRASES, dtype=object), np.full(3, 1 / 3))
+    words = []
+    for name, brand in zip(df['name'].fillna(''), df['PerfumeURL'].fillna('').str.extract(r'/perfume/([^/]+)/')[0].fillna('')):
+        stem = re.sub(r'\s+para .+$', '', name)
+        brand_words = set(brand.replace('-', ' ').lower().split())
+        words.extend(w for w in stem.split() if w.lower() not in brand_words)
+    model['line_words'] = _frequencies(words)
+    return model
+
+
+def _split_by_lengths(items, lengths):
+    """Parte una lista plana en sublistas de las longitudes dadas"""
+    items = items.tolist()
+    ends = np.cumsum(lengths).tolist()
+    starts = [0] + ends[:-1]
+    return [items[a:b] for a, b in zip(starts, ends)]
+
+
+def _format_notes(notes):
+    return '[' + ', '.join(f"'{note}'" for note in notes) + ']'
+
+
+def _join_spanish(items):
+    items = list(items)
+    if len(items) <= 1:
+        return ''.join(items)
+    return ', '.join(items[:-1]) + ' y ' + items[-1]
+
+
+def generate_frame(model, n_rows, rng, start=0):
+    """
+    Genera un bloque de filas con el esquema del CSV original
+    Args:
+        model (dict): Resultado de fit_catalog_model
+        n_rows (int): Filas del bloque
+        rng (np.random.Generator): Generador aleatorio
+        start (int): Índice global de la primera fila (nombres y URLs únicos)
+    Returns:
+        pd.DataFrame
+    """
+    data = {}
+    serial = np.arange(start, start + n_rows)
+
+    # ACORDES
+    ranks = model['accord_ranks'][rng.integers(0, len(model['accord_ranks']), n_rows)]
+    rank_table = model['rank_quantiles']
+    n_ranks = len(rank_table)
+    if n_ranks:
+        u = rng.random((n_rows, n_ranks))
+        grid = np.linspace(0, 1, rank_table.shape[1])
+        values = np.empty((n_rows, n_ranks))
+        for r in range(n_ranks):
+            values[:, r] = np.interp(u[:, r], grid, rank_table[r])
+        # Intensidades decrecientes con el rango, como en el dataset
+        values = -np.sort(-values, axis=1)
+        safe_ranks = np.clip(ranks, 0, n_ranks - 1)
+        accords = np.take_along_axis(values, safe_ranks.astype(np.intp), axis=1)
+        accords[ranks < 0] = np.nan
+    else:
+        accords = np.full((n_rows, len(model['accord_columns'])), np.nan)
+    for j, col in enumerate(model['accord_columns']):
+        data[col] = accords[:, j]
+
+    # CALIFICACIONES
+    rated = rng.random(n_rows) < model['rated_probability']
+    log_count = _sample_quantiles(rng, model['log_count_quantiles'], n_rows)
+    rating_count = np.maximum(np.round(np.exp(log_count)), 1)
+    slope, intercept = model['rating_fit']
+    low, high = model['rating_range']
+    rating = slope * log_count + intercept + _sample_quantiles(rng, model['rating_residuals'], n_rows)
+    rating = np.round(np.clip(rating, low, high), 2)
+    data[RATING] = np.where(rated, rating, np.nan)
+    data[BEST_RATING] = np.where(rated, 5.0, np.nan)
+    data[RATING_COUNT] = np.where(rated, rating_count, np.nan)
+
+    # VOTOS
+    pattern_idx = rng.choice(len(model['vote_patterns']), size=n_rows, p=model['vote_pattern_p'])
+    presence = model['vote_patterns'][pattern_idx]
+    for g, (prefix, group) in enumerate(model['vote_groups'].items()):
+        proportions = rng.dirichlet(group['alpha'], size=n_rows)
+        if group['kind'] == 'normalized':
+            values = np.round(proportions / proportions.max(axis=1, keepdims=True) * 100, 4)
+        else:
+            a, b = group['total_fit']
+            log_total = a * log_count + b + _sample_quantiles(rng, group['total_residuals'], n_rows)
+            totals = np.maximum(np.round(np.exp(log_total)), 1).astype(np.int64)
+            values = rng.multinomial(totals, proportions).astype(float)
+        values[~presence[:, g]] = np.nan
+        for j, col in enumerate(group['columns']):
+            data[col] = values[:, j]
+
+    # PIRÁMIDE
+    pattern_idx = rng.choice(len(model['pyramid_patterns']), size=n_rows, p=model['pyramid_pattern_p'])
+    notes_present = model['pyramid_patterns'][pattern_idx]
+    note_lists = {}
+    for c, col in enumerate(PYRAMID_COLUMNS):
+        spec = model['pyramid'][col]
+        lengths = rng.choice(len(spec['lengths']), size=n_rows, p=spec['lengths'])
+        lengths[~notes_present[:, c]] = 0
+        notes = spec['vocab'][rng.choice(len(spec['vocab']), size=int(lengths.sum()), p=spec['p'])]
+        lists = _split_by_lengths(notes, lengths)
+        note_lists[col] = lists
+        data[col] = [_format_notes(items) if present else None
+                     for items, present in zip(lists, notes_present[:, c])]
+
+    # TEXTO
+    brand_vocab, brand_p = model['brands']
+    brand_slugs = brand_vocab[rng.choice(len(brand_vocab), size=n_rows, p=brand_p)]
+    family_vocab, family_p = model['families']
+    families = family_vocab[rng.choice(len(family_vocab), size=n_rows, p=family_p)]
+    phrase_vocab, phrase_p = model['gender_phrases']
+    phrases = phrase_vocab[rng.choice(len(phrase_vocab), size=n_rows, p=phrase_p)]
+    word_vocab, word_p = model['line_words']
+    n_words = rng.integers(1, 4, size=n_rows)
+    words = word_vocab[rng.choice(len(word_vocab), size=int(n_words.sum()), p=word_p)]
+    word_lists = _split_by_lengths(words, n_words)
+    years = np.round(_sample_quantiles(rng, model['year_quantiles'], n_rows)).astype(int)
+    has_year = rng.random(n_rows) < model['year_probability']
+    perfumer_vocab, perfumer_p = model['perfumers']
+    has_perfumer = rng.random(n_rows) < model['perfumer_probability']
+    n_perfumers = np.where(has_perfumer, rng.integers(1, 3, size=n_rows), 0)
+    perfumers = perfumer_vocab[rng.choice(len(perfumer_vocab), size=int(n_perfumers.sum()), p=perfumer_p)]
+    perfumer_lists = _split_by_lengths(perfumers, n_perfumers)
+
+    brand_slugs, families, phrases = brand_slugs.tolist(), families.tolist(), phrases.tolist()
+    years, has_year, serial = years.tolist(), has_year.tolist(), serial.tolist()
+    names, descriptions, urls = [], [], []
+    for i in range(n_rows):
+        brand = brand_slugs[i].replace('-', ' ')
+        line = f"{brand} {' '.join(word_lists[i])} {serial[i]}"
+        audience = phrases[i][len('para '):] if phrases[i].startswith('para ') else phrases[i]
+        text = (f"{line} de {brand} es una fragancia de la familia olfativa "
+                f"{families[i]} para {audience}.")
+        if has_year[i]:
+            text += f" {line} se lanzó en {years[i]}."
+        if perfumer_lists[i]:
+            text += f" {line} fue creada por {_join_spanish(perfumer_lists[i])}."
+        salida, corazon, base = (note_lists[c][i] for c in PYRAMID_COLUMNS[:3])
+        if salida or corazon or base:
+            text += (f" Las Notas de Salida son {_join_spanish(salida)}; las Notas de Corazón son "
+                     f"{_join_spanish(corazon)}; las Notas de Fondo son {_join_spanish(base)}.")
+        names.append(f"{line} {phrases[i]}")
+        descriptions.append(text)
+        urls.append(f"https://www.fragrantica.es/perfume/{brand_slugs[i]}/"
+                    f"{line.replace(' ', '-')}-{serial[i]}.html")
+    data['name'] = names
+    data['description'] = descriptions
+    data['PerfumeURL'] = urls
+
+    return pd.DataFrame(data, columns=model['columns'])
+
+
+def iter_catalog_chunks(model, n_rows, chunk_size=100_000, seed=0):
+    """
+    Genera el catálogo por bloques sin mantenerlo completo en memoria
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, chunk_size):
+        yield generate_frame(model, min(chunk_size, n_rows - start), rng, start=start)
+
+
+def write_csv_chunk(df, fh, header=True):
+    """
+    Escribe un bloque en un archivo CSV abierto en modo binario
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        fh.write(df.to_csv(header=header, index=False).encode('utf-8'))
+        return
+    # El escritor CSV de Arrow es ~10x más rápido que DataFrame.to_csv
+    options = pa_csv.WriteOptions(include_header=header)
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), fh, options)
+
+
+def write_catalog(model, n_rows, path, chunk_size=100_000, seed=0):
+    """
+    Escribe un catálogo sintético en CSV o Parquet (según la extensión)
+    Returns:
+        str: Ruta escrita
+    """
+    fmt = 'parquet' if path.endswith('.parquet') else 'csv'
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Para escribir Parquet se necesita pyarrow (pip install pyarrow)") from e
+        writer = None
+        try:
+            for chunk in iter_catalog_chunks(model, n_rows, chunk_size, seed):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, 'wb') as fh:
+            for i, chunk in enumerate(iter_catalog_chunks(model, n_rows, chunk_size, seed)):
+                write_csv_chunk(chunk, fh, header=(i == 0))
+    return path
+
+
+_MODEL_CACHE = {}
+
+
+def load_model(source=DATA_PATH):
+    """
+    Ajusta (una vez por proceso) el modelo sobre el CSV de referencia
+    """
+    if source not in _MODEL_CACHE:
+        _MODEL_CACHE[source] = fit_catalog_model(pd.read_csv(source))
+    return _MODEL_CACHE[source]
+
+
+def main(argv=None):
+    from benchmarks.harness import parse_scale
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', required=True, help='Filas a generar: 50000, 100k, 1m...')
+    parser.add_argument('--output', required=True, help='Ruta .csv o .parquet')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=DATA_PATH, help='CSV con el que se calibra el modelo')
+    args = parser.parse_args(argv)
+
+    n_rows = parse_scale(args.rows)
+    start = time.perf_counter()
+    model = load_model(args.source)
+    fitted = time.perf_counter()
+    write_catalog(model, n_rows, args.output, args.chunk_size, args.seed)
+    done = time.perf_counter()
+    print(f"Modelo ajustado en {fitted - start:.2f}s; {n_rows:,} filas escritas en "
+          f"{done - fitted:.2f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
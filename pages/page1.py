@@ -1,14 +1,23 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import seaborn as sns
-import matplotlib.pyplot as plt
 
-from Utils.data_loader import load_perfume_data
-from Utils.plotting import create_custom_palette, download_plot_button
+from Utils.clusters import family_filter, family_mask
+from Utils.cooccurrence import association_rules, cooccurrence, frequent_itemsets, itemsets_table, pair_lift
+from Utils.comparison import MAX_COMPARED, compare_perfumes
+from Utils.data_loader import RATING_COUNT_COL, load_catalog, select_rows
+from Utils.embedding import map_mask, map_region_filter
+from Utils.indexes import get_accord_histograms
+from Utils.instrumentation import begin_rerun, finish_rerun, record_stage
+from Utils.lazy_imports import lazy_import
+from Utils.plotting import create_custom_palette, create_radar_chart, download_plot_button
+from Utils.warmup import start_warmup
+
+# plotly.subplots solo se necesita cuando hay acordes seleccionados
+plotly_subplots = lazy_import('plotly.subplots')
 
 # Configuración de página
 st.set_page_config(
@@ -16,13 +25,14 @@ st.set_page_config(
     page_icon="🌸",
     layout="wide"
 )
+start_warmup()
+begin_rerun('page1')
 
 # Cargar datos
-@st.cache_data
+@st.cache_resource
 def load_data():
     try:
-        df = load_perfume_data()
-        return df.head(521)  # Solo primeros 521
+        return load_catalog()  # Solo primeros 521 (vista compartida, sin copia)
     except ImportError:
         # Fallback: cargar directamente
         try:
@@ -30,7 +40,7 @@ def load_data():
             # Limpieza básica
             accord_columns = [col for col in df.columns if col.startswith('accords.')]
             df[accord_columns] = df[accord_columns].fillna(0)
-            return df.head(521)
+            return df.iloc[:521]
         except Exception as e:
             st.error(f"Error al cargar datos: {e}")
             return pd.DataFrame()
@@ -46,7 +56,9 @@ def download_plot_button(fig, filename_prefix):
         help="Descarga el gráfico como archivo HTML interactivo"
     )
 
+t_stage = time.perf_counter()
 df = load_data()
+record_stage('load_data', 'load', t_stage, rows_out=len(df))
 
 # PALETAS PROFESIONALES
 PRIMARY_PALETTE = [
@@ -108,7 +120,39 @@ top_n = st.sidebar.selectbox(
     help="Define cuántos acordes mostrar en los rankings"
 )
 
+# Widgets 4 y 5: Parámetros de las combinaciones de acordes
+min_support = st.sidebar.slider(
+    "Soporte mínimo de combinaciones (%):",
+    min_value=1,
+    max_value=30,
+    value=3,
+    help="Porcentaje mínimo de perfumes que deben compartir la combinación"
+)
+max_itemset_size = st.sidebar.selectbox(
+    "Tamaño máximo de combinación:",
+    options=[2, 3, 4],
+    index=1,
+    help="Cantidad máxima de acordes por combinación"
+)
+
+# Widget 6: Familias olfativas (modelo k-means precalculado)
+families = family_filter()
+# Región elegida en el mapa de aromas (página Mapa de Aromas)
+region = map_region_filter()
+catalog = df
+selected_rows = family_mask(catalog, families)
+region_rows = map_mask(catalog, region)
+if region_rows is not None:
+    selected_rows = region_rows if selected_rows is None else selected_rows & region_rows
+if selected_rows is not None:
+    df = select_rows(catalog, selected_rows)
+    if len(df) == 0:
+        st.warning("No hay perfumes en las familias o la región seleccionadas.")
+        finish_rerun()
+        st.stop()
+
 # PROCESAMIENTO DE DATOS
+t_stage = time.perf_counter()
 accord_stats = {}
 for col in accord_columns:
     values = df[col].dropna()
@@ -126,6 +170,7 @@ for col in accord_columns:
 top_accords = sorted(accord_stats.items(), 
                     key=lambda x: x[1]['frequency'], 
                     reverse=True)[:top_n]
+record_stage('estadisticas_acordes', 'aggregate', t_stage, rows_in=len(df), rows_out=len(accord_stats))
 
 # LAYOUT PRINCIPAL
 col1, col2 = st.columns([2, 1])
@@ -155,6 +200,7 @@ with col1:
             radar_df = pd.DataFrame(radar_data)
             
             # Crear radar chart
+            t_stage = time.perf_counter()
             fig_radar = go.Figure()
             
             # Normalizar valores para el radar (0-100)
@@ -214,6 +260,7 @@ with col1:
                 )
             )
             
+            record_stage('radar_acordes', 'figure', t_stage, rows_in=len(df), figure=fig_radar)
             st.plotly_chart(fig_radar, use_container_width=True)
             download_plot_button(fig_radar, "radar_acordes")
         else:
@@ -254,35 +301,32 @@ with col3:
     
     if selected_accords:
         # Crear subplots para histogramas
-        fig_hist = make_subplots(
+        t_stage = time.perf_counter()
+        fig_hist = plotly_subplots.make_subplots(
             rows=len(selected_accords),
             cols=1,
             subplot_titles=[acc.title() for acc in selected_accords],
             vertical_spacing=0.1
         )
         
+        # Histogramas por acorde (memorizados o precalculados en los artefactos)
+        accord_histograms = get_accord_histograms(df)
         for i, accord in enumerate(selected_accords):
             col_name = f'accords.{accord.lower()}'
-            if col_name in df.columns:
-                values = df[col_name].dropna()
-                non_zero_values = values[values > 0]
+            if col_name in accord_histograms:
+                hist, bin_edges = accord_histograms[col_name]
                 
-                if len(non_zero_values) > 0:
-                    # Calcular bins
-                    bins = np.linspace(non_zero_values.min(), non_zero_values.max(), 15)
-                    hist, bin_edges = np.histogram(non_zero_values, bins=bins)
-                    
-                    fig_hist.add_trace(
-                        go.Bar(
-                            x=bin_edges[:-1],
-                            y=hist,
-                            name=accord.title(),
-                            marker_color=PRIMARY_PALETTE[i % len(PRIMARY_PALETTE)],
-                            opacity=0.8,
-                            showlegend=False
-                        ),
-                        row=i+1, col=1
-                    )
+                fig_hist.add_trace(
+                    go.Bar(
+                        x=bin_edges[:-1],
+                        y=hist,
+                        name=accord.title(),
+                        marker_color=PRIMARY_PALETTE[i % len(PRIMARY_PALETTE)],
+                        opacity=0.8,
+                        showlegend=False
+                    ),
+                    row=i+1, col=1
+                )
         
         fig_hist.update_layout(
             height=180 * len(selected_accords),
@@ -312,6 +356,7 @@ with col3:
             title=dict(font=dict(color='#2C3E50'))
         )
         
+        record_stage('distribuciones_intensidad', 'figure', t_stage, rows_in=len(df), figure=fig_hist)
         st.plotly_chart(fig_hist, use_container_width=True)
         download_plot_button(fig_hist, "distribuciones_intensidad")
 
@@ -320,6 +365,7 @@ with col4:
     st.subheader("Correlaciones entre Acordes")
     
     # Seleccionar top acordes para correlación
+    t_stage = time.perf_counter()
     top_accord_names = [acc[0] for acc in top_accords[:8]]  # Top 8 para visualización clara
     correlation_matrix = df[top_accord_names].corr()
     
@@ -373,7 +419,167 @@ with col4:
         font=dict(color='#2C3E50')
     )
     
+    record_stage('correlaciones_acordes', 'figure', t_stage, rows_in=len(df), figure=fig_corr)
     st.plotly_chart(fig_corr, use_container_width=True)
     download_plot_button(fig_corr, "correlaciones_acordes")
 
+# TERCERA FILA: COMBINACIONES DE ACORDES
+st.markdown("---")
+st.subheader("Combinaciones de Acordes")
+st.caption(f"Un acorde cuenta como presente con intensidad de al menos {min_intensity}%.")
+
+# Conteos con bitsets por acorde; los resultados quedan en caché por combinación de filtros
+t_stage = time.perf_counter()
+cooccurrence_matrix = cooccurrence(catalog, threshold=min_intensity, mask=selected_rows)
+mined = frequent_itemsets(catalog, min_support=min_support / 100, max_size=max_itemset_size,
+                          threshold=min_intensity, mask=selected_rows)
+rules = association_rules(mined)
+record_stage('combinaciones_acordes', 'compute', t_stage, rows_in=len(df), rows_out=len(mined['itemsets']))
+
+col5, col6 = st.columns([1, 1])
+
+with col5:
+    # VISUALIZACIÓN 5: HEATMAP DE CO-OCURRENCIA (LIFT)
+    t_stage = time.perf_counter()
+    lift, counts = pair_lift(cooccurrence_matrix, [acc[0] for acc in top_accords])
+    
+    fig_cooc = go.Figure(data=go.Heatmap(
+        z=lift.values,
+        x=[acc.title() for acc in lift.columns],
+        y=[acc.title() for acc in lift.index],
+        colorscale='RdBu_r',
+        zmid=1,
+        colorbar=dict(
+            title="Lift",
+            tickfont=dict(color='#2C3E50')
+        ),
+        customdata=counts.values,
+        hovertemplate="%{y} + %{x}<br>Perfumes: %{customdata}<br>Lift: %{z:.2f}<extra></extra>",
+        hoverongaps=False
+    ))
+    
+    fig_cooc.update_layout(
+        title=dict(
+            text="Co-ocurrencia de Acordes (lift)",
+            font=dict(size=14, color='#2C3E50')
+        ),
+        xaxis=dict(
+            side="bottom", 
+            tickangle=45,
+            tickfont=dict(color='#2C3E50', size=10), 
+            linecolor='#BDC3C7'
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50', size=10), 
+            linecolor='#BDC3C7',
+            autorange='reversed'
+        ),
+        height=500,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50')
+    )
+    
+    record_stage('coocurrencia_acordes', 'figure', t_stage, rows_in=len(df), figure=fig_cooc)
+    st.plotly_chart(fig_cooc, use_container_width=True)
+    download_plot_button(fig_cooc, "coocurrencia_acordes")
+
+with col6:
+    # VISUALIZACIÓN 6: COMBINACIONES FRECUENTES
+    st.markdown("**Combinaciones más frecuentes**")
+    itemsets_df = itemsets_table(mined).head(15)
+    
+    if len(itemsets_df) > 0:
+        st.dataframe(
+            itemsets_df.assign(
+                acordes=itemsets_df['acordes'].str.title(),
+                soporte=(itemsets_df['soporte'] * 100).map('{:.1f}%'.format)
+            ).rename(columns=str.title),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("Ninguna combinación alcanza el soporte mínimo. Prueba con un valor menor.")
+
+# VISUALIZACIÓN 7: REGLAS DE ASOCIACIÓN
+st.markdown("**Reglas de asociación** (si un perfume tiene los acordes de la izquierda, ¿qué acorde suele acompañarlos?)")
+if len(rules) > 0:
+    top_rules = rules.head(15)
+    st.dataframe(
+        top_rules.assign(
+            antecedente=top_rules['antecedente'].str.title(),
+            consecuente=top_rules['consecuente'].str.title(),
+            soporte=(top_rules['soporte'] * 100).map('{:.1f}%'.format),
+            confianza=(top_rules['confianza'] * 100).map('{:.0f}%'.format),
+            lift=top_rules['lift'].round(2)
+        ).rename(columns=str.title),
+        use_container_width=True,
+        hide_index=True
+    )
+else:
+    st.info("No hay reglas con confianza suficiente para estos parámetros.")
+
+# CUARTA FILA: COMPARACIÓN DE PERFUMES
+st.markdown("---")
+st.subheader("Comparación de Perfumes")
+
+# Por defecto, los perfumes más reseñados del filtro actual
+perfume_options = df['name'].dropna().unique().tolist()
+default_perfumes = df.nlargest(3, RATING_COUNT_COL)['name'].dropna().tolist()
+compared_perfumes = st.multiselect(
+    "Perfumes a comparar:",
+    options=perfume_options,
+    default=default_perfumes,
+    max_selections=MAX_COMPARED,
+    help=f"Elige hasta {MAX_COMPARED} perfumes para superponer sus perfiles"
+)
+
+if compared_perfumes:
+    # Un solo lote para todos los perfumes elegidos (índice de nombres del catálogo)
+    t_stage = time.perf_counter()
+    comparison = compare_perfumes(catalog, compared_perfumes)
+    record_stage('comparacion_perfumes', 'compute', t_stage, rows_in=len(compared_perfumes),
+                 rows_out=len(comparison['names']))
+
+    # VISUALIZACIÓN 8: RADAR DE ACORDES
+    accord_values = comparison['accords']['values']
+    fig_compare = create_radar_chart(
+        dict(zip(comparison['names'], accord_values)),
+        comparison['accords']['labels'],
+        title="Acordes Principales (intensidad %)",
+        colors=PRIMARY_PALETTE,
+        radial_max=100
+    )
+    fig_compare.update_layout(height=500, font=dict(color='#2C3E50'))
+    st.plotly_chart(fig_compare, use_container_width=True)
+    download_plot_button(fig_compare, "comparacion_acordes")
+
+    # VISUALIZACIÓN 9: ESTACIÓN, LONGEVIDAD Y SILLAGE (% de los votos de cada perfume)
+    dimension_columns = st.columns(len(comparison['dimensions']))
+    for column, dimension in zip(dimension_columns, comparison['dimensions'].values()):
+        with column:
+            fig_dimension = create_radar_chart(
+                dict(zip(comparison['names'], dimension['values'])),
+                dimension['levels'],
+                title=dimension['label'],
+                colors=PRIMARY_PALETTE
+            )
+            fig_dimension.update_layout(height=380, showlegend=False, font=dict(color='#2C3E50'))
+            st.plotly_chart(fig_dimension, use_container_width=True)
+
+    # Pirámide olfativa de cada perfume
+    st.dataframe(
+        pd.DataFrame({
+            'Perfume': comparison['names'],
+            **{level.title(): [', '.join(notes) for notes in comparison['pyramid'][level]]
+               for level in ('salida', 'corazon', 'base', 'ingredientes')}
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+else:
+    st.info("Selecciona al menos un perfume para compararlo.")
+
+finish_rerun()
+
 
@@ -1,10 +1,26 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-from Utils.data_loader import load_perfume_data
+from Utils.data_loader import (
+    BEST_RATING_COL, RATING_COL, RATING_COUNT_COL, dominant_gender, load_catalog, select_rows,
+    storage_backend, value_score
+)
+from Utils import sqlite_backend
+from Utils.clusters import family_filter, family_mask, family_row_ids
+from Utils.embedding import map_mask, map_region_filter, map_row_ids
+from Utils.fields import brand_summary, field_filters, field_mask, field_options, launch_year_counts
+from Utils.instrumentation import begin_rerun, finish_rerun, instrument, track
+from Utils.leaderboards import LEADERBOARDS, leaderboard
+from Utils.lazy_imports import lazy_import
+from Utils.memory import track_frame
+from Utils.parallel import build_figures
+from Utils.ranking import best_rated, get_gender_groups, group_bayesian_rating, positive_reception
+from Utils.search import ranked_results, search_filter, search_mask, search_row_ids
+from Utils.warmup import start_warmup
+
+# plotly.express se importa en el primer gráfico, no al arrancar la página
+px = lazy_import('plotly.express')
 
 st.set_page_config(
     page_title="Calificaciones y Performance",
@@ -46,47 +62,44 @@ SENTIMENT_PALETTE = [
     '#E74C3C',  # Rojo (La Odio)
 ]
 
-@st.cache_data
-def load_and_process_data():
-    """Carga y procesa los datos para análisis de calificaciones"""
-    df_full = load_perfume_data()
-    df = df_full.head(521)  # Solo primeros 521
-    
-    # Renombrar columnas para facilitar el trabajo
+# Columnas que usan los gráficos de la página (proyección del backend SQLite)
+PAGE_COLUMN_PREFIXES = ('name', 'calificationNumbers.', 'calificationText.', 'gender.',
+                        'price.', 'longevity.', 'sillage.', 'timeSeasons.', 'launch_year', 'brand')
+
+@instrument(kind='compute')
+def prepare_rating_data(df):
+    """Deriva las columnas de análisis de calificaciones a partir del dataset"""
+    # Renombrar columnas para facilitar el trabajo (con Copy-on-Write no copia datos)
     df = df.rename(columns={
-        'calificationNumbers.ratingValue': 'rating',
-        'calificationNumbers.ratingCount': 'ratingCount',
-        'calificationNumbers.bestRating': 'bestRating'
+        RATING_COL: 'rating',
+        RATING_COUNT_COL: 'ratingCount',
+        BEST_RATING_COL: 'bestRating'
     })
     
     # Limpieza de datos para ratings
-    df_clean = df.dropna(subset=['rating']).copy()
-    
-    # Crear columna de género dominante
-    gender_cols = ['gender.femenino', 'gender.masculino', 'gender.unisex', 
-                   'gender.unisex_femenino', 'gender.unisex_masculino']
-    df_clean['gender_dominant'] = df_clean[gender_cols].idxmax(axis=1).str.replace('gender.', '')
-    
-    # Crear categorías de rating
-    df_clean['rating_category'] = pd.cut(df_clean['rating'], 
-                                       bins=[0, 2, 3, 4, 4.5, 5], 
-                                       labels=['Malo', 'Regular', 'Bueno', 'Muy Bueno', 'Excelente'])
-    
-    # Categorías de popularidad
-    df_clean['popularity_category'] = pd.cut(df_clean['ratingCount'], 
-                                           bins=[0, 10, 50, 200, 1000, float('inf')], 
-                                           labels=['Nuevo', 'Poco Conocido', 'Conocido', 'Popular', 'Muy Popular'])
-    
-    # ELIMINAR CÁLCULOS DE LONGEVIDAD Y SILLAGE COMPLEJOS
-    # Solo mantener las categorías originales como están
-    
-    # Calcular score de precio ponderado (mantener solo este)
-    price_cols = ['price.excelente_precio', 'price.buen_precio', 'price.precio_moderado', 'price.ligeramente_costoso', 'price.extremadamente_costoso']
-    price_weights = [5, 4, 3, 2, 1]
-    df_clean['value_score'] = sum(df_clean[col].fillna(0) * weight for col, weight in zip(price_cols, price_weights))
+    df_clean = select_rows(df, df['rating'].notna())
+    
+    # Categorías de rating y popularidad, género dominante y score de precio
+    # (assign agrega columnas sin duplicar las existentes)
+    df_clean = df_clean.assign(
+        gender_dominant=dominant_gender(df_clean),
+        rating_category=pd.cut(df_clean['rating'], 
+                               bins=[0, 2, 3, 4, 4.5, 5], 
+                               labels=['Malo', 'Regular', 'Bueno', 'Muy Bueno', 'Excelente']),
+        popularity_category=pd.cut(df_clean['ratingCount'], 
+                                   bins=[0, 10, 50, 200, 1000, float('inf')], 
+                                   labels=['Nuevo', 'Poco Conocido', 'Conocido', 'Popular', 'Muy Popular']),
+        value_score=value_score(df_clean)
+    )
     
     return df_clean
 
+@st.cache_resource
+def load_and_process_data():
+    """Carga y procesa los datos para análisis de calificaciones (compartido entre sesiones, solo lectura)"""
+    return prepare_rating_data(load_catalog())  # Solo primeros 521 (vista, sin copia)
+
+@instrument(kind='figure')
 def create_rating_distribution(df_filtered):
     """Crea histograma de distribución de ratings"""
     
@@ -132,6 +145,7 @@ def create_rating_distribution(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_rating_vs_reviews_scatter(df_filtered):
     """Crea scatter plot de rating vs número de reviews"""
     
@@ -177,6 +191,7 @@ def create_rating_vs_reviews_scatter(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_sentiment_analysis(df_filtered):
     """Crea análisis de sentimientos por rating"""
     
@@ -225,6 +240,7 @@ def create_sentiment_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_performance_radar(df_filtered):
     """Crea radar chart de características de performance por género"""
     
@@ -280,6 +296,7 @@ def create_performance_radar(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_longevity_analysis(df_filtered):
     """Crea análisis de longevidad (distribución de votos)"""
     longevity_cols = ['longevity.escasa', 'longevity.débil', 'longevity.moderada', 'longevity.duradera', 'longevity.muy_duradera']
@@ -325,6 +342,83 @@ def create_longevity_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
+def create_launch_year_chart(df_filtered):
+    """Crea histograma de perfumes por año de lanzamiento (conteo sobre el año ya extraído)"""
+    years, counts = launch_year_counts(df_filtered)
+    
+    fig = go.Figure(data=go.Bar(
+        x=years,
+        y=counts,
+        marker_color=RATING_PALETTE[2],
+        hovertemplate='%{x}: %{y} perfumes<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=dict(text='Perfumes por Año de Lanzamiento', font=dict(color='#2C3E50', size=14)),
+        height=400,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        bargap=0.1,
+        xaxis=dict(
+            title='Año de Lanzamiento',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            title='Cantidad de Perfumes',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        showlegend=False
+    )
+    
+    return fig
+
+@instrument(kind='figure')
+def create_brand_chart(df_filtered):
+    """Crea barras de las marcas con más perfumes, coloreadas por su rating promedio"""
+    brands = brand_summary(df_filtered)
+    
+    fig = go.Figure(data=go.Bar(
+        x=brands['perfumes'],
+        y=brands['brand'],
+        orientation='h',
+        marker=dict(
+            color=brands['rating'],
+            colorscale='Blues',
+            colorbar=dict(title=dict(text='Rating', font=dict(color='#2C3E50')),
+                          tickfont=dict(color='#2C3E50'))
+        ),
+        customdata=brands['rating'],
+        hovertemplate='%{y}: %{x} perfumes, rating %{customdata:.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=dict(text='Marcas con Más Perfumes', font=dict(color='#2C3E50', size=14)),
+        height=400,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Cantidad de Perfumes',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50'),
+            autorange='reversed'
+        ),
+        showlegend=False
+    )
+    
+    return fig
+
+@instrument(kind='figure')
 def create_gender_distribution(df_filtered):
     """Crea distribución de perfumes por género"""
     
@@ -362,43 +456,98 @@ def main():
     # Sidebar con filtros
     st.sidebar.header("Filtros de Análisis")
     
-    df = load_and_process_data()
+    # Con PERFUME_BACKEND=sqlite el dataset no se carga: filtros y métricas se resuelven en SQL
+    use_sqlite = storage_backend() == 'sqlite'
+    
+    with track('load_and_process_data', kind='load') as rec:
+        if use_sqlite:
+            options = sqlite_backend.filter_options()
+        else:
+            df = track_frame(load_and_process_data(), 'df_calificaciones', shared=True)
+            options = {
+                'max_rating_count': df['ratingCount'].max(),
+                'max_value_score': df['value_score'].max(),
+                'genders': df['gender_dominant'].unique(),
+                **field_options(df),
+            }
+            rec['rows_out'] = len(df)
     
     # Filtros
     min_rating = st.sidebar.slider("Rating Mínimo", 0.0, 5.0, 0.0, 0.1)
-    min_reviews = st.sidebar.slider("Mínimo de Reviews", 0, int(df['ratingCount'].max()), 0)
+    min_reviews = st.sidebar.slider("Mínimo de Reviews", 0, int(options['max_rating_count']), 0)
     selected_genders = st.sidebar.multiselect(
         "Géneros a Analizar",
-        df['gender_dominant'].unique(),
-        default=df['gender_dominant'].unique()
+        options['genders'],
+        default=options['genders']
     )
     
     # Filtros avanzados
     with st.sidebar.expander("Filtros Avanzados"):
-        min_value_score = st.slider("Score Mínimo de Precio", 0.0, float(df['value_score'].max()), 0.0)
+        min_value_score = st.slider("Score Mínimo de Precio", 0.0, float(options['max_value_score']), 0.0)
+    
+    # Año, marca y perfumistas extraídos de las descripciones al cargar (Utils.fields)
+    fields = field_filters(options, st.sidebar.expander("Lanzamiento, Marca y Perfumista"))
+    
+    # Familias olfativas (modelo k-means precalculado, Utils.clusters)
+    families = family_filter()
+    # Región elegida en el mapa de aromas (página Mapa de Aromas, Utils.embedding)
+    region = map_region_filter()
+    # Búsqueda de texto en las descripciones (índice BM25 precalculado, Utils.search)
+    query = search_filter()
     
     # Aplicar filtros
-    df_filtered = df[
-        (df['rating'] >= min_rating) & 
-        (df['ratingCount'] >= min_reviews) & 
-        (df['gender_dominant'].isin(selected_genders)) &
-        (df['value_score'] >= min_value_score)
-    ]
+    filters = dict(min_rating=min_rating, min_reviews=min_reviews,
+                   genders=selected_genders, min_value_score=min_value_score, **fields,
+                   row_ids=sqlite_backend.intersect_row_ids(family_row_ids(families), map_row_ids(region),
+                                                          search_row_ids(query)))
+    with track('aplicar_filtros', kind='filter', rows_in=None if use_sqlite else len(df)) as rec:
+        if use_sqlite:
+            # Solo vuelven a Python las filas filtradas, con las columnas de los gráficos
+            df_filtered = prepare_rating_data(sqlite_backend.query_perfumes(
+                sqlite_backend.columns_with_prefixes(PAGE_COLUMN_PREFIXES), **filters
+            ))
+            summary = sqlite_backend.summarize(**filters)
+        else:
+            mask = (
+                (df['rating'] >= min_rating) & 
+                (df['ratingCount'] >= min_reviews) & 
+                (df['gender_dominant'].isin(selected_genders)) &
+                (df['value_score'] >= min_value_score)
+            )
+            if families is not None:
+                mask &= family_mask(df, families)
+            if region is not None:
+                mask &= map_mask(df, region)
+            matches = search_mask(df, query)
+            if matches is not None:
+                mask &= matches
+            selected_fields = field_mask(df, **fields)
+            if selected_fields is not None:
+                mask &= selected_fields
+            df_filtered = select_rows(df, mask)
+            track_frame(df_filtered, 'df_filtered', parent=df)
+            summary = {
+                'count': len(df_filtered),
+                'mean_rating': df_filtered['rating'].mean(),
+                'total_reviews': df_filtered['ratingCount'].sum(),
+                'mean_value_score': df_filtered['value_score'].mean(),
+            }
+        rec['rows_out'] = len(df_filtered)
     
     # Métricas principales
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Perfumes Analizados", len(df_filtered))
+        st.metric("Perfumes Analizados", summary['count'])
     
     with col2:
-        st.metric("Rating Promedio", f"{df_filtered['rating'].mean():.2f}" if len(df_filtered) > 0 else "N/A")
+        st.metric("Rating Promedio", f"{summary['mean_rating']:.2f}" if summary['count'] > 0 else "N/A")
     
     with col3:
-        st.metric("Total Reviews", f"{df_filtered['ratingCount'].sum():,}" if len(df_filtered) > 0 else "0")
+        st.metric("Total Reviews", f"{summary['total_reviews']:,}" if summary['count'] > 0 else "0")
     
     with col4:
-        st.metric("Valor Promedio", f"{df_filtered['value_score'].mean():.1f}" if len(df_filtered) > 0 else "N/A")
+        st.metric("Valor Promedio", f"{summary['mean_value_score']:.1f}" if summary['count'] > 0 else "N/A")
     
     st.markdown("---")
     
@@ -407,33 +556,77 @@ def main():
         st.warning("No hay perfumes que cumplan con los filtros seleccionados. Intenta ajustar los criterios.")
         return
     
+    # Resultados de la búsqueda, del más al menos relevante (BM25) dentro de los filtros
+    if query is not None:
+        st.subheader("Resultados de Búsqueda")
+        with track('buscar_descripciones', kind='compute', rows_in=len(df_filtered)) as rec:
+            results = ranked_results(df_filtered, query)
+            rec['rows_out'] = len(results)
+        if len(results) == 0:
+            st.info("Ningún perfume de los filtros actuales tiene todos los términos buscados.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    'Perfume': results['name'].to_numpy(),
+                    'Relevancia': results['relevancia'].round(2).to_numpy(),
+                    'Rating': results['rating'].to_numpy(),
+                    'Reseñas': results['ratingCount'].to_numpy(),
+                }),
+                hide_index=True, use_container_width=True
+            )
+        st.markdown("---")
+    
+    # Las figuras son independientes: se construyen en paralelo y se ubican en orden
+    distribution_fig, scatter_fig, gender_fig, longevity_fig, year_fig, brand_fig = build_figures([
+        create_rating_distribution,
+        create_rating_vs_reviews_scatter,
+        create_gender_distribution,
+        create_longevity_analysis,
+        create_launch_year_chart,
+        create_brand_chart,
+    ], df_filtered)
+    
     # Fila 1: Distribución y Scatter Plot Principal
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_rating_distribution(df_filtered), use_container_width=True)
+        st.plotly_chart(distribution_fig, use_container_width=True)
     
     with col2:
-        st.plotly_chart(create_rating_vs_reviews_scatter(df_filtered), use_container_width=True)
+        st.plotly_chart(scatter_fig, use_container_width=True)
     
     # Fila 2: Distribución por Género y Análisis de Longevidad
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_gender_distribution(df_filtered), use_container_width=True)
+        st.plotly_chart(gender_fig, use_container_width=True)
     
     with col2:
-        st.plotly_chart(create_longevity_analysis(df_filtered), use_container_width=True)
+        st.plotly_chart(longevity_fig, use_container_width=True)
+    
+    # Fila 3: Lanzamientos por Año y Marcas
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.plotly_chart(year_fig, use_container_width=True)
+    
+    with col2:
+        st.plotly_chart(brand_fig, use_container_width=True)
     
     # Insights automáticos
     st.markdown("---")
     st.subheader("Insights Clave")
     
+    # Ranking bayesiano con priors del filtro actual (con SQLite, el subconjunto ya filtrado)
+    rank_frame, rank_mask = (df_filtered, None) if use_sqlite else (df, mask)
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if len(df_filtered) > 0:
-            best_gender = df_filtered.groupby('gender_dominant')['rating'].mean().idxmax()
+        codes, genders = get_gender_groups(rank_frame)
+        gender_ratings = group_bayesian_rating(rank_frame, codes, len(genders), rank_mask)
+        if not np.isnan(gender_ratings).all():
+            best_gender = genders[np.nanargmax(gender_ratings)]
             st.info(f"**Género mejor valorado:** {best_gender.replace('_', ' ').title()}")
     
     with col2:
@@ -449,6 +642,40 @@ def main():
             # Correlación entre rating y número de reviews
             correlation = df_filtered['rating'].corr(df_filtered['ratingCount'])
             st.info(f"**Correlación Rating-Popularidad:** {correlation:.2f}")
+    
+    positions, scores, priors = best_rated(rank_frame, rank_mask, k=1)
+    if len(positions) > 0:
+        best = rank_frame.iloc[positions[0]]
+        reception = positive_reception(rank_frame)[positions[0]]
+        reception_text = f", recepción positiva ≥ {reception:.0%}" if not np.isnan(reception) else ""
+        st.success(
+            f"**Mejor valorado (ajustado por reseñas):** {best['name']} — {scores[0]:.2f} "
+            f"({best['rating']:.2f} con {best['ratingCount']:,.0f} reseñas{reception_text}; "
+            f"prior {priors['mean_rating']:.2f} con peso de {priors['weight']:,.0f} reseñas)"
+        )
+    
+    # Tablas de posiciones bajo los filtros actuales: recorren un orden precalculado
+    # por DataFrame y se detienen en las primeras 5 filas que pasan el filtro
+    st.subheader("Top 5 con los filtros actuales")
+    board = st.selectbox("Ordenar por", list(LEADERBOARDS),
+                         format_func=lambda name: LEADERBOARDS[name][0])
+    with track('leaderboard', kind='compute') as rec:
+        if use_sqlite:
+            # Con SQLite solo están en memoria las filas filtradas
+            top = leaderboard(df_filtered, board, k=5, columns=('name', 'rating', 'ratingCount'))
+        else:
+            top = leaderboard(df, board, k=5, mask=mask, columns=('name', 'rating', 'ratingCount'))
+        rec['rows_out'] = len(top)
+    if board in ('rating', 'rating_count'):
+        top = top.drop(columns='score')  # ya se muestra como columna
+    st.dataframe(
+        top.rename(columns={'name': 'Perfume', 'rating': 'Rating', 'ratingCount': 'Reseñas',
+                            'score': LEADERBOARDS[board][0]}),
+        hide_index=True, use_container_width=True
+    )
 
 if __name__ == "__main__":
+    start_warmup()
+    begin_rerun('page2')
     main()
+    finish_rerun()
@@ -1,10 +1,26 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-from Utils.data_loader import load_perfume_data
+from Utils.data_loader import (
+    RATING_COL, RATING_COUNT_COL, dominant_gender, load_catalog, select_rows, storage_backend
+)
+from Utils import sqlite_backend
+from Utils.clusters import family_filter, family_mask, family_row_ids
+from Utils.embedding import map_mask, map_region_filter, map_row_ids
+from Utils.fields import field_filters, field_mask, field_options
+from Utils.affinity import (
+    AFFINITY_DIMENSIONS, affinity, affinity_table, heaviest_accords, top_affinity_accords
+)
+from Utils.instrumentation import begin_rerun, finish_rerun, instrument, track
+from Utils.lazy_imports import lazy_import
+from Utils.memory import track_frame
+from Utils.parallel import build_figures
+from Utils.search import search_filter, search_mask, search_row_ids
+from Utils.warmup import start_warmup
+
+# plotly.express se importa en el primer gráfico, no al arrancar la página
+px = lazy_import('plotly.express')
 
 st.set_page_config(
     page_title="Uso y Características",
@@ -40,28 +56,33 @@ GENDER_PALETTE = {
 LONGEVITY_PALETTE = ['#E74C3C', '#E67E22', '#F39C12', '#27AE60', '#2ECC71']
 SILLAGE_PALETTE = ['#3498DB', '#2980B9', '#8E44AD', '#9B59B6']
 
-@st.cache_data
-def load_and_process_data():
-    """Carga y procesa los datos para análisis temporal"""
-    df_full = load_perfume_data()
-    df = df_full.head(521)  # Solo primeros 521
-    
-    # Renombrar columnas para facilitar el trabajo
+# Columnas que usan los gráficos de la página (proyección del backend SQLite)
+PAGE_COLUMN_PREFIXES = ('name', 'calificationNumbers.', 'gender.', 'timeSeasons.',
+                        'timeDay.', 'longevity.', 'sillage.', 'accords.')
+SEASON_COLUMNS = ['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano', 'timeSeasons.Otoño']
+DAY_COLUMNS = ['timeDay.Dia', 'timeDay.Noche']
+
+@instrument(kind='compute')
+def prepare_usage_data(df):
+    """Deriva las columnas de análisis temporal a partir del dataset"""
+    # Renombrar columnas para facilitar el trabajo (con Copy-on-Write no copia datos)
     df = df.rename(columns={
-        'calificationNumbers.ratingValue': 'rating',
-        'calificationNumbers.ratingCount': 'ratingCount'
+        RATING_COL: 'rating',
+        RATING_COUNT_COL: 'ratingCount'
     })
     
     # Limpieza de datos
-    df_clean = df.dropna(subset=['rating']).copy()
+    df_clean = select_rows(df, df['rating'].notna())
     
     # Crear columna de género dominante
-    gender_cols = ['gender.femenino', 'gender.masculino', 'gender.unisex', 
-                   'gender.unisex_femenino', 'gender.unisex_masculino']
-    df_clean['gender_dominant'] = df_clean[gender_cols].idxmax(axis=1).str.replace('gender.', '')
-    
-    return df_clean
+    return df_clean.assign(gender_dominant=dominant_gender(df_clean))
+
+@st.cache_resource
+def load_and_process_data():
+    """Carga y procesa los datos para análisis temporal (compartido entre sesiones, solo lectura)"""
+    return prepare_usage_data(load_catalog())  # Solo primeros 521 (vista, sin copia)
 
+@instrument(kind='figure')
 def create_seasonal_analysis(df_filtered):
     """Crea análisis de uso por estaciones"""
     season_cols = ['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano', 'timeSeasons.Otoño']
@@ -103,6 +124,7 @@ def create_seasonal_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_day_night_analysis(df_filtered):
     """Crea análisis de uso diurno vs nocturno"""
     day_night_data = {
@@ -132,6 +154,7 @@ def create_day_night_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_longevity_analysis(df_filtered):
     """Crea análisis de longevidad"""
     longevity_cols = ['longevity.escasa', 'longevity.débil', 'longevity.moderada', 'longevity.duradera', 'longevity.muy_duradera']
@@ -177,6 +200,7 @@ def create_longevity_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_sillage_analysis(df_filtered):
     """Crea análisis de sillage (proyección)"""
     sillage_cols = ['sillage.suave', 'sillage.moderada', 'sillage.pesada', 'sillage.enorme']
@@ -222,6 +246,7 @@ def create_sillage_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_gender_temporal_analysis(df_filtered):
     """Crea análisis temporal por género"""
     season_cols = ['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano', 'timeSeasons.Otoño']
@@ -275,6 +300,7 @@ def create_gender_temporal_analysis(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
 def create_season_gender_heatmap(df_filtered):
     """Crea heatmap de estaciones vs género"""
     season_cols = ['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano', 'timeSeasons.Otoño']
@@ -325,6 +351,56 @@ def create_season_gender_heatmap(df_filtered):
     
     return fig
 
+@instrument(kind='figure')
+def create_accord_affinity_heatmap(totals, dimension, n_accords=12):
+    """Crea heatmap de acordes vs una dimensión de uso (lift sobre el subconjunto)"""
+    title, _, labels = AFFINITY_DIMENSIONS[dimension]
+    share, lift = affinity_table(totals, dimension, heaviest_accords(totals, n_accords))
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=lift.values,
+        x=labels,
+        y=[acc.title() for acc in lift.index],
+        colorscale='RdBu_r',
+        zmid=1,
+        colorbar=dict(
+            title=dict(
+                text="Afinidad (lift)",
+                font=dict(color='#2C3E50')
+            ),
+            tickfont=dict(color='#2C3E50')
+        ),
+        text=(share * 100).round(1).values,
+        texttemplate="%{text}%",
+        textfont={"size": 11},
+        hovertemplate="%{y} · %{x}<br>Proporción: %{text}%<br>Lift: %{z:.2f}<extra></extra>",
+        hoverongaps=False
+    ))
+    
+    fig.update_layout(
+        title=dict(
+            text=f"Afinidad de Acordes por {title}",
+            font=dict(color='#2C3E50', size=14)
+        ),
+        xaxis=dict(
+            title=title,
+            tickfont=dict(color='#2C3E50'),
+            title_font=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            title="Acorde",
+            tickfont=dict(color='#2C3E50'),
+            title_font=dict(color='#2C3E50'),
+            autorange='reversed'
+        ),
+        height=500,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50')
+    )
+    
+    return fig
+
 # Interfaz principal
 def main():
     st.title("Análisis de Uso y Características")
@@ -333,23 +409,71 @@ def main():
     # Sidebar con filtros
     st.sidebar.header("Filtros de Análisis")
     
-    df = load_and_process_data()
+    # Con PERFUME_BACKEND=sqlite el dataset no se carga: filtros y métricas se resuelven en SQL
+    use_sqlite = storage_backend() == 'sqlite'
+    
+    with track('load_and_process_data', kind='load') as rec:
+        if use_sqlite:
+            options = sqlite_backend.filter_options()
+        else:
+            df = track_frame(load_and_process_data(), 'df_uso', shared=True)
+            options = {
+                'max_rating_count': df['ratingCount'].max(),
+                'genders': df['gender_dominant'].unique(),
+                **field_options(df),
+            }
+            rec['rows_out'] = len(df)
     
     # Filtros
     min_rating = st.sidebar.slider("Rating Mínimo", 0.0, 5.0, 0.0, 0.1)
-    min_reviews = st.sidebar.slider("Mínimo de Reviews", 0, int(df['ratingCount'].max()), 0)
+    min_reviews = st.sidebar.slider("Mínimo de Reviews", 0, int(options['max_rating_count']), 0)
     selected_genders = st.sidebar.multiselect(
         "Géneros a Analizar",
-        df['gender_dominant'].unique(),
-        default=df['gender_dominant'].unique()
+        options['genders'],
+        default=options['genders']
     )
     
+    # Año, marca y perfumistas extraídos de las descripciones al cargar (Utils.fields)
+    fields = field_filters(options, st.sidebar.expander("Lanzamiento, Marca y Perfumista"))
+    
+    # Familias olfativas (modelo k-means precalculado, Utils.clusters)
+    families = family_filter()
+    # Región elegida en el mapa de aromas (página Mapa de Aromas, Utils.embedding)
+    region = map_region_filter()
+    # Búsqueda de texto en las descripciones (índice BM25 precalculado, Utils.search)
+    query = search_filter()
+    
     # Aplicar filtros
-    df_filtered = df[
-        (df['rating'] >= min_rating) & 
-        (df['ratingCount'] >= min_reviews) & 
-        (df['gender_dominant'].isin(selected_genders))
-    ]
+    filters = dict(min_rating=min_rating, min_reviews=min_reviews, genders=selected_genders, **fields,
+                   row_ids=sqlite_backend.intersect_row_ids(family_row_ids(families), map_row_ids(region),
+                                                          search_row_ids(query)))
+    with track('aplicar_filtros', kind='filter', rows_in=None if use_sqlite else len(df)) as rec:
+        if use_sqlite:
+            # Solo vuelven a Python las filas filtradas, con las columnas de los gráficos
+            df_filtered = prepare_usage_data(sqlite_backend.query_perfumes(
+                sqlite_backend.columns_with_prefixes(PAGE_COLUMN_PREFIXES), **filters
+            ))
+            summary = sqlite_backend.summarize(SEASON_COLUMNS + DAY_COLUMNS, **filters)
+        else:
+            mask = (
+                (df['rating'] >= min_rating) & 
+                (df['ratingCount'] >= min_reviews) & 
+                (df['gender_dominant'].isin(selected_genders))
+            )
+            if families is not None:
+                mask &= family_mask(df, families)
+            if region is not None:
+                mask &= map_mask(df, region)
+            matches = search_mask(df, query)
+            if matches is not None:
+                mask &= matches
+            selected_fields = field_mask(df, **fields)
+            if selected_fields is not None:
+                mask &= selected_fields
+            df_filtered = select_rows(df, mask)
+            track_frame(df_filtered, 'df_filtered', parent=df)
+            summary = dict(df_filtered[SEASON_COLUMNS + DAY_COLUMNS].sum(), count=len(df_filtered))
+        rec['rows_out'] = len(df_filtered)
     
     # Verificar si hay datos filtrados
     if len(df_filtered) == 0:
@@ -360,44 +484,77 @@ def main():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Perfumes Analizados", len(df_filtered))
+        st.metric("Perfumes Analizados", summary['count'])
     
     with col2:
-        season_total = df_filtered[['timeSeasons.Invierno', 'timeSeasons.Primavera', 'timeSeasons.Verano', 'timeSeasons.Otoño']].sum().sum()
+        season_total = sum(summary[col] for col in SEASON_COLUMNS)
         st.metric("Total Votos Estacionales", f"{season_total:,}")
     
     with col3:
-        day_night_total = df_filtered[['timeDay.Dia', 'timeDay.Noche']].sum().sum()
+        day_night_total = sum(summary[col] for col in DAY_COLUMNS)
         st.metric("Total Votos Día/Noche", f"{day_night_total:,}")
     
     st.markdown("---")
     
+    # Las seis figuras son independientes: se construyen en paralelo y se ubican en orden
+    (seasonal_fig, day_night_fig, longevity_fig,
+     sillage_fig, gender_temporal_fig, season_gender_fig) = build_figures([
+        create_seasonal_analysis,
+        create_day_night_analysis,
+        create_longevity_analysis,
+        create_sillage_analysis,
+        create_gender_temporal_analysis,
+        create_season_gender_heatmap,
+    ], df_filtered)
+    
     # Fila 1: Análisis Estacional y Día/Noche
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_seasonal_analysis(df_filtered), use_container_width=True)
+        st.plotly_chart(seasonal_fig, use_container_width=True)
     
     with col2:
-        st.plotly_chart(create_day_night_analysis(df_filtered), use_container_width=True)
+        st.plotly_chart(day_night_fig, use_container_width=True)
     
     # Fila 2: Longevidad y Sillage
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_longevity_analysis(df_filtered), use_container_width=True)
+        st.plotly_chart(longevity_fig, use_container_width=True)
     
     with col2:
-        st.plotly_chart(create_sillage_analysis(df_filtered), use_container_width=True)
+        st.plotly_chart(sillage_fig, use_container_width=True)
     
     # Fila 3: Radar por Género y Heatmap Estacional
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_gender_temporal_analysis(df_filtered), use_container_width=True)
+        st.plotly_chart(gender_temporal_fig, use_container_width=True)
     
     with col2:
-        st.plotly_chart(create_season_gender_heatmap(df_filtered), use_container_width=True)
+        st.plotly_chart(season_gender_fig, use_container_width=True)
+    
+    # Afinidad de acordes: un producto de matrices sobre las entradas memorizadas del dataset
+    st.markdown("---")
+    st.subheader("Afinidad de Acordes")
+    with track('afinidad_acordes', kind='compute'):
+        totals = affinity(df_filtered) if use_sqlite else affinity(df, mask.to_numpy())
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.plotly_chart(create_accord_affinity_heatmap(totals, 'season'), use_container_width=True)
+    
+    with col2:
+        st.plotly_chart(create_accord_affinity_heatmap(totals, 'day'), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.plotly_chart(create_accord_affinity_heatmap(totals, 'longevity'), use_container_width=True)
+    
+    with col2:
+        st.plotly_chart(create_accord_affinity_heatmap(totals, 'sillage'), use_container_width=True)
     
     # Insights automáticos
     st.markdown("---")
@@ -425,6 +582,22 @@ def main():
         longevity_votes = df_filtered[longevity_cols].sum()
         most_common_longevity = longevity_votes.idxmax().replace('longevity.', '').title()
         st.info(f"**Longevidad más votada:** {most_common_longevity}")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Acordes más asociados al invierno y a la noche en el filtro actual
+        winter_accords = top_affinity_accords(totals, 'season', 'Invierno', k=3)
+        if len(winter_accords) > 0:
+            st.info(f"**Acordes de invierno:** {', '.join(acc.title() for acc in winter_accords.index)}")
+    
+    with col2:
+        night_accords = top_affinity_accords(totals, 'day', 'Noche', k=3)
+        if len(night_accords) > 0:
+            st.info(f"**Acordes de noche:** {', '.join(acc.title() for acc in night_accords.index)}")
 
 if __name__ == "__main__":
+    start_warmup()
+    begin_rerun('page3')
     main()
+    finish_rerun()
@@ -0,0 +1,302 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import numpy as np
+from Utils.clusters import family_filter, get_cluster_labels, load_cluster_model
+from Utils.data_loader import RATING_COL, RATING_COUNT_COL, load_catalog, page_column
+from Utils.indexes import get_accord_index
+from Utils.instrumentation import begin_rerun, finish_rerun, instrument, track
+from Utils.memory import track_frame
+from Utils.ranking import group_bayesian_rating
+from Utils.warmup import start_warmup
+
+st.set_page_config(
+    page_title="Familias Olfativas",
+    page_icon="🧪",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# PALETA PROFESIONAL (una entrada por familia, se repite si hay más)
+FAMILY_PALETTE = [
+    '#2C3E50',  # Azul oscuro
+    '#3498DB',  # Azul claro
+    '#27AE60',  # Verde
+    '#F39C12',  # Naranja
+    '#E74C3C',  # Rojo
+    '#8E44AD',  # Púrpura
+    '#1ABC9C',  # Verde agua
+    '#E67E22',  # Naranja oscuro
+    '#34495E',  # Gris azulado
+    '#9B59B6',  # Púrpura claro
+    '#16A085',  # Verde agua oscuro
+    '#C0392B',  # Rojo oscuro
+]
+
+def family_color(family):
+    return FAMILY_PALETTE[family % len(FAMILY_PALETTE)]
+
+@instrument(kind='figure')
+def create_k_sweep_chart(model):
+    """Crea el gráfico del barrido de k: inercia (codo) y silueta"""
+    sweep = pd.DataFrame(model['sweep'])
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=sweep['k'], y=sweep['inertia'], name='Inercia',
+        mode='lines+markers', line=dict(color=FAMILY_PALETTE[0], width=2)
+    ))
+    fig.add_trace(go.Scatter(
+        x=sweep['k'], y=sweep['silhouette'], name='Silueta',
+        mode='lines+markers', line=dict(color=FAMILY_PALETTE[3], width=2, dash='dot'),
+        yaxis='y2'
+    ))
+    fig.add_vline(x=model['k'], line_dash="dash", line_color=FAMILY_PALETTE[4],
+                  annotation_text=f"k elegido: {model['k']}")
+
+    fig.update_layout(
+        title=dict(text='Elección del Número de Familias', font=dict(color='#2C3E50', size=14)),
+        height=400,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Número de familias (k)',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50'),
+            dtick=1
+        ),
+        yaxis=dict(
+            title='Inercia',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis2=dict(
+            title='Silueta',
+            overlaying='y',
+            side='right',
+            tickfont=dict(color='#2C3E50')
+        ),
+        legend=dict(
+            bgcolor='rgba(255,255,255,0.9)',
+            bordercolor='#ECF0F1',
+            borderwidth=1,
+            font=dict(color='#2C3E50')
+        )
+    )
+
+    return fig
+
+@instrument(kind='figure')
+def create_family_sizes_chart(summary):
+    """Crea barras con la cantidad de perfumes por familia"""
+    fig = go.Figure(data=go.Bar(
+        x=summary['perfumes'],
+        y=summary['familia'],
+        orientation='h',
+        marker_color=[family_color(f) for f in summary.index],
+        text=summary['perfumes'],
+        textposition='outside'
+    ))
+
+    fig.update_layout(
+        title=dict(text='Perfumes por Familia', font=dict(color='#2C3E50', size=14)),
+        height=400,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Perfumes',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50'),
+            autorange='reversed'
+        ),
+        showlegend=False
+    )
+
+    return fig
+
+@instrument(kind='figure')
+def create_centroid_heatmap(model, families, n_accords=12):
+    """Crea heatmap del perfil de acordes (centroide) de cada familia"""
+    centroids = model['centroids'][families]
+    # Acordes con mayor peso en alguna de las familias mostradas
+    top = np.argsort(-centroids.max(axis=0), kind='stable')[:n_accords]
+
+    fig = go.Figure(data=go.Heatmap(
+        z=centroids[:, top],
+        x=[model['columns'][j].replace('accords.', '').title() for j in top],
+        y=[model['names'][f] for f in families],
+        colorscale='Blues',
+        colorbar=dict(
+            title=dict(text="Peso en el centroide", font=dict(color='#2C3E50')),
+            tickfont=dict(color='#2C3E50')
+        ),
+        hoverongaps=False
+    ))
+
+    fig.update_layout(
+        title=dict(text='Perfil de Acordes por Familia', font=dict(color='#2C3E50', size=14)),
+        xaxis=dict(
+            tickangle=45,
+            tickfont=dict(color='#2C3E50', size=10)
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50', size=10),
+            autorange='reversed'
+        ),
+        height=500,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50')
+    )
+
+    return fig
+
+@instrument(kind='figure')
+def create_family_rating_chart(summary):
+    """Crea barras con el rating ajustado por reseñas de cada familia"""
+    rated = summary.dropna(subset=['rating'])
+
+    fig = go.Figure(data=go.Bar(
+        x=rated['familia'],
+        y=rated['rating'],
+        marker_color=[family_color(f) for f in rated.index],
+        text=rated['rating'].round(2),
+        textposition='outside'
+    ))
+
+    fig.update_layout(
+        title=dict(text='Rating por Familia (ajustado por reseñas)', font=dict(color='#2C3E50', size=14)),
+        height=500,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            tickangle=30,
+            tickfont=dict(color='#2C3E50', size=10),
+            linecolor='#BDC3C7'
+        ),
+        yaxis=dict(
+            title='Rating',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50'),
+            range=[min(rated['rating'].min() - 0.2, 3.5) if len(rated) else 0, 5]
+        ),
+        showlegend=False
+    )
+
+    return fig
+
+def representative_perfumes(df, labels, model, family, n=10):
+    """Perfumes de la familia más cercanos a su centroide"""
+    positions = np.flatnonzero(labels == family)
+    if len(positions) == 0:
+        return pd.DataFrame(columns=['Perfume', 'Similitud', 'Rating', 'Reseñas'])
+    centroid = model['centroids'][family]
+    similarity = get_accord_index(df)['matrix'][positions] @ (centroid / np.linalg.norm(centroid))
+    order = np.argsort(-similarity, kind='stable')[:n]
+    rows = positions[order]
+    return pd.DataFrame({
+        'Perfume': df['name'].to_numpy()[rows],
+        'Similitud': similarity[order].round(3),
+        'Rating': page_column(df, RATING_COL).to_numpy()[rows],
+        'Reseñas': page_column(df, RATING_COUNT_COL).to_numpy()[rows],
+    })
+
+# Interfaz principal
+def main():
+    st.title("Familias Olfativas")
+    st.markdown("""
+    Los perfumes se agrupan en familias según su perfil de acordes (k-means sobre la
+    matriz de acordes normalizada). El modelo se ajusta una vez por versión del dataset.
+    """)
+    st.markdown("---")
+
+    st.sidebar.header("Filtros de Familias")
+
+    with track('load_cluster_model', kind='load') as rec:
+        df = track_frame(load_catalog(), 'catalogo', shared=True)
+        model = load_cluster_model()
+        labels = get_cluster_labels(df)
+        rec['rows_out'] = len(df)
+
+    families = family_filter()
+    families = list(range(model['k'])) if families is None else families
+    if not families:
+        st.warning("Selecciona al menos una familia en el panel lateral.")
+        return
+
+    # Resumen por familia: tamaño y rating bayesiano con los priors del catálogo
+    with track('resumen_familias', kind='aggregate', rows_in=len(df)) as rec:
+        sizes = np.bincount(labels[labels >= 0], minlength=model['k'])
+        ratings = group_bayesian_rating(df, labels.astype(np.int64), model['k'])
+        summary = pd.DataFrame({
+            'familia': model['names'],
+            'perfumes': sizes,
+            'rating': ratings,
+        }).loc[families]
+        rec['rows_out'] = len(summary)
+
+    # Métricas principales
+    chosen = next(fit for fit in model['sweep'] if fit['k'] == model['k'])
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Familias", model['k'])
+
+    with col2:
+        st.metric("Silueta del Modelo", f"{chosen['silhouette']:.3f}")
+
+    with col3:
+        st.metric("Perfumes en las Familias", f"{int(summary['perfumes'].sum()):,}")
+
+    with col4:
+        st.metric("Perfumes del Ajuste", f"{model['fitted_rows']:,}")
+
+    st.markdown("---")
+
+    # Fila 1: Barrido de k y tamaños
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(create_k_sweep_chart(model), use_container_width=True)
+
+    with col2:
+        st.plotly_chart(create_family_sizes_chart(summary), use_container_width=True)
+
+    # Fila 2: Perfil de acordes y rating por familia
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(create_centroid_heatmap(model, families), use_container_width=True)
+
+    with col2:
+        st.plotly_chart(create_family_rating_chart(summary), use_container_width=True)
+
+    # Perfumes representativos
+    st.markdown("---")
+    st.subheader("Perfumes Representativos")
+    family = st.selectbox(
+        "Familia",
+        families,
+        format_func=lambda f: model['names'][f]
+    )
+    st.dataframe(
+        representative_perfumes(df, labels, model, family),
+        use_container_width=True,
+        hide_index=True
+    )
+
+if __name__ == "__main__":
+    start_warmup()
+    begin_rerun('page4')
+    main()
+    finish_rerun()
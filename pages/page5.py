@@ -0,0 +1,269 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import numpy as np
+from Utils.clusters import family_filter, family_mask, load_cluster_model
+from Utils.data_loader import RATING_COL, RATING_COUNT_COL, load_catalog, page_column, select_rows
+from Utils.embedding import (
+    MAP_MAX_POINTS, load_embedding, map_mask, map_region_filter, region_mask, select_map_region
+)
+from Utils.instrumentation import begin_rerun, finish_rerun, instrument, track
+from Utils.memory import track_frame
+from Utils.warmup import start_warmup
+
+st.set_page_config(
+    page_title="Mapa de Aromas",
+    page_icon="🗺️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# PALETA PROFESIONAL (una entrada por familia, se repite si hay más)
+FAMILY_PALETTE = [
+    '#2C3E50',  # Azul oscuro
+    '#3498DB',  # Azul claro
+    '#27AE60',  # Verde
+    '#F39C12',  # Naranja
+    '#E74C3C',  # Rojo
+    '#8E44AD',  # Púrpura
+    '#1ABC9C',  # Verde agua
+    '#E67E22',  # Naranja oscuro
+    '#34495E',  # Gris azulado
+    '#9B59B6',  # Púrpura claro
+    '#16A085',  # Verde agua oscuro
+    '#C0392B',  # Rojo oscuro
+]
+
+def axis_title(model, component):
+    return f"Componente {component + 1} ({model['explained'][component]:.1%} de la varianza)"
+
+@instrument(kind='figure')
+def create_scent_map(model, families, show_density=True, selected=None):
+    """
+    Crea el mapa de aromas: densidad de todo el catálogo más los puntos de la muestra (WebGL)
+    Args:
+        families (dict | None): labels (familia de cada perfume del mapa) y names, o None
+        selected (np.ndarray | None): Máscara de los perfumes del mapa que se dibujan (None = todos)
+    """
+    coords = model['coords']
+    sample = np.asarray(model['sample'])
+    names = np.asarray(model['sample_names'], dtype=object)
+    if selected is not None:
+        keep = np.asarray(selected)[sample]
+        sample, names = sample[keep], names[keep]
+    x, y = coords[sample, 0], coords[sample, 1]
+
+    fig = go.Figure()
+    if show_density:
+        # Capa de densidad: cada celda resume todos los perfumes, no solo la muestra
+        x_edges, y_edges = np.asarray(model['x_edges']), np.asarray(model['y_edges'])
+        fig.add_trace(go.Heatmap(
+            z=np.log1p(np.asarray(model['density']).T),
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            colorscale=[[0, 'rgba(255,255,255,0)'], [1, 'rgba(44,62,80,0.55)']],
+            showscale=False,
+            hoverinfo='skip',
+            zsmooth='best'
+        ))
+
+    if families is None:
+        fig.add_trace(go.Scattergl(
+            x=x, y=y, mode='markers', name='Perfumes', text=names,
+            hovertemplate='%{text}<extra></extra>',
+            marker=dict(size=4, color=FAMILY_PALETTE[1], opacity=0.6)
+        ))
+    else:
+        sample_labels = np.asarray(families['labels'])[sample]
+        for family, name in enumerate(families['names']):
+            members = sample_labels == family
+            fig.add_trace(go.Scattergl(
+                x=x[members], y=y[members], mode='markers', name=name, text=names[members],
+                hovertemplate='%{text}<extra>' + name + '</extra>',
+                marker=dict(size=4, color=FAMILY_PALETTE[family % len(FAMILY_PALETTE)], opacity=0.6)
+            ))
+
+    fig.update_layout(
+        title=dict(text='Mapa de Aromas', font=dict(color='#2C3E50', size=14)),
+        height=650,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        dragmode='lasso',
+        xaxis=dict(
+            title=axis_title(model, 0),
+            gridcolor='#ECF0F1',
+            zeroline=False,
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            title=axis_title(model, 1),
+            gridcolor='#ECF0F1',
+            zeroline=False,
+            tickfont=dict(color='#2C3E50')
+        ),
+        legend=dict(
+            bgcolor='rgba(255,255,255,0.9)',
+            bordercolor='#ECF0F1',
+            borderwidth=1,
+            font=dict(color='#2C3E50'),
+            itemsizing='constant'
+        )
+    )
+
+    return fig
+
+@instrument(kind='figure')
+def create_axis_loadings_chart(model, component, n_accords=8):
+    """Crea barras con los acordes de mayor peso (positivo y negativo) en un eje del mapa"""
+    loadings = np.asarray(model['components'][component])
+    order = np.argsort(loadings, kind='stable')
+    top = np.concatenate([order[:n_accords], order[-n_accords:]])
+
+    fig = go.Figure(data=go.Bar(
+        x=loadings[top],
+        y=[model['columns'][j].replace('accords.', '').title() for j in top],
+        orientation='h',
+        marker_color=[FAMILY_PALETTE[4] if value < 0 else FAMILY_PALETTE[1] for value in loadings[top]]
+    ))
+
+    fig.update_layout(
+        title=dict(text=f"Acordes del Componente {component + 1}", font=dict(color='#2C3E50', size=14)),
+        height=450,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Peso en el componente',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50', size=10)
+        ),
+        showlegend=False
+    )
+
+    return fig
+
+def region_perfumes(df, region, families=None, n=20):
+    """Perfumes del catálogo dentro de la región (y de las familias elegidas), de más a menos reseñados"""
+    mask = map_mask(df, region)
+    family_rows = family_mask(df, families)
+    if family_rows is not None:
+        mask &= family_rows
+    region_df = select_rows(df, mask)
+    table = pd.DataFrame({
+        'Perfume': region_df['name'].to_numpy(),
+        'Rating': page_column(region_df, RATING_COL).to_numpy(),
+        'Reseñas': page_column(region_df, RATING_COUNT_COL).to_numpy(),
+    })
+    return table.sort_values('Reseñas', ascending=False, kind='stable', ignore_index=True).head(n)
+
+# Interfaz principal
+def main():
+    st.title("Mapa de Aromas")
+    st.markdown("""
+    Cada punto es un perfume, ubicado según su perfil de acordes (las dos componentes
+    principales de la matriz de acordes). Perfumes cercanos huelen parecido. Selecciona
+    una zona con el lazo o la caja para filtrar las demás páginas.
+    """)
+    st.markdown("---")
+
+    st.sidebar.header("Opciones del Mapa")
+
+    with track('load_embedding', kind='load') as rec:
+        df = track_frame(load_catalog(), 'catalogo', shared=True)
+        model = load_embedding()
+        clusters = load_cluster_model()
+        rec['rows_out'] = len(model['coords'])
+
+    # Familias elegidas (mismo filtro que las demás páginas): acotan los puntos, la región y la tabla
+    selected_families = family_filter()
+
+    # Familias del mismo estado del CSV que el mapa (una etiqueta por punto)
+    families = None
+    selected = None
+    if len(clusters['labels']) == len(model['coords']):
+        color_by_family = st.sidebar.checkbox("Colorear por familia olfativa", value=True)
+        if color_by_family:
+            families = {'labels': clusters['labels'], 'names': clusters['names']}
+        if selected_families is not None:
+            selected = np.isin(np.asarray(clusters['labels']), selected_families)
+    elif selected_families is not None:
+        st.sidebar.caption("El mapa aún no tiene las familias del CSV actual: "
+                           "el filtro de familias solo se aplica a la tabla de la región.")
+    show_density = st.sidebar.checkbox(
+        "Mostrar densidad",
+        value=len(model['coords']) > MAP_MAX_POINTS,
+        help="Resume a todos los perfumes; los puntos son una muestra si hay más de "
+             f"{MAP_MAX_POINTS:,} perfumes"
+    )
+
+    event = st.plotly_chart(
+        create_scent_map(model, families, show_density, selected),
+        use_container_width=True,
+        key='scent_map',
+        on_select='rerun',
+        selection_mode=('box', 'lasso')
+    )
+    select_map_region(event.selection)
+    region = map_region_filter()
+
+    # Métricas principales
+    on_map = ~np.isnan(np.asarray(model['coords'][:, 0]))
+    if selected is not None:
+        on_map &= selected
+    mapped = int(np.count_nonzero(on_map))
+    drawn = len(model['sample']) if selected is None else int(np.count_nonzero(selected[np.asarray(model['sample'])]))
+    in_region = None
+    if region is not None:
+        with track('region_mapa', kind='filter', rows_in=len(model['coords'])) as rec:
+            in_region = region_mask(np.asarray(model['coords']), region)
+            if selected is not None:
+                in_region &= selected
+            rec['rows_out'] = int(in_region.sum())
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Perfumes en el Mapa", f"{mapped:,}")
+
+    with col2:
+        st.metric("Varianza Explicada", f"{sum(model['explained']):.1%}")
+
+    with col3:
+        st.metric("Puntos Dibujados", f"{drawn:,}")
+
+    with col4:
+        st.metric("Perfumes en la Región", f"{int(in_region.sum()):,}" if in_region is not None else "—")
+
+    if in_region is not None and families is not None and in_region.any():
+        counts = np.bincount(np.asarray(families['labels'])[in_region].astype(np.int64) + 1,
+                             minlength=len(families['names']) + 1)[1:]
+        st.info(f"Familia predominante en la región: {families['names'][int(counts.argmax())]} "
+                f"({counts.max() / counts.sum():.0%} de sus perfumes)")
+
+    st.markdown("---")
+
+    # Qué significa cada eje
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(create_axis_loadings_chart(model, 0), use_container_width=True)
+
+    with col2:
+        st.plotly_chart(create_axis_loadings_chart(model, 1), use_container_width=True)
+
+    # Perfumes de la región
+    if region is not None:
+        st.markdown("---")
+        st.subheader("Perfumes de la Región")
+        st.dataframe(region_perfumes(df, region, selected_families), use_container_width=True, hide_index=True)
+
+if __name__ == "__main__":
+    start_warmup()
+    begin_rerun('page5')
+    main()
+    finish_rerun()
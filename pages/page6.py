@@ -0,0 +1,171 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from Utils.clusters import family_filter, family_mask
+from Utils.data_loader import get_perfume_profiles, load_catalog
+from Utils.embedding import map_mask, map_region_filter
+from Utils.indexes import get_accord_index
+from Utils.instrumentation import begin_rerun, finish_rerun, instrument, track
+from Utils.memory import track_frame
+from Utils.simulator import SIMULATOR_TOP_N, nearest_to_blend, nearest_to_profile
+from Utils.warmup import start_warmup
+
+st.set_page_config(
+    page_title="Simulador de Mezclas",
+    page_icon="⚗️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# PALETA PROFESIONAL
+PRIMARY_PALETTE = [
+    '#2C3E50',  # Azul oscuro
+    '#3498DB',  # Azul claro
+    '#27AE60',  # Verde
+    '#F39C12',  # Naranja
+]
+
+# Acordes con slider en el modo de intensidades y sus valores iniciales
+DEFAULT_TARGET = {'accords.cítrico': 80, 'accords.amaderado': 50, 'accords.aromático': 40}
+MAX_TARGET_ACCORDS = 6
+
+@instrument(kind='figure')
+def create_profile_chart(profile, title, n_accords=10):
+    """Crea barras con las intensidades del perfil simulado"""
+    top = profile.sort_values(ascending=False).head(n_accords)
+
+    fig = go.Figure(data=go.Bar(
+        x=top.to_numpy(),
+        y=[col.replace('accords.', '').title() for col in top.index],
+        orientation='h',
+        marker_color=PRIMARY_PALETTE[1],
+        text=top.round(0).to_numpy(),
+        textposition='outside'
+    ))
+
+    fig.update_layout(
+        title=dict(text=title, font=dict(color='#2C3E50', size=14)),
+        height=400,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Intensidad (%)',
+            range=[0, 110],
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50'),
+            autorange='reversed'
+        ),
+        showlegend=False
+    )
+
+    return fig
+
+def blend_profile(df, first, second, weight):
+    """Intensidades de la mezcla de dos perfumes (un solo lote de perfiles)"""
+    profiles = get_perfume_profiles(df, [first, second])
+    blended = {}
+    for i, share in enumerate((1 - weight, weight)):
+        start, stop = profiles['offsets'][i], profiles['offsets'][i + 1]
+        for accord, intensity in zip(profiles['accords'][start:stop], profiles['intensities'][start:stop]):
+            key = f'accords.{accord}'
+            blended[key] = blended.get(key, 0.0) + share * intensity
+    return pd.Series(blended, dtype=float)
+
+# Interfaz principal
+def main():
+    st.title("Simulador de Mezclas")
+    st.markdown("""
+    Define un perfil de acordes hipotético, o mezcla dos perfumes existentes, y encuentra
+    los perfumes reales más parecidos (similitud coseno sobre la matriz de acordes).
+    Los resultados se actualizan con cada cambio.
+    """)
+    st.markdown("---")
+
+    st.sidebar.header("Filtros del Simulador")
+
+    with track('load_catalog', kind='load') as rec:
+        df = track_frame(load_catalog(), 'catalogo', shared=True)
+        index = get_accord_index(df)
+        rec['rows_out'] = len(df)
+
+    # Candidatos: familias y región del mapa elegidas (mismos filtros que las demás páginas)
+    families = family_filter()
+    region = map_region_filter()
+    mask = family_mask(df, families)
+    region_rows = map_mask(df, region)
+    if region_rows is not None:
+        mask = region_rows if mask is None else mask & region_rows
+
+    top_n = st.sidebar.slider("Perfumes a mostrar", 5, 25, SIMULATOR_TOP_N)
+
+    mode = st.radio(
+        "Modo",
+        ["Intensidades de acordes", "Mezcla de dos perfumes"],
+        horizontal=True
+    )
+
+    if mode == "Intensidades de acordes":
+        accord_labels = {col: col.replace('accords.', '').title() for col in index['columns']}
+        chosen = st.multiselect(
+            "Acordes del perfil:",
+            options=index['columns'],
+            default=[col for col in DEFAULT_TARGET if col in accord_labels],
+            format_func=accord_labels.get,
+            max_selections=MAX_TARGET_ACCORDS
+        )
+        if not chosen:
+            st.info("Selecciona al menos un acorde para definir el perfil.")
+            return
+
+        slider_columns = st.columns(len(chosen))
+        target = {}
+        for column, col in zip(slider_columns, chosen):
+            with column:
+                target[col] = st.slider(accord_labels[col], 0, 100, DEFAULT_TARGET.get(col, 50), key=f'target_{col}')
+
+        with track('simular_perfil', kind='compute', rows_in=len(df)) as rec:
+            matches = nearest_to_profile(df, target, top_n, mask=mask)
+            rec['rows_out'] = len(matches)
+        profile = pd.Series(target, dtype=float)
+        title = 'Perfil Objetivo'
+    else:
+        names = pd.Series(index['names']).dropna().drop_duplicates().tolist()
+        col1, col2 = st.columns(2)
+        with col1:
+            first = st.selectbox("Perfume A", names, index=0)
+        with col2:
+            second = st.selectbox("Perfume B", names, index=min(1, len(names) - 1))
+        weight = st.slider("Proporción de B en la mezcla (%)", 0, 100, 50) / 100
+
+        with track('simular_mezcla', kind='compute', rows_in=len(df)) as rec:
+            matches = nearest_to_blend(df, first, second, weight, top_n, mask=mask)
+            rec['rows_out'] = 0 if matches is None else len(matches)
+        if matches is None:
+            st.warning("Alguno de los perfumes elegidos no tiene acordes registrados.")
+            return
+        profile = blend_profile(df, first, second, weight)
+        title = 'Perfil de la Mezcla'
+
+    st.markdown("---")
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.plotly_chart(create_profile_chart(profile, title), use_container_width=True)
+
+    with col2:
+        st.subheader("Perfumes Más Cercanos")
+        if len(matches) == 0:
+            st.warning("No hay perfumes con acordes en los filtros actuales.")
+        else:
+            st.dataframe(matches, use_container_width=True, hide_index=True)
+
+if __name__ == "__main__":
+    start_warmup()
+    begin_rerun('page6')
+    main()
+    finish_rerun()
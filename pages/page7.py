@@ -0,0 +1,240 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import numpy as np
+from Utils.brands import brand_profile, brand_table, get_brand_aggregates
+from Utils.data_loader import load_catalog
+from Utils.duplicates import duplicate_table
+from Utils.instrumentation import begin_rerun, finish_rerun, instrument, track
+from Utils.memory import track_frame
+from Utils.plotting import create_radar_chart
+from Utils.warmup import start_warmup
+
+st.set_page_config(
+    page_title="Explorador de Marcas",
+    page_icon="🏷️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# PALETA PROFESIONAL
+PRIMARY_PALETTE = [
+    '#2C3E50',  # Azul oscuro
+    '#3498DB',  # Azul claro
+    '#27AE60',  # Verde
+    '#F39C12',  # Naranja
+]
+
+# Criterios de orden de la tabla de marcas
+SORT_OPTIONS = {
+    'perfumes': 'Cantidad de perfumes',
+    'mean_rating': 'Rating promedio',
+    'total_reviews': 'Total de reseñas',
+}
+
+@instrument(kind='figure')
+def create_brand_scatter(table):
+    """Crea el mapa de marcas: perfumes vs rating promedio, tamaño según reseñas"""
+    reviews = table['total_reviews'].to_numpy(dtype=float)
+    sizes = 12 + 40 * np.sqrt(reviews / reviews.max()) if len(reviews) and reviews.max() > 0 else 12
+
+    fig = go.Figure(data=go.Scatter(
+        x=table['perfumes'],
+        y=table['mean_rating'],
+        mode='markers+text',
+        text=table['brand'],
+        textposition='top center',
+        customdata=reviews,
+        hovertemplate='%{text}<br>%{x} perfumes, rating %{y:.2f}<br>%{customdata:,.0f} reseñas<extra></extra>',
+        marker=dict(size=sizes, color=PRIMARY_PALETTE[1], opacity=0.7,
+                    line=dict(color=PRIMARY_PALETTE[0], width=1))
+    ))
+
+    fig.update_layout(
+        title=dict(text='Marcas: Tamaño de Catálogo vs Rating', font=dict(color='#2C3E50', size=14)),
+        height=500,
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Cantidad de Perfumes',
+            type='log',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            title='Rating Promedio',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        showlegend=False
+    )
+
+    return fig
+
+@instrument(kind='figure')
+def create_brand_accords_chart(profile, overall, brand, n_accords=10):
+    """Crea barras con los acordes promedio de la marca frente al promedio del catálogo"""
+    top = profile['accords'].sort_values(ascending=False).head(n_accords)
+    labels = [col.replace('accords.', '').title() for col in top.index]
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=top.to_numpy(), y=labels, orientation='h', name=brand,
+        marker_color=PRIMARY_PALETTE[1]
+    ))
+    fig.add_trace(go.Bar(
+        x=overall['accords'][top.index].to_numpy(), y=labels, orientation='h', name='Catálogo',
+        marker_color='#BDC3C7'
+    ))
+
+    fig.update_layout(
+        title=dict(text=f'Acordes Promedio de {brand}', font=dict(color='#2C3E50', size=14)),
+        height=450,
+        barmode='group',
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        font=dict(color='#2C3E50'),
+        xaxis=dict(
+            title='Intensidad Promedio (%)',
+            gridcolor='#ECF0F1',
+            linecolor='#BDC3C7',
+            tickfont=dict(color='#2C3E50')
+        ),
+        yaxis=dict(
+            tickfont=dict(color='#2C3E50'),
+            autorange='reversed'
+        ),
+        legend=dict(
+            bgcolor='rgba(255,255,255,0.9)',
+            bordercolor='#ECF0F1',
+            borderwidth=1,
+            font=dict(color='#2C3E50')
+        )
+    )
+
+    return fig
+
+# Interfaz principal
+def main():
+    st.title("Explorador de Marcas")
+    st.markdown("""
+    Resumen de cada marca del catálogo: tamaño, calificación, reseñas, perfil de acordes
+    y estaciones preferidas. Todo sale de agregados por marca calculados una sola vez.
+    """)
+    st.markdown("---")
+
+    st.sidebar.header("Filtros de Marcas")
+
+    with track('brand_aggregates', kind='load') as rec:
+        df = track_frame(load_catalog(), 'catalogo', shared=True)
+        aggregates = get_brand_aggregates(df)
+        rec['rows_out'] = len(aggregates['names'])
+
+    # Los filtros y el orden trabajan sobre la tabla de marcas, no sobre los perfumes
+    table = brand_table(aggregates)
+    if len(table) == 0:
+        st.warning("El catálogo no tiene marcas identificadas.")
+        return
+
+    min_perfumes = st.sidebar.slider("Perfumes mínimos por marca", 1, int(table['perfumes'].max()), 1)
+    min_rating = st.sidebar.slider("Rating promedio mínimo", 0.0, 5.0, 0.0, 0.1)
+    sort_by = st.sidebar.selectbox("Ordenar por", list(SORT_OPTIONS), format_func=SORT_OPTIONS.get)
+
+    visible = table[(table['perfumes'] >= min_perfumes) & (table['mean_rating'].fillna(0) >= min_rating)]
+    visible = visible.sort_values(sort_by, ascending=False, kind='stable', ignore_index=True)
+
+    # Métricas principales
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Marcas", f"{len(visible):,}")
+
+    with col2:
+        st.metric("Perfumes", f"{int(visible['perfumes'].sum()):,}")
+
+    with col3:
+        rated = visible['mean_rating'].notna()
+        weighted = np.average(visible['mean_rating'][rated], weights=visible['perfumes'][rated]) if rated.any() else None
+        st.metric("Rating Promedio", f"{weighted:.2f}" if weighted is not None else "N/A")
+
+    with col4:
+        st.metric("Total Reseñas", f"{visible['total_reviews'].sum():,.0f}")
+
+    st.markdown("---")
+
+    if len(visible) == 0:
+        st.warning("No hay marcas que cumplan con los filtros seleccionados. Intenta ajustar los criterios.")
+        return
+
+    col1, col2 = st.columns([3, 2])
+
+    with col1:
+        st.plotly_chart(create_brand_scatter(visible), use_container_width=True)
+
+    with col2:
+        st.subheader("Marcas")
+        st.dataframe(
+            pd.DataFrame({
+                'Marca': visible['brand'],
+                'Perfumes': visible['perfumes'],
+                'Rating': visible['mean_rating'].round(2),
+                'Reseñas': visible['total_reviews'],
+                'Estación': visible['top_season'],
+            }),
+            hide_index=True, use_container_width=True, height=460
+        )
+
+    # Detalle de una marca: perfil promedio frente al catálogo
+    st.markdown("---")
+    st.subheader("Detalle de la Marca")
+    brand = st.selectbox("Marca:", visible['brand'].tolist())
+    with track('brand_profile', kind='compute') as rec:
+        profile = brand_profile(aggregates, brand)
+        overall = brand_profile(aggregates)
+        rec['rows_out'] = len(profile['accords'])
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(create_brand_accords_chart(profile, overall, brand), use_container_width=True)
+
+    with col2:
+        if len(profile['seasons']):
+            fig_seasons = create_radar_chart(
+                {brand: profile['seasons'].to_numpy(), 'Catálogo': overall['seasons'].to_numpy()},
+                profile['seasons'].index.tolist(),
+                title="Estaciones (% de los votos)",
+                colors=[PRIMARY_PALETTE[1], '#95A5A6']
+            )
+            st.plotly_chart(fig_seasons, use_container_width=True)
+
+    # Duplicados y flankers de la marca (grupos precalculados por Utils.duplicates)
+    st.subheader("Posibles Duplicados y Flankers")
+    with track('brand_duplicates', kind='compute') as rec:
+        duplicates = duplicate_table(df, brand)
+        rec['rows_out'] = len(duplicates)
+
+    if len(duplicates) == 0:
+        st.info(f"No se encontraron duplicados ni flankers de {brand} en el catálogo.")
+    else:
+        # Grupos numerados 1, 2, ... en el orden de la tabla
+        group_numbers = pd.factorize(duplicates['group'])[0] + 1
+        st.caption(f"{group_numbers.max()} grupos de perfumes con nombre y acordes casi iguales "
+                   "(misma línea en otra concentración, reediciones o filas repetidas).")
+        st.dataframe(
+            pd.DataFrame({
+                'Grupo': group_numbers,
+                'Perfume': duplicates['name'],
+                'Rating': duplicates['rating'].round(2),
+            }),
+            hide_index=True, use_container_width=True
+        )
+
+if __name__ == "__main__":
+    start_warmup()
+    begin_rerun('page7')
+    main()
+    finish_rerun()